@@ -0,0 +1,137 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import os
+import queue
+import threading
+
+##  Copies a file to a slow device in the background, with double buffering.
+#
+#   One thread reads blocks of the source into a fixed set of buffers while another thread writes the filled buffers
+#   to the destination, so reading the next block overlaps with writing the last one and no memory is allocated while
+#   copying. The blocks are large and aligned to block_size, which suits the flash memory of SD cards and USB sticks.
+#
+#   The destination is synced every sync_interval bytes, so the progress that is reported is the data that is actually
+#   on the device and not only in the cache of the operating system. When the copier finishes, the data is synced and
+#   the device can be ejected.
+class BufferedFileCopier:
+    ##  Create a copier.
+    #
+    #   \param source Binary file object to copy, which must be seekable. It is copied from the start.
+    #   \param destination Unbuffered binary file object to write to, for instance open(path, "wb", buffering = 0). It is
+    #          closed when the copy is done.
+    #   \param block_size Size of the blocks to copy, in bytes.
+    #   \param buffer_count Number of buffers of block_size to copy with.
+    #   \param sync_interval Number of bytes to write between syncs.
+    #   \param progress_callback Function that is called with the number of bytes that are synced and the total size.
+    #   \param finished_callback Function that is called when the copy is done, with None or the exception that stopped
+    #          the copy.
+    def __init__(self, source, destination, block_size = 1024 * 1024, buffer_count = 2, sync_interval = 8 * 1024 * 1024, progress_callback = None, finished_callback = None):
+        self._source = source
+        self._destination = destination
+        self._block_size = block_size
+        self._sync_interval = sync_interval
+        self._progress_callback = progress_callback
+        self._finished_callback = finished_callback
+
+        self._free_buffers = queue.Queue()
+        for _ in range(buffer_count):
+            self._free_buffers.put(bytearray(block_size))
+        self._full_buffers = queue.Queue()
+
+        self._total_size = 0
+        self._bytes_synced = 0
+        self._error = None
+        self._cancelled = False
+        self._finished = threading.Event()
+        self._read_thread = threading.Thread(target = self._read, daemon = True)
+        self._write_thread = threading.Thread(target = self._write, daemon = True)
+
+    def start(self):
+        self._total_size = self._source.seek(0, os.SEEK_END)
+        self._source.seek(0)
+        self._read_thread.start()
+        self._write_thread.start()
+
+    ##  Stop copying. The copy finishes with an error.
+    def cancel(self):
+        self._cancelled = True
+
+    ##  Wait until the copy is done.
+    #   \return True if the copy is done, False if the timeout expired.
+    def wait(self, timeout = None):
+        return self._finished.wait(timeout)
+
+    def isFinished(self):
+        return self._finished.is_set()
+
+    ##  Get the exception that stopped the copy, or None if it succeeded or is still busy.
+    def getError(self):
+        return self._error
+
+    def getTotalSize(self):
+        return self._total_size
+
+    ##  Get the number of bytes that are written and synced to the destination.
+    def getBytesSynced(self):
+        return self._bytes_synced
+
+    def _read(self):
+        try:
+            while True:
+                buffer = self._free_buffers.get()
+                if self._cancelled:
+                    break
+                length = self._source.readinto(buffer)
+                if not length:
+                    break
+                self._full_buffers.put((buffer, length))
+        except Exception as e:
+            self._error = e
+        self._full_buffers.put(None)
+
+    def _write(self):
+        bytes_written = 0
+        try:
+            while True:
+                item = self._full_buffers.get()
+                if item is None:
+                    break
+                buffer, length = item
+                view = memoryview(buffer)[:length]
+                while view:
+                    view = view[self._destination.write(view):]
+                view.release()
+                self._free_buffers.put(buffer)
+
+                bytes_written += length
+                if bytes_written - self._bytes_synced >= self._sync_interval:
+                    self._sync(bytes_written)
+                if self._cancelled:
+                    break
+
+            if self._cancelled:
+                raise InterruptedError("The copy was cancelled")
+            if self._error is None:
+                self._sync(bytes_written)
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            # Let the reading thread stop as well.
+            self._cancelled = True
+            self._free_buffers.put(bytearray(0))
+        finally:
+            try:
+                self._destination.close()
+            except OSError as e:
+                if self._error is None:
+                    self._error = e
+            self._finished.set()
+            if self._finished_callback:
+                self._finished_callback(self._error)
+
+    def _sync(self, bytes_written):
+        os.fsync(self._destination.fileno())
+        self._bytes_synced = bytes_written
+        if self._progress_callback:
+            self._progress_callback(self._bytes_synced, self._total_size)
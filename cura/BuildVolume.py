@@ -19,13 +19,19 @@ from UM.View.RenderBatch import RenderBatch
 from UM.View.GL.OpenGL import OpenGL
 catalog = i18nCatalog("cura")
 
+from cura.PolygonBatch import PolygonBatch
+
 import numpy
-import copy
 
 
 # Setting for clearance around the prime
 PRIME_CLEARANCE = 10
 
+# Size of the cells of the rasterized disallowed areas, in mm.
+DISALLOWED_AREA_MASK_CELL_SIZE = 1.0
+# Maximum number of cells of the rasterized disallowed areas in either direction.
+DISALLOWED_AREA_MASK_MAX_CELLS = 1024
+
 
 def approximatedCircleVertices(r):
     """
@@ -67,6 +73,12 @@ class BuildVolume(SceneNode):
         self._disallowed_areas = []
         self._disallowed_area_mesh = None
 
+        # Prepared versions of the disallowed areas for fast intersection tests.
+        self._disallowed_area_batch = PolygonBatch([])
+        self._disallowed_area_mask = None
+        self._disallowed_area_mask_origin = None
+        self._disallowed_area_mask_cell_size = DISALLOWED_AREA_MASK_CELL_SIZE
+
         self.setCalculateBoundingBox(False)
         self._volume_aabb = None
 
@@ -92,6 +104,38 @@ class BuildVolume(SceneNode):
 
     def setDisallowedAreas(self, areas):
         self._disallowed_areas = areas
+        self._updateDisallowedAreaIndex()
+
+    ##  Get the disallowed areas rasterized into a grid over the build plate.
+    #
+    #   The rasterization is conservative, so every cell that is touched by a disallowed area is marked.
+    #   \return tuple of the numpy boolean mask (rows along the depth), the (x, y) origin of the grid and the size
+    #           of the cells, or None if there is no build volume.
+    def getDisallowedAreaMask(self):
+        if self._disallowed_area_mask is None:
+            return None
+        return self._disallowed_area_mask, self._disallowed_area_mask_origin, self._disallowed_area_mask_cell_size
+
+    ##  Check if a 2D polygon overlaps any of the disallowed areas.
+    #
+    #   Polygons that fall entirely in cells of the mask that are not touched by any disallowed area are accepted
+    #   without further tests. Otherwise all disallowed areas are tested at once.
+    #   \param polygon The Polygon to check, for instance the convex hull of a node.
+    #   \return True if the polygon intersects or touches a disallowed area.
+    def intersectsDisallowedAreas(self, polygon):
+        if not len(self._disallowed_area_batch):
+            return False
+
+        points = polygon.getPoints()
+        if self._disallowed_area_mask is not None:
+            first_cell = numpy.floor((points.min(axis = 0) - self._disallowed_area_mask_origin) / self._disallowed_area_mask_cell_size).astype(numpy.int64)
+            last_cell = numpy.floor((points.max(axis = 0) - self._disallowed_area_mask_origin) / self._disallowed_area_mask_cell_size).astype(numpy.int64)
+            rows, columns = self._disallowed_area_mask.shape
+            if (first_cell >= 0).all() and last_cell[0] < columns and last_cell[1] < rows:
+                if not self._disallowed_area_mask[first_cell[1]:last_cell[1] + 1, first_cell[0]:last_cell[0] + 1].any():
+                    return False
+
+        return bool(PolygonBatch([points]).intersectsBatch(self._disallowed_area_batch).any())
 
     def render(self, renderer):
         if not self.getMeshData():
@@ -157,15 +201,18 @@ class BuildVolume(SceneNode):
         disallowed_area_size = 0
         if self._disallowed_areas:
             mb = MeshBuilder()
-            color = Color(0.0, 0.0, 0.0, 0.15)
+            color = numpy.array([[0.0, 0.0, 0.0, 0.15]], numpy.float32)
             for polygon in self._disallowed_areas:
                 points = polygon.getPoints()
-                first = Vector(self._clamp(points[0][0], min_w, max_w), disallowed_area_height, self._clamp(points[0][1], min_d, max_d))
-                previous_point = Vector(self._clamp(points[0][0], min_w, max_w), disallowed_area_height, self._clamp(points[0][1], min_d, max_d))
-                for point in points:
-                    new_point = Vector(self._clamp(point[0], min_w, max_w), disallowed_area_height, self._clamp(point[1], min_d, max_d))
-                    mb.addFace(first, previous_point, new_point, color = color)
-                    previous_point = new_point
+
+                # Fill the area with a fan of triangles around its first point, clamped to the build plate.
+                vertices = numpy.empty((len(points), 3), numpy.float32)
+                vertices[:, 0] = numpy.clip(points[:, 0], min_w, max_w)
+                vertices[:, 1] = disallowed_area_height
+                vertices[:, 2] = numpy.clip(points[:, 1], min_d, max_d)
+                fan = numpy.arange(1, len(points), dtype = numpy.int32)
+                indices = numpy.stack((numpy.zeros_like(fan), fan - 1, fan), axis = 1)
+                mb.addFacesWithColor(vertices, indices, numpy.repeat(color, len(points), axis = 0))
 
                 # Find the largest disallowed area to exclude it from the maximum scale bounds.
                 # This is a very nasty hack. This pretty much only works for UM machines.
@@ -180,6 +227,8 @@ class BuildVolume(SceneNode):
         else:
             self._disallowed_area_mesh = None
 
+        self._updateDisallowedAreaIndex()
+
         self._volume_aabb = AxisAlignedBox(
             minimum = Vector(min_w, min_h - 1.0, min_d),
             maximum = Vector(max_w, max_h - self._raft_thickness, max_d))
@@ -280,8 +329,8 @@ class BuildVolume(SceneNode):
         if not self._active_container_stack:
             return
 
-        disallowed_areas = copy.deepcopy(
-            self._active_container_stack.getProperty("machine_disallowed_areas", "value"))
+        # The areas themselves are not modified, so a shallow copy of the list is enough.
+        disallowed_areas = list(self._active_container_stack.getProperty("machine_disallowed_areas", "value") or [])
         areas = []
 
         # Add extruder prime locations as disallowed areas.
@@ -350,6 +399,29 @@ class BuildVolume(SceneNode):
 
         self._disallowed_areas = areas
 
+    ##  Prepare the disallowed areas for the intersection tests of intersectsDisallowedAreas.
+    def _updateDisallowedAreaIndex(self):
+        self._disallowed_area_batch = PolygonBatch([area.getPoints() for area in self._disallowed_areas])
+        self._disallowed_area_mask = None
+        if not self._width or not self._depth:
+            return
+
+        # Cover the build plate and all areas, as some of them may extend past the edge of the build plate.
+        minimum = numpy.array([-self._width / 2, -self._depth / 2])
+        maximum = numpy.array([self._width / 2, self._depth / 2])
+        for area in self._disallowed_areas:
+            points = area.getPoints()
+            if len(points):
+                minimum = numpy.minimum(minimum, points.min(axis = 0))
+                maximum = numpy.maximum(maximum, points.max(axis = 0))
+
+        cell_size = max(DISALLOWED_AREA_MASK_CELL_SIZE, (maximum - minimum).max() / DISALLOWED_AREA_MASK_MAX_CELLS)
+        columns, rows = numpy.ceil((maximum - minimum) / cell_size).astype(numpy.int64) + 1
+
+        self._disallowed_area_mask = self._disallowed_area_batch.rasterize(minimum, cell_size, (rows, columns))
+        self._disallowed_area_mask_origin = minimum
+        self._disallowed_area_mask_cell_size = cell_size
+
     ##  Convenience function to calculate the size of the bed adhesion in directions x, y.
     def _getBedAdhesionSize(self, container_stack):
         skirt_size = 0.0
@@ -372,8 +444,5 @@ class BuildVolume(SceneNode):
 
         return skirt_size
 
-    def _clamp(self, value, min_value, max_value):
-        return max(min(value, max_value), min_value)
-
     _skirt_settings = ["adhesion_type", "skirt_gap", "skirt_line_count", "skirt_brim_line_width", "brim_width", "brim_line_count", "raft_margin", "draft_shield_enabled", "draft_shield_dist", "xy_offset"]
     _raft_settings = ["adhesion_type", "raft_base_thickness", "raft_interface_thickness", "raft_surface_layers", "raft_surface_thickness", "raft_airgap"]
@@ -14,6 +14,7 @@ class ConvexHullDecorator(SceneNodeDecorator):
 
         self._convex_hull_node = None
         self._init2DConvexHullCache()
+        self._initHeadHullCache()
 
         self._global_stack = None
 
@@ -54,8 +55,8 @@ class ConvexHullDecorator(SceneNodeDecorator):
         hull = self._compute2DConvexHull()
 
         if self._global_stack and self._node:
-            if self._global_stack.getProperty("print_sequence", "value") == "one_at_a_time" and not self._node.getParent().callDecoration("isGroup"):
-                hull = hull.getMinkowskiHull(Polygon(numpy.array(self._global_stack.getProperty("machine_head_polygon", "value"), numpy.float32)))
+            if self._isPrintedOneAtATime():
+                hull = self._getCachedHeadHull("head", hull, lambda h: h.getMinkowskiHull(self._getHeadPolygon()))
         return hull
 
     ##  Get the convex hull of the node with the full head size
@@ -73,10 +74,9 @@ class ConvexHullDecorator(SceneNodeDecorator):
             return None
 
         if self._global_stack:
-            if self._global_stack.getProperty("print_sequence", "value") == "one_at_a_time" and not self._node.getParent().callDecoration("isGroup"):
-                head_with_fans = self._compute2DConvexHeadMin()
-                head_with_fans_with_adhesion_margin = self._add2DAdhesionMargin(head_with_fans)
-                return head_with_fans_with_adhesion_margin
+            if self._isPrintedOneAtATime():
+                return self._getCachedHeadHull("head_min_with_margin", self._compute2DConvexHull(),
+                                               lambda h: self._add2DAdhesionMargin(self._compute2DConvexHeadMin()))
         return None
 
     ##  Get convex hull of the node
@@ -87,8 +87,7 @@ class ConvexHullDecorator(SceneNodeDecorator):
             return None
 
         if self._global_stack:
-            if self._global_stack.getProperty("print_sequence", "value") == "one_at_a_time" and not self._node.getParent().callDecoration("isGroup"):
-
+            if self._isPrintedOneAtATime():
                 # Printing one at a time and it's not an object in a group
                 return self._compute2DConvexHull()
         return None
@@ -97,21 +96,71 @@ class ConvexHullDecorator(SceneNodeDecorator):
         controller = Application.getInstance().getController()
         root = controller.getScene().getRoot()
         if self._node is None or controller.isToolOperationActive() or not self.__isDescendant(root, self._node):
-            if self._convex_hull_node:
+            # Hide the hull, but keep the node around so it can be reused once the hull is shown again.
+            if self._convex_hull_node and self._convex_hull_node.getParent():
                 self._convex_hull_node.setParent(None)
-                self._convex_hull_node = None
             return
 
         convex_hull = self.getConvexHull()
-        if self._convex_hull_node:
-            self._convex_hull_node.setParent(None)
-        hull_node = ConvexHullNode.ConvexHullNode(self._node, convex_hull, self._raft_thickness, root)
-        self._convex_hull_node = hull_node
+        if self._convex_hull_node and self._convex_hull_node.getWatchedNode() is self._node:
+            self._convex_hull_node.setHull(convex_hull, self._raft_thickness)
+            if self._convex_hull_node.getParent() is not root:
+                self._convex_hull_node.setParent(root)
+        else:
+            if self._convex_hull_node:
+                self._convex_hull_node.setParent(None)
+            self._convex_hull_node = ConvexHullNode.ConvexHullNode(self._node, convex_hull, self._raft_thickness, root)
 
     def _onSettingValueChanged(self, key, property_name):
         if key in self._affected_settings and property_name == "value":
+            self._initHeadHullCache()
             self._onChanged()
 
+    def _onContainersChanged(self, *args):
+        self._initHeadHullCache()
+        self._onChanged()
+
+    ##  Reset the cache of head related polygons.
+    #
+    #   The head polygons only depend on the values of _affected_settings, so they are computed once per settings
+    #   snapshot. The Minkowski hulls built from them are additionally keyed on the identity of the 2D convex hull
+    #   they were computed from, which only changes when the node is moved or its mesh changes.
+    def _initHeadHullCache(self):
+        self._head_setting_values = {}
+        self._head_polygons = {}
+        self._head_hull_results = {}
+
+    ##  Get the value of a setting, reading it from the global stack only once per settings snapshot.
+    def _getSettingValue(self, key):
+        if key not in self._head_setting_values:
+            self._head_setting_values[key] = self._global_stack.getProperty(key, "value")
+        return self._head_setting_values[key]
+
+    def _isPrintedOneAtATime(self):
+        return self._getSettingValue("print_sequence") == "one_at_a_time" and not self._node.getParent().callDecoration("isGroup")
+
+    ##  Get a head related hull of the 2D convex hull, reusing the previous result if the hull did not change.
+    #
+    #   \param name The kind of head hull to get.
+    #   \param hull The 2D convex hull of the node.
+    #   \param compute Function that computes the head hull from the 2D convex hull.
+    def _getCachedHeadHull(self, name, hull, compute):
+        if hull is None:
+            return None
+
+        cached = self._head_hull_results.get(name)
+        if cached is not None and cached[0] is hull:
+            return cached[1]
+
+        result = compute(hull)
+        self._head_hull_results[name] = (hull, result)
+        return result
+
+    def _getCachedHeadPolygon(self, name, compute):
+        if name not in self._head_polygons:
+            self._head_polygons[name] = compute()
+        return self._head_polygons[name]
+
     def _init2DConvexHullCache(self):
         # Cache for the group code path in _compute2DConvexHull()
         self._2d_convex_hull_group_child_polygon = None
@@ -204,41 +253,52 @@ class ConvexHullDecorator(SceneNodeDecorator):
 
             return rounded_hull
 
+    def _getHeadPolygon(self):
+        return self._getCachedHeadPolygon("head", lambda: Polygon(numpy.array(self._getSettingValue("machine_head_polygon"), numpy.float32)))
+
     def _getHeadAndFans(self):
-        return Polygon(numpy.array(self._global_stack.getProperty("machine_head_with_fans_polygon", "value"), numpy.float32))
+        return self._getCachedHeadPolygon("head_and_fans", lambda: Polygon(numpy.array(self._getSettingValue("machine_head_with_fans_polygon"), numpy.float32)))
+
+    def _getMirroredHeadAndFans(self):
+        def compute():
+            head_and_fans = self._getHeadAndFans()
+            mirrored = head_and_fans.mirror([0, 0], [0, 1]).mirror([0, 0], [1, 0])  # Mirror horizontally & vertically.
+            return head_and_fans.intersectionConvexHulls(mirrored)
+        return self._getCachedHeadPolygon("mirrored_head_and_fans", compute)
 
     def _compute2DConvexHeadFull(self):
-        return self._compute2DConvexHull().getMinkowskiHull(self._getHeadAndFans())
+        return self._getCachedHeadHull("head_full", self._compute2DConvexHull(), lambda h: h.getMinkowskiHull(self._getHeadAndFans()))
 
     def _compute2DConvexHeadMin(self):
-        headAndFans = self._getHeadAndFans()
-        mirrored = headAndFans.mirror([0, 0], [0, 1]).mirror([0, 0], [1, 0])  # Mirror horizontally & vertically.
-        head_and_fans = self._getHeadAndFans().intersectionConvexHulls(mirrored)
-
         # Min head hull is used for the push free
-        min_head_hull = self._compute2DConvexHull().getMinkowskiHull(head_and_fans)
-        return min_head_hull
+        return self._getCachedHeadHull("head_min", self._compute2DConvexHull(), lambda h: h.getMinkowskiHull(self._getMirroredHeadAndFans()))
 
     ##  Compensate given 2D polygon with adhesion margin
     #   \return 2D polygon with added margin
     def _add2DAdhesionMargin(self, poly):
+        extra_margin_polygon = self._getCachedHeadPolygon("adhesion_margin", self._computeAdhesionMarginPolygon)
+        if extra_margin_polygon is not None:
+            poly = poly.getMinkowskiHull(extra_margin_polygon)
+        return poly
+
+    ##  Create the polygon to grow a hull with to compensate for raft/skirt/brim
+    #   \return 2D polygon or None if no extra margin is needed.
+    def _computeAdhesionMarginPolygon(self):
         # Compensate for raft/skirt/brim
         # Add extra margin depending on adhesion type
-        adhesion_type = self._global_stack.getProperty("adhesion_type", "value")
+        adhesion_type = self._getSettingValue("adhesion_type")
         extra_margin = 0
-        machine_head_coords = numpy.array(
-            self._global_stack.getProperty("machine_head_with_fans_polygon", "value"),
-            numpy.float32)
+        machine_head_coords = self._getHeadAndFans().getPoints()
         head_y_size = abs(machine_head_coords).min()  # safe margin to take off in all directions
 
         if adhesion_type == "raft":
-            extra_margin = max(0, self._global_stack.getProperty("raft_margin", "value") - head_y_size)
+            extra_margin = max(0, self._getSettingValue("raft_margin") - head_y_size)
         elif adhesion_type == "brim":
-            extra_margin = max(0, self._global_stack.getProperty("brim_width", "value") - head_y_size)
+            extra_margin = max(0, self._getSettingValue("brim_width") - head_y_size)
         elif adhesion_type == "skirt":
             extra_margin = max(
-                0, self._global_stack.getProperty("skirt_gap", "value") +
-                   self._global_stack.getProperty("skirt_line_count", "value") * self._global_stack.getProperty("skirt_brim_line_width", "value") -
+                0, self._getSettingValue("skirt_gap") +
+                   self._getSettingValue("skirt_line_count") * self._getSettingValue("skirt_brim_line_width") -
                    head_y_size)
         # adjust head_and_fans with extra margin
         if extra_margin > 0:
@@ -253,9 +313,8 @@ class ConvexHullDecorator(SceneNodeDecorator):
                 [0, -extra_margin],
                 [-extra_margin * 0.707, -extra_margin * 0.707]
             ], numpy.float32))
-
-            poly = poly.getMinkowskiHull(extra_margin_polygon)
-        return poly
+            return extra_margin_polygon
+        return None
 
     def _roundHull(self, convex_hull):
         return convex_hull.getMinkowskiHull(Polygon(numpy.array([[-0.5, -0.5], [-0.5, 0.5], [0.5, 0.5], [0.5, -0.5]], numpy.float32)))
@@ -267,13 +326,14 @@ class ConvexHullDecorator(SceneNodeDecorator):
     def _onGlobalStackChanged(self):
         if self._global_stack:
             self._global_stack.propertyChanged.disconnect(self._onSettingValueChanged)
-            self._global_stack.containersChanged.disconnect(self._onChanged)
+            self._global_stack.containersChanged.disconnect(self._onContainersChanged)
 
         self._global_stack = Application.getInstance().getGlobalContainerStack()
+        self._initHeadHullCache()
 
         if self._global_stack:
             self._global_stack.propertyChanged.connect(self._onSettingValueChanged)
-            self._global_stack.containersChanged.connect(self._onChanged)
+            self._global_stack.containersChanged.connect(self._onContainersChanged)
 
             self._onChanged()
 
@@ -288,4 +348,5 @@ class ConvexHullDecorator(SceneNodeDecorator):
     _affected_settings = [
         "adhesion_type", "raft_base_thickness", "raft_interface_thickness", "raft_surface_layers",
         "raft_surface_thickness", "raft_airgap", "raft_margin", "print_sequence",
-        "skirt_gap", "skirt_line_count", "skirt_brim_line_width", "skirt_distance"]
+        "skirt_gap", "skirt_line_count", "skirt_brim_line_width", "skirt_distance", "brim_width",
+        "machine_head_polygon", "machine_head_with_fans_polygon"]
@@ -8,6 +8,8 @@ from UM.Mesh.MeshBuilder import MeshBuilder  # To create a mesh to display the c
 
 from UM.View.GL.OpenGL import OpenGL
 
+import numpy
+
 class ConvexHullNode(SceneNode):
     ##  Convex hull node is a special type of scene node that is used to display an area, to indicate the
     #   location an object uses on the buildplate. This area (or area's in case of one at a time printing) is
@@ -33,20 +35,43 @@ class ConvexHullNode(SceneNode):
         # The node this mesh is "watching"
         self._node = node
         self._convex_hull_head_mesh = None
+        self._convex_hull_head_points = None
 
         self._node.decoratorsChanged.connect(self._onNodeDecoratorsChanged)
         self._onNodeDecoratorsChanged(self._node)
 
+        self._hull = None
+        self._hull_points = None
+        self.setHull(hull, thickness)
+
+    ##  Change the hull that is displayed by this node.
+    #
+    #   The node is kept around for as long as the watched node exists, so the meshes are only rebuilt when the
+    #   points of the hull or the thickness actually changed.
+    def setHull(self, hull, thickness):
+        hull_points = hull.getPoints() if hull else None
+        thickness_changed = thickness != self._thickness
         self._hull = hull
-        if self._hull:
-            hull_mesh_builder = MeshBuilder()
+        self._thickness = thickness
+
+        if thickness_changed or not self._pointsEqual(hull_points, self._hull_points):
+            self._hull_points = hull_points
+
+            hull_mesh = None
+            if hull_points is not None:
+                hull_mesh_builder = MeshBuilder()
 
-            if hull_mesh_builder.addConvexPolygonExtrusion(
-                self._hull.getPoints()[::-1],  # bottom layer is reversed
-                self._mesh_height-thickness, self._mesh_height, color=self._color):
+                if hull_mesh_builder.addConvexPolygonExtrusion(
+                    hull_points[::-1],  # bottom layer is reversed
+                    self._mesh_height - thickness, self._mesh_height, color = self._color):
 
-                hull_mesh = hull_mesh_builder.build()
-                self.setMeshData(hull_mesh)
+                    hull_mesh = hull_mesh_builder.build()
+            self.setMeshData(hull_mesh)
+
+        if thickness_changed:
+            # The head mesh is placed at the bottom of the hull, so it needs to be rebuilt too.
+            self._convex_hull_head_points = None
+        self._updateConvexHullHeadMesh()
 
     def getHull(self):
         return self._hull
@@ -74,12 +99,26 @@ class ConvexHullNode(SceneNode):
     def _onNodeDecoratorsChanged(self, node):
         self._color = Color(35, 35, 35, 0.5)
 
-        convex_hull_head = self._node.callDecoration("getConvexHullHead")
-        if convex_hull_head:
-            convex_hull_head_builder = MeshBuilder()
-            convex_hull_head_builder.addConvexPolygon(convex_hull_head.getPoints(), self._mesh_height - self._thickness)
-            self._convex_hull_head_mesh = convex_hull_head_builder.build()
+        self._updateConvexHullHeadMesh()
 
         if not node:
             return
 
+    def _updateConvexHullHeadMesh(self):
+        convex_hull_head = self._node.callDecoration("getConvexHullHead")
+        if not convex_hull_head:
+            self._convex_hull_head_mesh = None
+            self._convex_hull_head_points = None
+            return
+
+        convex_hull_head_points = convex_hull_head.getPoints()
+        if not self._pointsEqual(convex_hull_head_points, self._convex_hull_head_points):
+            convex_hull_head_builder = MeshBuilder()
+            convex_hull_head_builder.addConvexPolygon(convex_hull_head_points, self._mesh_height - self._thickness)
+            self._convex_hull_head_mesh = convex_hull_head_builder.build()
+            self._convex_hull_head_points = convex_hull_head_points
+
+    def _pointsEqual(self, points, other_points):
+        if points is None or other_points is None:
+            return points is other_points
+        return numpy.array_equal(points, other_points)
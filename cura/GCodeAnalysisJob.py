@@ -0,0 +1,18 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Job import Job
+
+##  Analyses g-code in the background, with a GCodeAnalyzer.
+#
+#   The result of the job is the GCodeAnalysis.
+class GCodeAnalysisJob(Job):
+    ##  \param gcode_list List of strings of g-code.
+    #   \param analyzer The GCodeAnalyzer to analyse the g-code with.
+    def __init__(self, gcode_list, analyzer):
+        super().__init__()
+        self._gcode_list = gcode_list
+        self._analyzer = analyzer
+
+    def run(self):
+        self.setResult(self._analyzer.analyse(self._gcode_list))
@@ -0,0 +1,178 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+from cura.GCodeParser import GCodeParser
+
+##  Computes statistics per layer of g-code.
+#
+#   The g-code is parsed into arrays of moves by a GCodeParser, so the statistics of all moves are computed at once.
+#   The time of a move is computed from a trapezoidal speed profile with the acceleration of the machine, where the
+#   speed at the corners depends on the angle between the moves.
+class GCodeAnalyzer:
+    ##  Create an analyzer.
+    #
+    #   \param acceleration Acceleration of the machine in mm/s^2.
+    #   \param max_feedrate Maximum speed of the machine in mm/s.
+    #   \param jerk Speed change in mm/s that the machine makes instantly, which is the minimum speed at a corner.
+    #   \param default_feedrate Feedrate in mm/min of the moves before the first F parameter.
+    #   \param block_size Number of bytes of g-code to parse at once.
+    def __init__(self, acceleration = 4000, max_feedrate = 500, jerk = 20, default_feedrate = 1500, block_size = 256 * 1024):
+        self._acceleration = acceleration
+        self._max_feedrate = max_feedrate
+        self._jerk = jerk
+        self._default_feedrate = default_feedrate
+        self._block_size = block_size
+
+    ##  Analyse g-code.
+    #
+    #   \param gcode The g-code, as a string, bytes, a list of strings such as the gcode_list of the scene or a binary
+    #          file object.
+    #   \return GCodeAnalysis with the statistics of the g-code.
+    def analyse(self, gcode):
+        layer_numbers = [numpy.zeros(0, dtype = int)]
+        deltas = [numpy.zeros((0, 4))]
+        feedrates = [numpy.zeros(0)]
+        move_layers = [numpy.zeros(0, dtype = int)]
+        dwell_layers = [numpy.zeros(0, dtype = int)]
+        dwell_times = [numpy.zeros(0)]
+        for moves in GCodeParser(self._default_feedrate, self._block_size).parse(gcode):
+            layer_numbers.append(moves.layer_numbers)
+            deltas.append(moves.end_positions - moves.start_positions)
+            feedrates.append(moves.feedrates)
+            move_layers.append(moves.layers)
+            dwell_layers.append(moves.dwell_layers)
+            dwell_times.append(moves.dwell_times)
+
+        deltas = numpy.concatenate(deltas)
+        speeds = numpy.minimum(numpy.concatenate(feedrates) / 60, self._max_feedrate)
+        distances = numpy.sqrt(numpy.einsum("ij,ij->i", deltas[:, :3], deltas[:, :3]))
+        extrusions = deltas[:, 3]
+        times = self._computeMoveTimes(deltas[:, :3], distances, numpy.where(distances > 0, distances, numpy.abs(extrusions)), speeds)
+
+        return GCodeAnalysis(numpy.concatenate(layer_numbers), numpy.concatenate(move_layers), distances, extrusions, speeds, times,
+                             numpy.concatenate(dwell_layers), numpy.concatenate(dwell_times))
+
+    ##  Compute the time of every move, with a trapezoidal speed profile.
+    #
+    #   \param directions The vectors of the moves.
+    #   \param distances The lengths of the moves in mm.
+    #   \param lengths The lengths of the moves, or of the extrusion for moves that only extrude.
+    #   \param speeds The speeds of the moves in mm/s.
+    def _computeMoveTimes(self, directions, distances, lengths, speeds):
+        moving = lengths > 0
+        directions = directions[moving]
+        distances = distances[moving]
+        lengths = lengths[moving]
+        speeds = numpy.maximum(speeds[moving], 1e-3)
+
+        # The speed at a corner is the lowest speed of the two moves if they are in a straight line, and drops to the
+        # jerk when they go in opposite directions.
+        units = directions / numpy.maximum(distances, 1e-9)[:, numpy.newaxis]
+        cosines = numpy.einsum("ij,ij->i", units[1:], units[:-1])
+        lowest_speeds = numpy.minimum(speeds[1:], speeds[:-1])
+        corner_speeds = numpy.minimum(lowest_speeds, numpy.maximum(self._jerk, lowest_speeds * (1 + cosines) / 2))
+        start_speeds = numpy.concatenate(([min(self._jerk, speeds[0])] if len(speeds) else [], corner_speeds))
+        end_speeds = numpy.concatenate((corner_speeds, [min(self._jerk, speeds[-1])] if len(speeds) else []))
+
+        acceleration = self._acceleration
+        accelerate_distances = (speeds ** 2 - start_speeds ** 2) / (2 * acceleration)
+        decelerate_distances = (speeds ** 2 - end_speeds ** 2) / (2 * acceleration)
+        cruise_distances = lengths - accelerate_distances - decelerate_distances
+
+        # Moves that reach their speed.
+        times = (speeds - start_speeds) / acceleration + (speeds - end_speeds) / acceleration + cruise_distances / speeds
+
+        # Moves that are too short to reach their speed accelerate to a peak and decelerate right away.
+        short = cruise_distances < 0
+        peak_speeds = numpy.sqrt((2 * acceleration * lengths[short] + start_speeds[short] ** 2 + end_speeds[short] ** 2) / 2)
+        short_times = (2 * peak_speeds - start_speeds[short] - end_speeds[short]) / acceleration
+        # If the peak is below the start or end speed the planner can't keep that speed, so use the average speed.
+        unreachable = peak_speeds < numpy.maximum(start_speeds[short], end_speeds[short])
+        short_times[unreachable] = 2 * lengths[short][unreachable] / (start_speeds[short][unreachable] + end_speeds[short][unreachable])
+        times[short] = short_times
+
+        result = numpy.zeros(len(moving))
+        result[moving] = times
+        return result
+
+##  The statistics of analysed g-code.
+#
+#   The statistics per layer are indexed by the order of the layers in the g-code. When objects are printed one at a
+#   time the layer numbers repeat for every object, so getPrintTimesPerLayerNumber gives the times in the order of the
+#   layers in the layer view instead. Commands before the first layer, such as the start g-code, are only counted in the
+#   totals. Commands after the last layer, such as the end g-code, are counted in the last layer.
+class GCodeAnalysis:
+    def __init__(self, layer_numbers, move_layers, distances, extrusions, speeds, times, dwell_layers, dwell_times):
+        self._layer_numbers = layer_numbers.astype(int)
+        self._move_layers = move_layers
+        self._distances = distances
+        self._extrusions = extrusions
+        self._speeds = speeds
+        self._times = times
+        self._dwell_layers = dwell_layers
+        self._dwell_times = dwell_times
+
+    def getLayerCount(self):
+        return len(self._layer_numbers)
+
+    ##  Get the numbers of the layers, as in the ";LAYER:" comments. Raft layers have negative numbers.
+    def getLayerNumbers(self):
+        return self._layer_numbers
+
+    def getMoveCount(self):
+        return len(self._times)
+
+    ##  Get the length of filament that is extruded in every layer, in mm.
+    #
+    #   Retractions are subtracted, so this is the net amount of filament that a layer uses.
+    def getLayerExtrusionLengths(self):
+        return self._sumPerLayer(self._move_layers, self._extrusions)
+
+    ##  Get the distance that the nozzle moves while extruding in every layer, in mm.
+    def getLayerPrintDistances(self):
+        return self._sumPerLayer(self._move_layers, numpy.where(self._extrusions > 0, self._distances, 0))
+
+    ##  Get the distance that the nozzle moves without extruding in every layer, in mm.
+    def getLayerTravelDistances(self):
+        return self._sumPerLayer(self._move_layers, numpy.where(self._extrusions > 0, 0, self._distances))
+
+    ##  Get the time that every layer takes, in seconds.
+    def getLayerPrintTimes(self):
+        return self._sumPerLayer(self._move_layers, self._times) + self._sumPerLayer(self._dwell_layers, self._dwell_times)
+
+    ##  Get the time of the layers with every layer number, in seconds.
+    #
+    #   The times of layers with the same number, such as those of objects that are printed one at a time, are added.
+    #   \return The times, indexed by the layer number minus the lowest layer number, like the layers in the layer view.
+    def getPrintTimesPerLayerNumber(self):
+        if not self.getLayerCount():
+            return numpy.zeros(0)
+        return numpy.bincount(self._layer_numbers - self._layer_numbers.min(), weights = self.getLayerPrintTimes())
+
+    ##  Get the time that the whole g-code takes, in seconds.
+    def getTotalPrintTime(self):
+        return float(self._times.sum() + self._dwell_times.sum())
+
+    ##  Get the length of filament that the whole g-code uses, in mm.
+    def getTotalExtrusionLength(self):
+        return float(self._extrusions.sum())
+
+    ##  Get a histogram of the time spent at each speed.
+    #
+    #   \param bins The number of bins or the edges of the bins, in mm/s, as for numpy.histogram.
+    #   \param layer The index of the layer to get the histogram of, or None for the whole g-code.
+    #   \param extruding_only Whether to only count the moves that extrude.
+    #   \return Tuple of the time in seconds in every bin and the edges of the bins.
+    def getFeedrateHistogram(self, bins = 10, layer = None, extruding_only = True):
+        selection = self._times > 0
+        if layer is not None:
+            selection &= self._move_layers == layer
+        if extruding_only:
+            selection &= (self._extrusions > 0) & (self._distances > 0)
+        return numpy.histogram(self._speeds[selection], bins = bins, weights = self._times[selection])
+
+    def _sumPerLayer(self, layers, values):
+        # Shift the layers by one, so the commands before the first layer are in the first bin and can be dropped.
+        return numpy.bincount(layers + 1, weights = values, minlength = self.getLayerCount() + 1)[1:]
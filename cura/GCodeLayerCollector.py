@@ -0,0 +1,134 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import math
+
+import numpy
+
+##  A continuous path of moves with the same extruder.
+class GCodePath:
+    def __init__(self, extruder, line_types, points, line_widths):
+        self.extruder = extruder
+        self.line_types = line_types  # The type of every line.
+        self.points = points  # The start point and the end points of the lines, in g-code coordinates.
+        self.line_widths = line_widths  # The width of every line in mm.
+
+##  The paths of a layer of g-code.
+class GCodeLayer:
+    def __init__(self, index, height, thickness, paths):
+        self.index = index
+        self.height = height  # In mm.
+        self.thickness = thickness  # In mm.
+        self.paths = paths
+
+##  Collects the moves of g-code into layers of paths, to show g-code files in the layer view.
+#
+#   The moves are added one block at a time, as they come from a GCodeParser, and are kept as compact arrays per
+#   layer. The layers are the ";LAYER:" comments that CuraEngine writes. Moves before the first of those, such as
+#   the start g-code, are left out. G-code from other slicers that has no layer comments is split into layers at every
+#   height where it extrudes.
+#
+#   The width of a line is computed from the amount of filament that it extrudes and the thickness of its layer.
+class GCodeLayerCollector:
+    ##  Create a collector.
+    #
+    #   \param type_map Array with the type of line to use for every ";TYPE:" comment, with the type for lines before
+    #          the first of those comments first and then the types for GCodeParser.LineTypes.
+    #   \param travel_type The type of line for moves that don't extrude.
+    #   \param retraction_type The type of line for moves that don't extrude while the filament is retracted.
+    #   \param filament_diameter The diameter of the filament in mm.
+    #   \param travel_width The width of lines that don't extrude in mm.
+    def __init__(self, type_map, travel_type, retraction_type, filament_diameter = 2.85, travel_width = 0.1):
+        self._type_map = numpy.asarray(type_map, dtype = numpy.uint8)
+        self._travel_type = travel_type
+        self._retraction_type = retraction_type
+        self._filament_area = math.pi * (filament_diameter / 2) ** 2
+        self._travel_width = travel_width
+
+        self._layer_moves = {}  # Layer index to list of move arrays, for the layers of the layer comments.
+        self._height_moves = {}  # Layer index to list of move arrays, for layers split by height.
+        self._retracted = False
+        self._height = None  # Height of the last extruding move.
+        self._height_layer = -1
+
+    ##  Add the moves of a block of g-code.
+    #   \param moves GCodeMoves from a GCodeParser.
+    def addMoves(self, moves):
+        deltas = moves.end_positions - moves.start_positions
+        distances = numpy.sqrt(numpy.einsum("ij,ij->i", deltas[:, :3], deltas[:, :3]))
+        extrusions = deltas[:, 3]
+
+        # The filament is retracted after a move that retracts until a move that extrudes.
+        changes = numpy.flatnonzero(extrusions)
+        if len(changes):
+            last_change = numpy.full(len(extrusions), -1)
+            last_change[changes] = changes
+            numpy.maximum.accumulate(last_change, out = last_change)
+            retracted = numpy.where(last_change >= 0, extrusions[last_change] < 0, self._retracted)
+            self._retracted = bool(extrusions[changes[-1]] < 0)
+        else:
+            retracted = numpy.full(len(extrusions), self._retracted)
+
+        extruding = (extrusions > 0) & (distances > 0)
+        line_types = numpy.where(retracted, self._retraction_type, self._travel_type).astype(numpy.uint8)
+        line_types[extruding] = self._type_map[moves.line_types[extruding] + 1]
+
+        # A new layer starts at every extruding move at another height than the last one.
+        heights = moves.end_positions[:, 2]
+        extruding_heights = heights[extruding]
+        new_heights = numpy.empty(len(extruding_heights), dtype = bool)
+        new_heights[:1] = extruding_heights[:1] != self._height
+        new_heights[1:] = extruding_heights[1:] != extruding_heights[:-1]
+        height_starts = numpy.zeros(len(extrusions), dtype = int)
+        height_starts[extruding] = new_heights
+        height_layers = self._height_layer + numpy.cumsum(height_starts)
+        if len(extruding_heights):
+            self._height = extruding_heights[-1]
+        if len(height_layers):
+            self._height_layer = int(height_layers[-1])
+
+        # Moves that don't move the nozzle are not drawn.
+        moving = distances > 0
+        columns = (moves.start_positions[moving, :3].astype(numpy.float32), moves.end_positions[moving, :3].astype(numpy.float32),
+                   line_types[moving], numpy.where(extruding, extrusions, 0)[moving].astype(numpy.float32),
+                   distances[moving].astype(numpy.float32), moves.extruders[moving])
+        marked = moves.layers[moving] >= 0
+        self._addToLayers(self._layer_moves, moves.layers[moving][marked], [column[marked] for column in columns])
+        if not self._layer_moves:
+            # Moves before the first extruding move are not in a layer.
+            unmarked = ~marked & (height_layers[moving] >= 0)
+            self._addToLayers(self._height_moves, height_layers[moving][unmarked], [column[unmarked] for column in columns])
+
+    ##  Get the layers of all moves that were added.
+    #   \return List of GCodeLayer, from the bottom to the top.
+    def getLayers(self):
+        layer_moves = self._layer_moves if self._layer_moves else self._height_moves
+        layers = []
+        previous_height = 0
+        for index, layer in enumerate(sorted(layer_moves)):
+            starts, ends, line_types, extrusions, distances, extruders = [numpy.concatenate(column) for column in zip(*layer_moves[layer])]
+
+            extruding = extrusions > 0
+            height = float(ends[extruding, 2].max()) if extruding.any() else previous_height
+            thickness = max(height - previous_height, 0.01)
+            previous_height = height
+
+            line_widths = numpy.full(len(line_types), self._travel_width, dtype = numpy.float32)
+            line_widths[extruding] = extrusions[extruding] * self._filament_area / (distances[extruding] * thickness)
+
+            # A new path starts where the extruder changes or where a move doesn't start at the end of the last one.
+            breaks = numpy.flatnonzero((extruders[1:] != extruders[:-1]) | (starts[1:] != ends[:-1]).any(axis = 1)) + 1
+            paths = []
+            for begin, end in zip(numpy.concatenate(([0], breaks)), numpy.concatenate((breaks, [len(line_types)]))):
+                points = numpy.concatenate((starts[begin:begin + 1], ends[begin:end]))
+                paths.append(GCodePath(int(extruders[begin]), line_types[begin:end], points, line_widths[begin:end]))
+            layers.append(GCodeLayer(index, height, thickness, paths))
+        return layers
+
+    def _addToLayers(self, layer_moves, layers, columns):
+        if not len(layers):
+            return
+        # The layers only go up, so the moves of a layer are one slice of the block.
+        boundaries = numpy.flatnonzero(layers[1:] != layers[:-1]) + 1
+        for begin, end in zip(numpy.concatenate(([0], boundaries)), numpy.concatenate((boundaries, [len(layers)]))):
+            layer_moves.setdefault(int(layers[begin]), []).append([column[begin:end] for column in columns])
@@ -0,0 +1,303 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+##  The moves in a block of g-code, as parsed by GCodeParser.
+#
+#   All arrays have one row per move, in the order of the g-code. Positions are in the coordinates of the g-code, with
+#   the extruder position as fourth column.
+class GCodeMoves:
+    def __init__(self, start_positions, end_positions, feedrates, layers, line_types, extruders, layer_numbers, dwell_layers, dwell_times):
+        self.start_positions = start_positions
+        self.end_positions = end_positions
+        self.feedrates = feedrates  # In mm/min.
+        self.layers = layers  # Index of the ";LAYER:" comment before the move, or -1 before the first one.
+        self.line_types = line_types  # Index in GCodeParser.LineTypes of the last ";TYPE:" comment, or -1.
+        self.extruders = extruders
+        self.layer_numbers = layer_numbers  # The numbers of the layers that start in this block.
+        self.dwell_layers = dwell_layers  # The layers of the G4 commands in this block.
+        self.dwell_times = dwell_times  # The times of the G4 commands in this block, in seconds.
+
+##  Parses g-code into arrays of moves, one block at a time.
+#
+#   The g-code is scanned as an array of bytes, without regular expressions and without a loop in Python over its
+#   lines. The newlines and comments give the extent of the code on every line, the first letter and number of a line
+#   give the command and every parameter letter after it starts a parameter, whether or not spaces separate them. All numbers are parsed at once, one
+#   column of characters at a time. The text is handled in blocks of block_size bytes, so the arrays of a block stay
+#   small enough for the cache of the processor and a file never has to be in memory as a whole.
+#
+#   The commands that change the position (G0, G1, G28 and G92) are then evaluated together. Absolute and relative
+#   positioning (G90, G91, M82 and M83), the feedrate, the extruder (T) and the ";LAYER:" and ";TYPE:" comments that
+#   CuraEngine writes are forward-filled over the moves. The parser keeps this state from one block to the next.
+class GCodeParser:
+    ##  The names of the ";TYPE:" comments that CuraEngine writes.
+    LineTypes = ["WALL-OUTER", "WALL-INNER", "SKIN", "SUPPORT", "SKIRT", "FILL", "SUPPORT-INTERFACE"]
+
+    ##  Create a parser.
+    #
+    #   \param default_feedrate Feedrate in mm/min of the moves before the first F parameter.
+    #   \param block_size Number of bytes of g-code to parse at once.
+    def __init__(self, default_feedrate = 1500, block_size = 256 * 1024):
+        self._block_size = block_size
+
+        self._position = numpy.zeros(4)
+        self._relative = False
+        self._extruder_relative = False
+        self._feedrate = default_feedrate
+        self._layer = -1
+        self._line_type = -1
+        self._extruder = 0
+
+    ##  Parse g-code.
+    #
+    #   \param gcode The g-code, as a string, bytes, a list of strings such as the gcode_list of the scene or a binary
+    #          file object.
+    #   \return Generator of GCodeMoves, one for every block.
+    def parse(self, gcode):
+        if isinstance(gcode, str):
+            gcode = gcode.encode("utf-8")
+        elif isinstance(gcode, list):
+            gcode = "".join(gcode).encode("utf-8")
+
+        if isinstance(gcode, (bytes, bytearray)):
+            blocks = (gcode[start:start + self._block_size] for start in range(0, len(gcode), self._block_size))
+        else:
+            blocks = iter(lambda: gcode.read(self._block_size), b"")
+
+        remainder = b""
+        for block in blocks:
+            # Only parse whole lines. The rest of the last line is parsed with the next block.
+            end = block.rfind(b"\n") + 1
+            if end == 0:
+                remainder += block
+                continue
+            data = numpy.frombuffer(remainder + block[:end], dtype = numpy.uint8)
+            remainder = block[end:]
+            yield self._evaluate(*_parseBlock(data))
+
+        if remainder:
+            yield self._evaluate(*_parseBlock(numpy.frombuffer(remainder + b"\n", dtype = numpy.uint8)))
+
+    ##  Evaluate the commands of a block in order.
+    #
+    #   \param kinds The kind of every command.
+    #   \param parameters The parameters of every command, with NaN for the parameters that it doesn't have.
+    def _evaluate(self, kinds, parameters):
+        is_layer = kinds == _Kind.Layer
+        layer_numbers = parameters[is_layer, _parameter_index[b"P"]]
+        layers = self._layer + numpy.cumsum(is_layer)
+
+        is_mode = (kinds == _Kind.Relative) | (kinds == _Kind.Absolute)
+        relative = _forwardFill(kinds == _Kind.Relative, is_mode, self._relative)
+        is_extruder_mode = (kinds == _Kind.ExtruderRelative) | (kinds == _Kind.ExtruderAbsolute)
+        extruder_relative = _forwardFill(kinds == _Kind.ExtruderRelative, is_extruder_mode, self._extruder_relative)
+
+        is_move = kinds == _Kind.Move
+        is_home = kinds == _Kind.Home
+        is_position = is_move | is_home | (kinds == _Kind.SetPosition)
+
+        # Homing without axes homes all of them.
+        home_all = is_home & numpy.isnan(parameters[:, :3]).all(axis = 1)
+
+        positions = numpy.empty((len(kinds), 4))
+        for axis in range(4):
+            values = parameters[:, axis]
+            has_value = is_position & ~numpy.isnan(values)
+            if axis < 3:
+                has_value |= home_all
+                values = numpy.where(is_home, 0, values)
+            axis_relative = (relative | extruder_relative if axis == 3 else relative) & is_move
+            offsets = numpy.cumsum(numpy.where(has_value & axis_relative, values, 0))
+            # The position is the last absolute value plus the relative moves after it.
+            absolute = has_value & ~axis_relative
+            positions[:, axis] = _forwardFill(values - offsets, absolute, self._position[axis]) + offsets
+
+        feedrate_values = parameters[:, _parameter_index[b"F"]]
+        feedrates = _forwardFill(feedrate_values, is_move & ~numpy.isnan(feedrate_values), self._feedrate)
+        is_type = kinds == _Kind.Type
+        line_types = _forwardFill(parameters[:, _parameter_index[b"P"]], is_type, self._line_type)
+        is_tool = (kinds == _Kind.Tool) & ~numpy.isnan(parameters[:, _parameter_index[b"P"]])
+        extruders = _forwardFill(parameters[:, _parameter_index[b"P"]], is_tool, self._extruder)
+
+        is_dwell = kinds == _Kind.Dwell
+        dwell_times = numpy.nan_to_num(parameters[is_dwell, _parameter_index[b"P"]]) / 1000 + numpy.nan_to_num(parameters[is_dwell, _parameter_index[b"S"]])
+
+        start_positions = numpy.empty_like(positions)
+        start_positions[:1] = self._position
+        start_positions[1:] = positions[:-1]
+
+        if len(kinds):
+            self._position = positions[-1].copy()
+            self._relative = bool(relative[-1])
+            self._extruder_relative = bool(extruder_relative[-1])
+            self._feedrate = feedrates[-1]
+            self._layer = int(layers[-1])
+            self._line_type = int(line_types[-1])
+            self._extruder = int(extruders[-1])
+
+        return GCodeMoves(start_positions[is_move], positions[is_move], feedrates[is_move], layers[is_move], line_types[is_move].astype(numpy.int8),
+                          extruders[is_move].astype(numpy.int8), layer_numbers.astype(int), layers[is_dwell], dwell_times)
+
+##  The kinds of commands that the parser evaluates.
+class _Kind:
+    Other = 0
+    Move = 1  # G0 and G1
+    SetPosition = 2  # G92
+    Home = 3  # G28
+    Absolute = 4  # G90
+    Relative = 5  # G91
+    ExtruderAbsolute = 6  # M82
+    ExtruderRelative = 7  # M83
+    Dwell = 8  # G4
+    Tool = 9  # T<number>, with the number as the P parameter.
+    Layer = 10  # ;LAYER:<number>, with the number as the P parameter.
+    Type = 11  # ;TYPE:<name>, with the index of the name in GCodeParser.LineTypes as the P parameter.
+
+_parameter_letters = [b"X", b"Y", b"Z", b"E", b"F", b"P", b"S"]
+_parameter_index = {letter: index for index, letter in enumerate(_parameter_letters)}
+
+_g_commands = {0: _Kind.Move, 1: _Kind.Move, 4: _Kind.Dwell, 28: _Kind.Home, 90: _Kind.Absolute, 91: _Kind.Relative, 92: _Kind.SetPosition}
+_m_commands = {82: _Kind.ExtruderAbsolute, 83: _Kind.ExtruderRelative}
+
+_newline = ord("\n")
+_layer_comment = b";LAYER:"
+_type_comment = b";TYPE:"
+_type_indices = {name.encode(): index for index, name in enumerate(GCodeParser.LineTypes)}
+
+# Index of the parameter for every byte, or -1 if the byte is not a parameter letter.
+_parameter_table = numpy.full(256, -1, dtype = numpy.int8)
+for _index, _letter in enumerate(_parameter_letters):
+    _parameter_table[ord(_letter)] = _index
+    _parameter_table[ord(_letter.lower())] = _index
+
+# Bytes that can be part of a number.
+_number_table = numpy.zeros(256, dtype = bool)
+for _character in b"0123456789.-+":
+    _number_table[_character] = True
+
+# Numbers in g-code are short. Longer numbers are not parsed, which also keeps the digits within an int64.
+_number_width = 16
+_powers_of_ten = 10.0 ** numpy.arange(_number_width + 1)
+
+##  Parse a block of g-code, which ends with a newline.
+#   \return Tuple of the kinds of the commands and their parameters.
+def _parseBlock(data):
+    newlines = numpy.flatnonzero(data == _newline)
+    line_starts = numpy.empty(len(newlines), dtype = numpy.intp)
+    line_starts[0] = 0
+    line_starts[1:] = newlines[:-1] + 1
+
+    # The code on a line ends at the first semicolon.
+    code_ends = newlines.copy()
+    semicolons = numpy.flatnonzero(data == ord(";"))
+    semicolon_lines = numpy.searchsorted(newlines, semicolons)
+    commented_lines, first_semicolons = numpy.unique(semicolon_lines, return_index = True)
+    code_ends[commented_lines] = semicolons[first_semicolons]
+
+    first_letters = data[line_starts]
+    kinds = numpy.zeros(len(line_starts), dtype = numpy.int8)
+    parameters = numpy.full((len(line_starts), len(_parameter_letters)), numpy.nan)
+
+    # The number after the first letter of every line, for the commands and tools.
+    numbers = _parseNumbers(data, line_starts + 1)
+    for letter, commands in ((ord("G"), _g_commands), (ord("M"), _m_commands)):
+        is_letter = first_letters == letter
+        for number, kind in commands.items():
+            kinds[is_letter & (numbers == number)] = kind
+
+    lines = numpy.flatnonzero(first_letters == ord("T"))
+    kinds[lines] = _Kind.Tool
+    parameters[lines, _parameter_index[b"P"]] = numbers[lines]
+
+    comment_lines = numpy.flatnonzero(first_letters == ord(";"))
+    lines = _findLines(data, line_starts, newlines, comment_lines, _layer_comment)
+    kinds[lines] = _Kind.Layer
+    parameters[lines, _parameter_index[b"P"]] = _parseNumbers(data, line_starts[lines] + len(_layer_comment))
+
+    lines = _findLines(data, line_starts, newlines, comment_lines, _type_comment)
+    kinds[lines] = _Kind.Type
+    # There are only a few of these comments in a layer, so their names are looked up one by one.
+    name_starts = line_starts[lines] + len(_type_comment)
+    parameters[lines, _parameter_index[b"P"]] = [_type_indices.get(data[start:end].tobytes().rstrip(b"\r"), -1) for start, end in zip(name_starts.tolist(), newlines[lines].tolist())]
+
+    # Parameters are the parameter letters in the code of a command that is evaluated, with or without spaces between
+    # them. All bytes from "A" on are letters in g-code, apart from the text of comments.
+    positions = numpy.flatnonzero(data >= ord("A"))
+    letters = _parameter_table.take(data.take(positions))
+    is_parameter = letters >= 0
+    positions = positions[is_parameter]
+    letters = letters[is_parameter]
+    positions_lines = numpy.searchsorted(newlines, positions)
+    position_kinds = kinds[positions_lines]
+    evaluated = (position_kinds != _Kind.Other) & (position_kinds < _Kind.Tool) & (positions < code_ends[positions_lines])
+    lines = positions_lines[evaluated]
+    values = _parseNumbers(data, positions[evaluated] + 1)
+    # G28 homes the axes that it names, which don't need a number.
+    values[numpy.isnan(values) & (kinds[lines] == _Kind.Home)] = 0
+    parameters[lines, letters[evaluated]] = values
+
+    evaluated_lines = kinds != _Kind.Other
+    return kinds[evaluated_lines], parameters[evaluated_lines]
+
+##  Find the lines that start with a text.
+#
+#   \param lines The indices of the lines to search in.
+#   \return The indices of the lines that start with the text.
+def _findLines(data, line_starts, newlines, lines, text):
+    lines = lines[newlines[lines] - line_starts[lines] >= len(text)]
+    for offset, character in enumerate(text):
+        lines = lines[data[line_starts[lines] + offset] == character]
+    return lines
+
+##  Parse the numbers that start at the given positions.
+#
+#   The digits are accumulated into integers one column of characters at a time, for all numbers at once, until every
+#   number has reached a character that can't be part of it. The integers are then scaled by the number of digits after
+#   the decimal point. Every step is plain arithmetic on the columns, without masks that select elements, as those
+#   are many times slower than arithmetic for arrays of this size.
+#
+#   \param data The g-code as an array of bytes, which must end with a newline.
+#   \param starts The positions of the first characters of the numbers.
+#   \return Array with the numbers, or NaN where there is no valid number.
+def _parseNumbers(data, starts):
+    mantissas = numpy.zeros(len(starts), dtype = numpy.int64)
+    digit_counts = numpy.zeros(len(starts), dtype = numpy.uint8)
+    decimals = numpy.zeros(len(starts), dtype = numpy.uint8)  # The number of digits after the decimal point.
+    lengths = numpy.zeros(len(starts), dtype = numpy.uint8)
+    after_point = numpy.zeros(len(starts), dtype = bool)
+
+    positions = numpy.minimum(starts, len(data) - 1)
+    characters = data.take(positions)
+    negative = characters == ord("-")
+    signs = negative | (characters == ord("+"))  # A sign is only part of a number as its first character.
+    for offset in range(_number_width + 1):
+        if offset:
+            positions += 1
+            characters = data.take(positions, mode = "clip")  # Clipped to the newline at the end.
+        digits = characters - numpy.uint8(ord("0"))  # Wraps around for characters before "0", so those are not digits either.
+        is_digit = digits < 10
+        is_point = characters == ord(".")
+        # A number ends at the first character that can't be part of it.
+        inside = (is_digit | is_point | (signs if offset == 0 else False)) & (lengths == offset)
+        if not inside.any():
+            break
+        is_digit &= inside
+        mantissas *= numpy.uint8(1) + numpy.uint8(9) * is_digit
+        mantissas += digits * is_digit
+        digit_counts += is_digit
+        decimals += is_digit & after_point
+        after_point |= is_point & inside
+        lengths += inside
+
+    numbers = mantissas / _powers_of_ten[decimals]  # Dividing by an exact power of ten rounds correctly.
+    numbers[negative] *= -1
+    numbers[(digit_counts == 0) | (lengths > _number_width)] = numpy.nan
+    return numbers
+
+##  Fill the values where the mask is False with the last value where it is True.
+#   \param default The value before the first value where the mask is True.
+def _forwardFill(values, mask, default):
+    indices = numpy.where(mask, numpy.arange(1, len(values) + 1), 0)
+    numpy.maximum.accumulate(indices, out = indices)
+    return numpy.concatenate(([default], values))[indices]
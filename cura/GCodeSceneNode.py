@@ -0,0 +1,39 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Math.AxisAlignedBox import AxisAlignedBox
+from UM.Math.Vector import Vector
+from UM.Scene.SceneNode import SceneNode
+
+import numpy
+
+##  Scene node of g-code that is loaded from a file.
+#
+#   The mesh data of g-code has no vertices to calculate a bounding box from, so the node gets the extents of the
+#   moves instead. Being its own type of node also keeps it out of the platform physics and the slicing, which only
+#   handle plain scene nodes, as the g-code is already placed on the build plate by the coordinates of the machine.
+class GCodeSceneNode(SceneNode):
+    def __init__(self, parent = None):
+        super().__init__(parent)
+
+        self._extents_minimum = numpy.zeros(3, numpy.float32)
+        self._extents_maximum = numpy.zeros(3, numpy.float32)
+
+    ##  Set the extents of the g-code.
+    #
+    #   \param minimum The smallest x, y and z of the g-code in the coordinates of the node.
+    #   \param maximum The largest x, y and z of the g-code in the coordinates of the node.
+    def setExtents(self, minimum, maximum):
+        self._extents_minimum = numpy.array(minimum, numpy.float32)
+        # Lines along one axis or a print of one layer still need a size, as the size is divided by.
+        self._extents_maximum = numpy.maximum(numpy.array(maximum, numpy.float32), self._extents_minimum + 0.001)
+
+    ##  Get the bounding box of the g-code in world coordinates.
+    def getBoundingBox(self):
+        minimum = self._extents_minimum
+        maximum = self._extents_maximum
+        corners = numpy.array([[x, y, z, 1.0] for x in (minimum[0], maximum[0]) for y in (minimum[1], maximum[1]) for z in (minimum[2], maximum[2])])
+        corners = corners.dot(self.getWorldTransformation().getData().T)[:, :3]
+        lower = corners.min(axis = 0)
+        upper = corners.max(axis = 0)
+        return AxisAlignedBox(minimum = Vector(lower[0], lower[1], lower[2]), maximum = Vector(upper[0], upper[1], upper[2]))
@@ -0,0 +1,82 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import re
+import struct
+
+# The settings are written at the end of a g-code file as comment lines starting with ";SETTING_<version> ". To read
+# them back, the whole file used to be scanned for those lines. A footer at the very end of the file holds the byte
+# offset and the length of the settings block in a fixed format, so a reader only has to read the end of the file and
+# the block itself. The footer is a g-code comment as well, so printers ignore it, and it does not start with the
+# prefix of the settings, so readers that don't know it skip it.
+
+_footer_format = ";SETTING_%d_BLOCK %020d %020d\n"
+_footer_pattern = re.compile(rb";SETTING_([0-9]+)_BLOCK ([0-9]{20}) ([0-9]{20})$")
+
+# Number of bytes at the end of a file that are searched for the footer. This leaves room for a carriage return and a
+# few lines of g-code that a post-processing tool may have added after the footer.
+_tail_size = 256
+
+##  Create the footer for a settings block.
+#
+#   \param version The version of the settings format, as in the prefix of the settings lines.
+#   \param offset The position of the first byte of the settings block in the file.
+#   \param length The length of the settings block in bytes, including its last newline.
+#   \return The footer as a line of g-code.
+def createFooter(version, offset, length):
+    return _footer_format % (version, offset, length)
+
+##  Read the settings block that the footer of a file points to.
+#
+#   \param stream Binary file object to read from, which must be seekable.
+#   \param version The version of the settings format to read.
+#   \param size The size of the file. If None, the end of the stream is found by seeking to it. Compressed streams
+#          can not seek from the end, so they need to be given the size.
+#   \return The settings block as bytes, or None if the file has no valid footer, for instance because it was
+#           written before footers were introduced.
+def readSettingsBlock(stream, version, size = None):
+    if size is None:
+        size = stream.seek(0, 2)
+    stream.seek(max(0, size - _tail_size))
+    tail = stream.read(_tail_size)
+
+    for line in reversed(tail.splitlines()):
+        match = _footer_pattern.match(line.strip())
+        if match:
+            break
+    else:
+        return None
+
+    if int(match.group(1)) != version:
+        return None
+    offset = int(match.group(2))
+    length = int(match.group(3))
+    if length <= 0 or offset + length > size:
+        return None
+
+    stream.seek(offset)
+    block = stream.read(length)
+
+    # The offsets could be wrong if the file was changed after it was written, so check that it points to settings.
+    prefix = (";SETTING_%d " % version).encode()
+    if len(block) != length or not block.startswith(prefix) or not block.endswith(b"\n"):
+        return None
+    return block
+
+##  Get the serialised settings from a settings block.
+#
+#   \param block The settings block, as read by readSettingsBlock.
+#   \param version The version of the settings format.
+#   \return The serialised settings, still escaped.
+def parseSettingsBlock(block, version):
+    prefix = ";SETTING_%d " % version
+    return "".join(line[len(prefix):] for line in block.decode("utf-8").splitlines() if line.startswith(prefix))
+
+##  Get the uncompressed size of a gzip file from its trailer.
+#
+#   The size is stored modulo 2^32, so it is only correct for files smaller than 4 GiB with a single gzip member.
+#
+#   \param stream The compressed binary file object.
+def getGzipUncompressedSize(stream):
+    stream.seek(-4, 2)
+    return struct.unpack("<I", stream.read(4))[0]
@@ -0,0 +1,70 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+##  Writes g-code to a text stream in large blocks.
+#
+#   The g-code of a scene is a list of many chunks, for instance one per layer. Instead of writing every chunk to the
+#   stream on its own, the chunks are collected into blocks of at least block_size characters, which are written at
+#   once. The blocks are small enough to stay in the processor cache while they are joined and encoded. Whenever the
+#   progress passes a whole percent the progress is reported, so a job that writes a large file can show how far it is.
+class GCodeStreamWriter:
+    ##  Create a writer.
+    #
+    #   \param stream The text stream to write to.
+    #   \param block_size Number of characters to collect before writing them to the stream.
+    #   \param progress_callback Function that is called with the progress of writeChunks, between 0 and 100.
+    def __init__(self, stream, block_size = 64 * 1024, progress_callback = None):
+        self._stream = stream
+        self._block_size = block_size
+        self._progress_callback = progress_callback
+
+        self._block = []
+        self._block_length = 0
+        self._position = 0  # Number of characters written, including the ones that are still in the block.
+
+    ##  Write all chunks of g-code.
+    #
+    #   \param chunks Iterable of strings.
+    #   \param total_size Total length of the chunks, to report progress with. If None, it is computed from the chunks,
+    #          which then have to be a list.
+    def writeChunks(self, chunks, total_size = None):
+        if total_size is None:
+            total_size = sum(map(len, chunks))
+        start_position = self._position
+        next_progress_position = start_position + total_size / 100  # Position at which the next percent is reached.
+
+        for chunk in chunks:
+            if self.write(chunk) and self._progress_callback and total_size and self._position >= next_progress_position:
+                progress = min(100, int((self._position - start_position) * 100 / total_size))
+                self._progress_callback(progress)
+                next_progress_position = start_position + (progress + 1) * total_size / 100
+
+        self.flush()
+        if self._progress_callback:
+            self._progress_callback(100)
+
+    ##  Write a string, which is collected into the current block.
+    #   \return True if a block was written to the stream.
+    def write(self, text):
+        self._block.append(text)
+        self._block_length += len(text)
+        self._position += len(text)
+        if self._block_length >= self._block_size:
+            self.flush()
+            return True
+        return False
+
+    ##  Write the current block to the stream.
+    def flush(self):
+        if not self._block:
+            return
+        if len(self._block) == 1:
+            self._stream.write(self._block[0])  # Don't copy chunks that are large enough by themselves.
+        else:
+            self._stream.write("".join(self._block))
+        self._block = []
+        self._block_length = 0
+
+    ##  Get the number of characters written so far.
+    def getPosition(self):
+        return self._position
@@ -0,0 +1,250 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+##  Get the height of every pixel of an image, as the average of its red, green and blue.
+#
+#   \param pixels 2D array of 32 bit pixels as 0xAARRGGBB, such as the bits of a QImage in Format_ARGB32.
+#   \return 2D float32 array of the heights, from 0 for black to 1 for white.
+def getPixelHeights(pixels):
+    pixels = numpy.asarray(pixels, dtype = numpy.uint32)
+    heights = numpy.zeros(pixels.shape, dtype = numpy.float32)
+    for shift in (16, 8, 0):
+        heights += (pixels >> shift) & 0xFF
+    heights /= 3 * 255
+    return heights
+
+##  Smooth heights as if they were blurred a number of times with a 3x3 box blur.
+#
+#   A 3x3 box blur is separable, and blurring a number of times is the same as blurring once with the kernel that is
+#   the box kernel convolved with itself that number of times, which is close to a Gaussian. So this blurs once along
+#   each axis with that kernel, which is cut off where its weights become negligible. Short kernels are applied
+#   directly and long kernels with an FFT, so heavy smoothing doesn't take longer than light smoothing. The box blur
+#   extended the edges by repeating the heights at the edge in every iteration, which is the same as mirroring the
+#   heights at the edges once for the whole kernel, so the edges are smoothed the same as well.
+#
+#   \param height_data 2D float32 array of heights, which is smoothed in place.
+#   \param iterations Number of times to blur.
+#   \return The smoothed height data.
+def smoothHeights(height_data, iterations):
+    if iterations < 1:
+        return height_data
+    kernel = _getSmoothingKernel(iterations)
+    for axis in (0, 1):
+        if len(kernel) // 2 <= _direct_smoothing_radius:
+            _convolveDirect(height_data, kernel, axis)
+        else:
+            _convolveFFT(height_data, kernel, axis)
+    return height_data
+
+##  The filters to resample heights with.
+class ResamplingFilter:
+    Nearest = "nearest"  # Take the nearest pixel, which is fast but aliases fine detail.
+    Bilinear = "bilinear"  # Interpolate between the four nearest pixels.
+    Area = "area"  # Average all pixels that a new pixel covers, which is best for downscaling.
+
+##  Resample heights to another size.
+#
+#   \param height_data 2D array of heights.
+#   \param rows The number of rows to resample to.
+#   \param columns The number of columns to resample to.
+#   \param resampling_filter The ResamplingFilter to resample with.
+#   \return 2D float32 array of the resampled heights.
+def resampleHeights(height_data, rows, columns, resampling_filter = ResamplingFilter.Area):
+    resample = {
+        ResamplingFilter.Nearest: _resampleNearest,
+        ResamplingFilter.Bilinear: _resampleBilinear,
+        ResamplingFilter.Area: _resampleArea
+    }.get(resampling_filter)
+    if resample is None:
+        raise ValueError("Unknown resampling filter {0}".format(resampling_filter))
+    height_data = resample(numpy.asarray(height_data, dtype = numpy.float32), rows, 0)
+    return resample(height_data, columns, 1)
+
+##  Create the top of a height map as an indexed grid mesh, with one vertex for every pixel.
+#
+#   The height map is in the x, z plane from the origin, with its height along y. Every square between four pixels is
+#   split into two triangles, which share their vertices with the squares around them.
+#
+#   \param height_data 2D array of the heights, with the rows along z and the columns along x.
+#   \param texel_width Distance between the pixels along x.
+#   \param texel_height Distance between the pixels along z.
+#   \return Tuple of the float32 array of vertices and the int32 array of the vertex indices of every triangle.
+def createGridMesh(height_data, texel_width, texel_height):
+    rows, columns = height_data.shape
+    vertices = numpy.empty((rows, columns, 3), dtype = numpy.float32)
+    vertices[:, :, 0] = numpy.arange(columns, dtype = numpy.float32) * texel_width
+    vertices[:, :, 1] = height_data
+    vertices[:, :, 2] = (numpy.arange(rows, dtype = numpy.float32) * texel_height)[:, numpy.newaxis]
+
+    # The index of the vertex at the top left of every square. Its other corners are one column and one row further.
+    top_left = (numpy.arange(rows - 1, dtype = numpy.int32)[:, numpy.newaxis] * columns + numpy.arange(columns - 1, dtype = numpy.int32)).reshape(-1)
+    bottom_left = top_left + columns
+    indices = numpy.empty((len(top_left), 2, 3), dtype = numpy.int32)
+    indices[:, 0, 0] = top_left
+    indices[:, 0, 1] = bottom_left
+    indices[:, 0, 2] = bottom_left + 1
+    indices[:, 1, 0] = bottom_left + 1
+    indices[:, 1, 1] = top_left + 1
+    indices[:, 1, 2] = top_left
+    return vertices.reshape(-1, 3), indices.reshape(-1, 3)
+
+##  Calculate the normal of every vertex of an indexed mesh, as the average of the normals of the triangles around it.
+#
+#   The cross product of two sides of a triangle is as long as twice its area, so summing those weighs every triangle
+#   by its area. Vertices that are shared by several triangles, as in a grid mesh, get a smooth normal.
+#
+#   \param vertices Array of the x, y and z of every vertex.
+#   \param indices Array of the indices of the three vertices of every triangle, in counter-clockwise order.
+#   \return float32 array of the unit normal of every vertex, or zero for vertices that are not in any triangle.
+def calculateVertexNormals(vertices, indices):
+    corners = vertices[indices]
+    face_normals = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+    normals = numpy.zeros(vertices.shape, dtype = numpy.float32)
+    for corner in range(3):
+        numpy.add.at(normals, indices[:, corner], face_normals)
+
+    lengths = numpy.linalg.norm(normals, axis = 1)
+    lengths[lengths == 0] = 1
+    normals /= lengths[:, numpy.newaxis]
+    return normals
+
+##  Create the triangles of the walls around a height map and of its bottom.
+#
+#   The height map is in the x, z plane from the origin, with its height along y. The walls go from y = 0 up to the
+#   edges of the height map, with two triangles for every pixel along the edges.
+#
+#   \param height_data 2D array of the heights, with the rows along z and the columns along x.
+#   \param texel_width Distance between the pixels along x.
+#   \param texel_height Distance between the pixels along z.
+#   \return Array with the x, y and z of the corners of the triangles after each other.
+def createWallVertices(height_data, texel_width, texel_height):
+    rows, columns = height_data.shape
+    geo_width = (columns - 1) * texel_width
+    geo_height = (rows - 1) * texel_height
+
+    bottom = numpy.array([
+        [0, 0, 0], [0, 0, geo_height], [geo_width, 0, geo_height],
+        [geo_width, 0, geo_height], [geo_width, 0, 0], [0, 0, 0]
+    ], dtype = numpy.float32)
+
+    xs = numpy.arange(columns, dtype = numpy.float32) * texel_width
+    zs = numpy.arange(rows, dtype = numpy.float32) * texel_height
+    return numpy.concatenate((
+        bottom,
+        _createWall(xs, height_data[0, :], 0, 0),  # North.
+        _createWall(xs, height_data[-1, :], geo_height, 0),  # South.
+        _createWall(zs, height_data[:, 0], 0, 2),  # West.
+        _createWall(zs, height_data[:, -1], geo_width, 2)  # East.
+    ))
+
+##  Create the triangles of one wall, two for every step along it.
+#
+#   \param positions The positions of the vertices along the wall.
+#   \param heights The heights of the vertices.
+#   \param offset The position of the wall along the other axis.
+#   \param axis The axis that the wall goes along, 0 for x or 2 for z.
+def _createWall(positions, heights, offset, axis):
+    starts, ends = positions[:-1], positions[1:]
+    start_heights, end_heights = heights[:-1], heights[1:]
+    zeros = numpy.zeros(len(starts), dtype = numpy.float32)
+
+    vertices = numpy.empty((len(starts), 6, 3), dtype = numpy.float32)
+    vertices[:, :, axis] = numpy.column_stack((starts, ends, ends, ends, starts, starts))
+    vertices[:, :, 1] = numpy.column_stack((zeros, zeros, end_heights, end_heights, start_heights, zeros))
+    vertices[:, :, 2 - axis] = offset
+    return vertices.reshape(-1, 3)
+
+##  Kernels up to this radius are applied directly, longer ones with an FFT.
+_direct_smoothing_radius = 12
+
+##  Get the 1D kernel of blurring a number of times with a kernel of three equal weights.
+def _getSmoothingKernel(iterations):
+    # The variance of the kernel is 2/3 per iteration. Beyond 5 standard deviations the weights are negligible.
+    radius = min(iterations, int(numpy.ceil(5 * numpy.sqrt(2 * iterations / 3))))
+    kernel = numpy.ones(1)
+    for _ in range(iterations):
+        kernel = numpy.convolve(kernel, numpy.ones(3) / 3)
+        if len(kernel) > 2 * radius + 1:
+            kernel = kernel[1:-1]
+    return kernel / kernel.sum()
+
+def _padAlong(height_data, radius, axis):
+    padding = [(0, 0), (0, 0)]
+    padding[axis] = (radius, radius)
+    return numpy.pad(height_data, padding, mode = "symmetric")
+
+def _sliceAlong(data, start, length, axis):
+    return data[start:start + length] if axis == 0 else data[:, start:start + length]
+
+##  Convolve along an axis with a symmetric kernel, one pair of weights at a time.
+def _convolveDirect(height_data, kernel, axis):
+    radius = len(kernel) // 2
+    length = height_data.shape[axis]
+    padded = _padAlong(height_data, radius, axis)
+    pair = numpy.empty_like(height_data)
+    height_data *= kernel[radius]
+    for offset in range(radius):
+        numpy.add(_sliceAlong(padded, offset, length, axis), _sliceAlong(padded, 2 * radius - offset, length, axis), out = pair)
+        pair *= kernel[offset]
+        height_data += pair
+
+##  Convolve along an axis with a kernel, by multiplying in the frequency domain.
+def _convolveFFT(height_data, kernel, axis):
+    radius = len(kernel) // 2
+    length = height_data.shape[axis]
+    padded = _padAlong(height_data, radius, axis)
+    fft_length = _getFastFFTLength(length + 4 * radius)
+    spectrum = numpy.fft.rfft(padded, n = fft_length, axis = axis)
+    kernel_spectrum = numpy.fft.rfft(kernel, n = fft_length)
+    spectrum *= kernel_spectrum if axis == 1 else kernel_spectrum[:, numpy.newaxis]
+    height_data[...] = _sliceAlong(numpy.fft.irfft(spectrum, n = fft_length, axis = axis), 2 * radius, length, axis)
+
+##  Get the smallest length of at least the given length with only 2, 3 and 5 as factors, for which FFTs are fast.
+def _getFastFFTLength(length):
+    best = 2 ** int(numpy.ceil(numpy.log2(length)))
+    power_of_five = 1
+    while power_of_five < best:
+        power_of_three = power_of_five
+        while power_of_three < best:
+            candidate = power_of_three * 2 ** max(0, int(numpy.ceil(numpy.log2(length / power_of_three))))
+            best = min(best, candidate)
+            power_of_three *= 3
+        power_of_five *= 5
+    return best
+
+def _resampleNearest(height_data, size, axis):
+    old_size = height_data.shape[axis]
+    indices = ((numpy.arange(size) + 0.5) * (old_size / size)).astype(int)
+    return numpy.take(height_data, numpy.minimum(indices, old_size - 1), axis = axis)
+
+def _resampleBilinear(height_data, size, axis):
+    old_size = height_data.shape[axis]
+    positions = numpy.clip((numpy.arange(size) + 0.5) * (old_size / size) - 0.5, 0, old_size - 1)
+    lower = numpy.minimum(positions.astype(int), old_size - 2) if old_size > 1 else numpy.zeros(size, dtype = int)
+    fractions = (positions - lower).astype(numpy.float32)
+    if axis == 1:
+        fractions = fractions[numpy.newaxis, :]
+    else:
+        fractions = fractions[:, numpy.newaxis]
+    lower_heights = numpy.take(height_data, lower, axis = axis)
+    upper_heights = numpy.take(height_data, numpy.minimum(lower + 1, old_size - 1), axis = axis)
+    return lower_heights + (upper_heights - lower_heights) * fractions
+
+##  Average the heights that every new pixel covers, including the parts of the pixels at its borders.
+def _resampleArea(height_data, size, axis):
+    old_size = height_data.shape[axis]
+    # The integral of the heights from the start up to every pixel border.
+    integral = numpy.zeros((old_size + 1, height_data.shape[1]) if axis == 0 else (height_data.shape[0], old_size + 1))
+    numpy.cumsum(height_data, axis = axis, out = _sliceAlong(integral, 1, old_size, axis))
+
+    borders = numpy.arange(size + 1) * (old_size / size)
+    whole = numpy.minimum(borders.astype(int), old_size - 1)
+    fractions = borders - whole
+    fractions = fractions[numpy.newaxis, :] if axis == 1 else fractions[:, numpy.newaxis]
+    integrals = numpy.take(integral, whole, axis = axis) + numpy.take(height_data, whole, axis = axis) * fractions
+    sizes = numpy.diff(borders)
+    sizes = sizes[numpy.newaxis, :] if axis == 1 else sizes[:, numpy.newaxis]
+    return (numpy.diff(integrals, axis = axis) / sizes).astype(numpy.float32)
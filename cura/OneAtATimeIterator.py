@@ -1,10 +1,15 @@
 # Copyright (c) 2015 Ultimaker B.V.
 # Cura is released under the terms of the AGPLv3 or higher.
 
+import heapq
+
+import numpy
+
 from UM.Scene.Iterator import Iterator
 from UM.Scene.SceneNode import SceneNode
-from functools import cmp_to_key
-from UM.Application import Application
+from UM.Logger import Logger
+
+from cura.PolygonBatch import PolygonBatch
 
 ## Iterator that returns a list of nodes in the order that they need to be printed
 #  If there is no solution an empty list is returned.
@@ -12,9 +17,9 @@ from UM.Application import Application
 class OneAtATimeIterator(Iterator.Iterator):
     def __init__(self, scene_node):
         super().__init__(scene_node) # Call super to make multiple inheritence work.
-        self._hit_map = [[]]
+        self._hit_map = numpy.zeros((0, 0), dtype = numpy.bool_)
         self._original_node_list = []
-    
+
     def _fillStack(self):
         node_list = []
         for node in self._scene_node.getChildren():
@@ -26,86 +31,65 @@ class OneAtATimeIterator(Iterator.Iterator):
 
         if len(node_list) < 2:
             self._node_stack = node_list[:]
-            return 
+            return
 
         # Copy the list
         self._original_node_list = node_list[:]
 
         ## Initialise the hit map (pre-compute all hits between all objects)
-        self._hit_map = [[self._checkHit(i,j) for i in node_list] for j in node_list]
-
-        # Check if we have to files that block eachother. If this is the case, there is no solution!
-        for a in range(0,len(node_list)):
-            for b in range(0,len(node_list)):
-                if a != b and self._hit_map[a][b] and self._hit_map[b][a]:
-                    return 
-
-        # Sort the original list so that items that block the most other objects are at the beginning.
-        # This does not decrease the worst case running time, but should improve it in most cases.
-        sorted(node_list, key = cmp_to_key(self._calculateScore))
-
-        todo_node_list = [_ObjectOrder([], node_list)]
-        while len(todo_node_list) > 0:
-            current = todo_node_list.pop()
-            for node in current.todo:
-                # Check if the object can be placed with what we have and still allows for a solution in the future
-                if not self._checkHitMultiple(node, current.order) and not self._checkBlockMultiple(node, current.todo):
-                    # We found a possible result. Create new todo & order list.
-                    new_todo_list = current.todo[:]
-                    new_todo_list.remove(node)
-                    new_order = current.order[:] + [node]
-                    if len(new_todo_list) == 0: 
-                        # We have no more nodes to check, so quit looking.
-                        todo_node_list = None
-                        self._node_stack = new_order
-
-                        return
-                    todo_node_list.append(_ObjectOrder(new_order, new_todo_list))
-        self._node_stack = [] #No result found!
-
-
-    # Check if first object can be printed before the provided list (using the hit map)
-    def _checkHitMultiple(self, node, other_nodes):
-        node_index = self._original_node_list.index(node)
-        for other_node in other_nodes:
-            other_node_index = self._original_node_list.index(other_node)
-            if self._hit_map[node_index][other_node_index]:
-                return True
-        return False
-
-    def _checkBlockMultiple(self, node, other_nodes):
-        node_index = self._original_node_list.index(node)
-        for other_node in other_nodes:
-            other_node_index = self._original_node_list.index(other_node)
-            if self._hit_map[other_node_index][node_index] and node_index != other_node_index:
-                return True
-        return False
-
-    ##  Calculate score simply sums the number of other objects it 'blocks'
-    def _calculateScore(self, a, b):
-        score_a = sum(self._hit_map[self._original_node_list.index(a)])
-        score_b = sum(self._hit_map[self._original_node_list.index(b)])
-        return score_a - score_b
-
-    #   Checks if A can be printed before B
-    def _checkHit(self, a, b):
-        if a == b:
-            return False
-
-        overlap = a.callDecoration("getConvexHullBoundary").intersectsPolygon(b.callDecoration("getConvexHullHeadFull"))
-        if overlap:
-            return True
-        else: 
-            return False
-
-
-## Internal object used to keep track of a possible order in which to print objects.      
-class _ObjectOrder():
-    def __init__(self, order, todo):
-        """
-        :param order:   List of indexes in which to print objects, ordered by printing order.
-        :param todo:    List of indexes which are not yet inserted into the order list.
-        """
-        self.order = order
-        self.todo = todo
-
+        #  _hit_map[a][b] is True if node a can not be printed before node b, so b has to be printed before a.
+        self._hit_map = self._buildHitMap(node_list)
+
+        order = self._computePrintOrder(self._hit_map)
+        if order is None:
+            Logger.log("w", "There is no order in which the %s objects can be printed one at a time.", len(node_list))
+            self._node_stack = [] #No result found!
+            return
+
+        self._node_stack = [node_list[index] for index in order]
+
+    ##  Build the hit map for a list of nodes.
+    #
+    #   Node a can not be printed before node b if the boundary of a intersects the area swept by the full head
+    #   while printing b. All pairs are tested at once with a PolygonBatch.
+    #   \return numpy boolean matrix where [a][b] is True if node a can not be printed before node b.
+    def _buildHitMap(self, node_list):
+        boundaries = PolygonBatch([node.callDecoration("getConvexHullBoundary").getPoints() for node in node_list])
+        heads = PolygonBatch([node.callDecoration("getConvexHullHeadFull").getPoints() for node in node_list])
+
+        hit_map = boundaries.intersectsBatch(heads)
+        numpy.fill_diagonal(hit_map, False)
+        return hit_map
+
+    ##  Compute the order in which to print the objects from the hit map.
+    #
+    #   The hit map describes a "must be printed before" graph, with an edge from b to a if a can not be printed
+    #   before b. A valid print order is a topological sort of this graph, which exists only if the graph has no
+    #   cycles. Ties are broken by the original order of the nodes, so the result is stable.
+    #   \param hit_map numpy boolean matrix where [a][b] is True if b has to be printed before a.
+    #   \return List of node indices in print order, or None if the objects block each other.
+    def _computePrintOrder(self, hit_map):
+        node_count = hit_map.shape[0]
+        hit_map = hit_map.copy()
+        numpy.fill_diagonal(hit_map, False)
+
+        # The number of nodes that still have to be printed before each node.
+        in_degree = hit_map.sum(axis = 1)
+        ready = numpy.flatnonzero(in_degree == 0).tolist()
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            index = heapq.heappop(ready)
+            order.append(index)
+
+            # All nodes that had to wait for this one to be printed.
+            dependents = numpy.flatnonzero(hit_map[:, index])
+            in_degree[dependents] -= 1
+            for dependent in dependents[in_degree[dependents] == 0]:
+                heapq.heappush(ready, int(dependent))
+
+        if len(order) < node_count:
+            # The remaining nodes are part of a cycle of objects that block each other.
+            return None
+        return order
@@ -117,11 +117,7 @@ class PlatformPhysics:
                 if not convex_hull.isValid():
                     return
                 # Check for collisions between disallowed areas and the object
-                for area in self._build_volume.getDisallowedAreas():
-                    overlap = convex_hull.intersectsPolygon(area)
-                    if overlap is None:
-                        continue
-
+                if self._build_volume.intersectsDisallowedAreas(convex_hull):
                     node._outside_buildarea = True
 
             if not Vector.Null.equals(move_vector, epsilon=1e-5):
@@ -0,0 +1,119 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+##  A set of 2D convex polygons stored as padded numpy arrays, so that intersections between many polygons can be
+#   tested at once.
+#
+#   Intersections are tested with the separating axis theorem, just like Polygon.intersectsPolygon, but for all
+#   pairs of polygons in one go. Pairs of which the bounding boxes do not overlap are rejected before the more
+#   expensive separating axis test is done.
+class PolygonBatch:
+    ##  Maximum number of polygon pairs that are tested in one vectorized step. This limits the memory used for the
+    #   projections of large batches.
+    _chunk_size = 4096
+
+    ##  Create a batch of polygons.
+    #
+    #   \param polygons List of numpy arrays of shape (N, 2) with the points of convex polygons.
+    def __init__(self, polygons):
+        self._count = len(polygons)
+        max_points = max([len(points) for points in polygons] + [1])
+
+        self._points = numpy.zeros((self._count, max_points, 2), dtype = numpy.float64)
+        self._valid = numpy.zeros(self._count, dtype = numpy.bool_)
+        for index, points in enumerate(polygons):
+            if len(points) == 0:
+                continue
+            points = numpy.asarray(points, dtype = numpy.float64)
+            self._points[index, :len(points)] = points
+            # Pad with the last point. That adds no area and only zero-length edges, of which the normals are
+            # zero and can never be a separating axis.
+            self._points[index, len(points):] = points[-1]
+            self._valid[index] = True
+
+        # The normals of all edges, from the previous point to the current point.
+        edges = self._points - numpy.roll(self._points, 1, axis = 1)
+        self._normals = numpy.stack((edges[:, :, 1], -edges[:, :, 0]), axis = 2)
+
+        self._min = self._points.min(axis = 1)
+        self._max = self._points.max(axis = 1)
+
+    def __len__(self):
+        return self._count
+
+    ##  Test every polygon in this batch against every polygon in another batch.
+    #
+    #   \param other The PolygonBatch to test against.
+    #   \return numpy boolean matrix of shape (len(self), len(other)) where [i][j] is True if polygon i of this
+    #           batch intersects polygon j of the other batch. Touching polygons count as intersecting.
+    def intersectsBatch(self, other):
+        result = numpy.zeros((self._count, other._count), dtype = numpy.bool_)
+
+        # Bounding box pre-rejection.
+        candidates = (self._min[:, None, :] <= other._max[None, :, :]).all(axis = 2)
+        candidates &= (other._min[None, :, :] <= self._max[:, None, :]).all(axis = 2)
+        candidates &= self._valid[:, None] & other._valid[None, :]
+        own_indices, other_indices = numpy.nonzero(candidates)
+
+        for start in range(0, len(own_indices), self._chunk_size):
+            own = own_indices[start:start + self._chunk_size]
+            others = other_indices[start:start + self._chunk_size]
+            result[own, others] = self._intersectsPairs(self, own, other, others)
+
+        return result
+
+    ##  Rasterize the polygons of this batch into a single boolean mask.
+    #
+    #   The rasterization is conservative: a cell is marked if any polygon touches it, so a region of the mask
+    #   without any marked cells is guaranteed to not intersect any of the polygons.
+    #
+    #   \param origin The (x, y) coordinate of the corner of the first cell.
+    #   \param cell_size The size of the square cells.
+    #   \param shape The number of cells of the mask, as (rows, columns). Rows are along the y axis.
+    #   \return numpy boolean array of the given shape.
+    def rasterize(self, origin, cell_size, shape):
+        mask = numpy.zeros(shape, dtype = numpy.bool_)
+        half_cell = cell_size / 2
+
+        for index in numpy.flatnonzero(self._valid):
+            # Only cells in the bounding box of the polygon can be touched by it.
+            first_cell = numpy.floor((self._min[index] - origin) / cell_size).astype(numpy.int64)
+            last_cell = numpy.floor((self._max[index] - origin) / cell_size).astype(numpy.int64)
+            if (last_cell < 0).any() or first_cell[0] >= shape[1] or first_cell[1] >= shape[0]:
+                continue
+            first_cell = numpy.maximum(first_cell, 0)
+            last_cell = numpy.minimum(last_cell, [shape[1] - 1, shape[0] - 1])
+
+            center_x = origin[0] + (numpy.arange(first_cell[0], last_cell[0] + 1) + 0.5) * cell_size
+            center_y = origin[1] + (numpy.arange(first_cell[1], last_cell[1] + 1)[:, None] + 0.5) * cell_size
+
+            # Separating axis test of every cell against the edge normals of the polygon.
+            touched = numpy.ones((len(center_y), len(center_x)), dtype = numpy.bool_)
+            for normal in self._normals[index]:
+                projection = self._points[index].dot(normal)
+                cell_projection = center_x * normal[0] + center_y * normal[1]
+                cell_extent = half_cell * (abs(normal[0]) + abs(normal[1]))
+                touched &= cell_projection - cell_extent <= projection.max()
+                touched &= cell_projection + cell_extent >= projection.min()
+
+            mask[first_cell[1]:last_cell[1] + 1, first_cell[0]:last_cell[0] + 1] |= touched
+
+        return mask
+
+    ##  Separating axis test for pairs of polygons.
+    #
+    #   \return numpy boolean array with one entry per pair, True if the pair intersects.
+    @staticmethod
+    def _intersectsPairs(batch_a, indices_a, batch_b, indices_b):
+        points_a = batch_a._points[indices_a]
+        points_b = batch_b._points[indices_b]
+        axes = numpy.concatenate((batch_a._normals[indices_a], batch_b._normals[indices_b]), axis = 1)
+
+        # Project all points of both polygons on all axes. Shape is (pairs, axes, points).
+        projection_a = numpy.einsum("pkd,pnd->pkn", axes, points_a)
+        projection_b = numpy.einsum("pkd,pnd->pkn", axes, points_b)
+
+        separated = (projection_a.min(axis = 2) > projection_b.max(axis = 2)) | (projection_b.min(axis = 2) > projection_a.max(axis = 2))
+        return ~separated.any(axis = 1)
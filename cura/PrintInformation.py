@@ -4,9 +4,13 @@
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtProperty, pyqtSlot
 
 from UM.Application import Application
+from UM.Backend.Backend import BackendState
+from UM.Logger import Logger
 from UM.Qt.Duration import Duration
 from UM.Preferences import Preferences
 
+from cura.GCodeAnalysisJob import GCodeAnalysisJob
+from cura.GCodeAnalyzer import GCodeAnalyzer
 import cura.Settings.ExtruderManager
 
 import math
@@ -27,6 +31,9 @@ import unicodedata
 #   - When that is done, we update the minimum print time and start the final slice pass, the "high quality settings pass".
 #   - When the high quality pass is done, we update the maximum print time.
 #
+#   When slicing is done, the g-code is analysed in the background to get the time that every layer takes. The total
+#   time of that analysis is compared with the estimate of the engine, to find estimates that are far off.
+#
 #   This class also mangles the current machine name and the filename of the first loaded mesh into a job name.
 #   This job name is requested by the JobSpecs qml file.
 class PrintInformation(QObject):
@@ -49,9 +56,14 @@ class PrintInformation(QObject):
         self._material_lengths = []
         self._material_weights = []
 
+        self._engine_print_time = 0
+        self._layer_print_times = []
+        self._analysis_job = None
+
         self._backend = Application.getInstance().getBackend()
         if self._backend:
             self._backend.printDurationMessage.connect(self._onPrintDurationMessage)
+            self._backend.backendStateChange.connect(self._onBackendStateChange)
 
         self._job_name = ""
         self._abbr_machine = ""
@@ -77,7 +89,15 @@ class PrintInformation(QObject):
     def materialWeights(self):
         return self._material_weights
 
+    layerPrintTimesChanged = pyqtSignal()
+
+    ##  The time that every layer of the sliced g-code takes in seconds, in the order of the layer view.
+    @pyqtProperty("QVariantList", notify = layerPrintTimesChanged)
+    def layerPrintTimes(self):
+        return self._layer_print_times
+
     def _onPrintDurationMessage(self, total_time, material_amounts):
+        self._engine_print_time = total_time
         self._current_print_time.setDuration(total_time)
         self.currentPrintTimeChanged.emit()
 
@@ -100,6 +120,43 @@ class PrintInformation(QObject):
         self.materialLengthsChanged.emit()
         self.materialWeightsChanged.emit()
 
+    def _onBackendStateChange(self, state):
+        if state == BackendState.Done:
+            self._startAnalysis()
+        elif self._layer_print_times:
+            # The g-code changes, so the old times don't apply any more.
+            self._analysis_job = None
+            self._layer_print_times = []
+            self.layerPrintTimesChanged.emit()
+
+    def _startAnalysis(self):
+        scene = Application.getInstance().getController().getScene()
+        gcode_list = getattr(scene, "gcode_list", None)
+        global_container_stack = Application.getInstance().getGlobalContainerStack()
+        if not gcode_list or not global_container_stack:
+            return
+
+        analyzer = GCodeAnalyzer(acceleration = global_container_stack.getProperty("machine_acceleration", "value"),
+                                 max_feedrate = global_container_stack.getProperty("machine_max_feedrate_x", "value"),
+                                 jerk = global_container_stack.getProperty("machine_max_jerk_xy", "value"))
+        # The backend starts a new list for every slice, but copy it in case chunks are added while it is analysed.
+        self._analysis_job = GCodeAnalysisJob(list(gcode_list), analyzer)
+        self._analysis_job.finished.connect(self._onAnalysisFinished)
+        self._analysis_job.start()
+
+    def _onAnalysisFinished(self, job):
+        if job is not self._analysis_job:
+            return  # The g-code has changed since the job was started.
+        self._analysis_job = None
+
+        analysis = job.getResult()
+        self._layer_print_times = [float(layer_time) for layer_time in analysis.getPrintTimesPerLayerNumber()]
+        self.layerPrintTimesChanged.emit()
+
+        analysed_print_time = analysis.getTotalPrintTime()
+        if self._engine_print_time and abs(analysed_print_time - self._engine_print_time) > 0.25 * self._engine_print_time:
+            Logger.log("w", "The print time estimate of the engine (%d s) differs from the analysed g-code (%d s)", self._engine_print_time, analysed_print_time)
+
     @pyqtSlot(str)
     def setJobName(self, name):
         # Ensure that we don't use entire path but only filename
@@ -5,6 +5,12 @@ from UM.Logger import Logger
 
 from UM.Signal import signalemitter
 
+from cura.ProgressEstimator import ProgressEstimator
+from cura.TelemetryBuffer import TelemetryBuffer
+
+import math
+import time
+
 ##  Printer output device adds extra interface options on top of output device.
 #
 #   The assumption is made the printer is a FDM printer.
@@ -38,6 +44,13 @@ class PrinterOutputDevice(QObject, OutputDevice):
         self._error_text = ""
         self._accepts_commands = True
 
+        # History of the temperatures and other telemetry of the printer, created when the first sample is recorded.
+        self._telemetry = None
+        self._telemetry_capacity = 1024
+
+        # Rate limits the progress updates of a print and estimates the time it takes.
+        self._progress_estimator = ProgressEstimator()
+
     def requestWrite(self, node, file_name = None, filter_by_machine = False):
         raise NotImplementedError("requestWrite needs to be implemented")
 
@@ -75,6 +88,8 @@ class PrinterOutputDevice(QObject, OutputDevice):
 
     timeTotalChanged = pyqtSignal()
 
+    timeRemainingChanged = pyqtSignal()
+
     jobStateChanged = pyqtSignal()
 
     jobNameChanged = pyqtSignal()
@@ -83,6 +98,9 @@ class PrinterOutputDevice(QObject, OutputDevice):
 
     acceptsCommandsChanged = pyqtSignal()
 
+    # Signal to be emitted when a row is added to the telemetry history.
+    telemetryChanged = pyqtSignal()
+
     @pyqtProperty(str, notify = jobStateChanged)
     def jobState(self):
         return self._job_state
@@ -162,12 +180,51 @@ class PrinterOutputDevice(QObject, OutputDevice):
         if self._time_total != new_total:
             self._time_total = new_total
             self.timeTotalChanged.emit()
+            self.timeRemainingChanged.emit()
 
     @pyqtSlot(float)
     def setTimeElapsed(self, time_elapsed):
         if self._time_elapsed != time_elapsed:
             self._time_elapsed = time_elapsed
             self.timeElapsedChanged.emit()
+            self.timeRemainingChanged.emit()
+
+    ##  Estimated time until the print is done.
+    #   This is the same as timeTotal - timeElapsed.
+    @pyqtProperty(float, notify = timeRemainingChanged)
+    def timeRemaining(self):
+        return max(0, self._time_total - self._time_elapsed)
+
+    ##  Start estimating the progress and time of a print.
+    #   /param estimated_print_time Estimate of the slicer of the time the print takes in seconds (as in
+    #          PrintInformation.currentPrintTime), or 0 if there is none.
+    def _startProgressEstimate(self, estimated_print_time = 0):
+        self._progress_estimator.start(estimated_print_time)
+        self.setTimeElapsed(0)
+        self.setTimeTotal(estimated_print_time)
+
+    ##  Update the progress of the print that is estimated.
+    #   The progress, elapsed and total time are only updated at a fixed rate, to not flood the interface with signals.
+    #   /param progress Progress of the print, between 0 and 100.
+    def _updateProgressEstimate(self, progress):
+        if not self._progress_estimator.update(progress):
+            return
+        self.setTimeElapsed(self._progress_estimator.getElapsedTime())
+        self.setTimeTotal(self._progress_estimator.getTotalTime())
+        if self._progress != progress:
+            self._progress = progress
+            self.progressChanged.emit()
+
+    ##  Pause or resume the clock of the print that is estimated, so the pause does not count as print time.
+    def _pauseProgressEstimate(self, paused):
+        self._progress_estimator.setPaused(paused)
+
+    ##  Stop estimating the print, which leaves no remaining time.
+    def _stopProgressEstimate(self):
+        if self._progress_estimator.isActive():
+            self.setTimeElapsed(self._progress_estimator.getElapsedTime())
+            self.setTimeTotal(self._time_elapsed)
+        self._progress_estimator.stop()
 
     ##  Home the head of the connected printer
     #   This function is "final" (do not re-implement)
@@ -274,6 +331,53 @@ class PrinterOutputDevice(QObject, OutputDevice):
             self.hotendIdChanged.emit(index, hotend_id)
 
 
+    ##  Get the names of the channels of telemetry that are recorded.
+    @pyqtProperty("QVariantList", notify = telemetryChanged)
+    def telemetryChannels(self):
+        return self._getTelemetryChannels()
+
+    ##  Get the history of a channel of telemetry, to plot it.
+    #   /param channel Name of the channel.
+    #   /returns List of [time, value] pairs, without the times at which the value was unknown.
+    @pyqtSlot(str, result = "QVariantList")
+    def getTelemetryHistory(self, channel):
+        if self._telemetry is None or channel not in self._telemetry.getChannels():
+            return []
+        times, values = self._telemetry.getHistory(channel)
+        return [[time_value, value] for time_value, value in zip(times.tolist(), values.tolist()) if not math.isnan(value)]
+
+    ##  Get the TelemetryBuffer with the history of the telemetry, or None if nothing was recorded yet.
+    def getTelemetry(self):
+        return self._telemetry
+
+    ##  Get the names of the channels of telemetry.
+    #   Children that record more telemetry should extend this list.
+    def _getTelemetryChannels(self):
+        channels = []
+        for index in range(self._num_extruders):
+            channels.append("hotend_temperature_%d" % index)
+            channels.append("target_hotend_temperature_%d" % index)
+        channels.append("bed_temperature")
+        channels.append("target_bed_temperature")
+        return channels
+
+    ##  Record a sample of the current temperatures, and of any other telemetry.
+    #   /param values Dictionary of channel names to values, which take precedence over the current temperatures.
+    def _recordTelemetry(self, values = None):
+        channels = self._getTelemetryChannels()
+        if self._telemetry is None or self._telemetry.getChannels() != channels:
+            self._telemetry = TelemetryBuffer(channels, self._telemetry_capacity)
+
+        sample = {"bed_temperature": self._bed_temperature, "target_bed_temperature": self._target_bed_temperature}
+        for index in range(min(self._num_extruders, len(self._hotend_temperatures))):
+            sample["hotend_temperature_%d" % index] = self._hotend_temperatures[index]
+            sample["target_hotend_temperature_%d" % index] = self._target_hotend_temperatures[index]
+        if values:
+            sample.update(values)
+
+        if self._telemetry.append(time.time(), sample):
+            self.telemetryChanged.emit()
+
     ##  Attempt to establish connection
     def connect(self):
         raise NotImplementedError("connect needs to be implemented")
@@ -0,0 +1,90 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import time
+
+##  Keeps track of the progress of a print and estimates the time it takes.
+#
+#   The progress is reported at a fixed rate, so a device that updates its progress after every line that it sends
+#   does not flood the interface with signals. The total time is a blend of the estimate of the slicer
+#   (PrintInformation.currentPrintTime) and the time the print took so far divided by its progress. The measured time
+#   is weighted by the fraction of the estimate that has passed, so at the start of a print the estimate of the slicer
+#   is used and over time the measurement takes over. Time spent paused is not counted.
+class ProgressEstimator:
+    ##  Create an estimator.
+    #   \param update_interval Minimum time between two progress updates, in seconds.
+    #   \param clock Function that returns the current time in seconds.
+    def __init__(self, update_interval = 0.5, clock = time.monotonic):
+        self._update_interval = update_interval
+        self._clock = clock
+
+        self._estimated_print_time = 0
+        self._start_time = None
+        self._pause_time = None  # Time at which the print was paused, or None if it is not paused.
+        self._paused_duration = 0
+        self._progress = 0
+        self._last_update_time = None
+
+    ##  Start keeping track of a print.
+    #   \param estimated_print_time Estimate of the slicer of the time the print takes in seconds, or 0 if unknown.
+    def start(self, estimated_print_time = 0):
+        self._estimated_print_time = max(0, estimated_print_time or 0)
+        self._start_time = self._clock()
+        self._pause_time = None
+        self._paused_duration = 0
+        self._progress = 0
+        self._last_update_time = None
+
+    def stop(self):
+        self._start_time = None
+        self._pause_time = None
+
+    def isActive(self):
+        return self._start_time is not None
+
+    def setPaused(self, paused):
+        now = self._clock()
+        if paused and self._pause_time is None:
+            self._pause_time = now
+        elif not paused and self._pause_time is not None:
+            self._paused_duration += now - self._pause_time
+            self._pause_time = None
+
+    ##  Set the progress of the print.
+    #   \param progress Progress between 0 and 100.
+    #   \return True if the progress should be reported now, False if it is too soon after the last report.
+    def update(self, progress):
+        self._progress = progress
+        now = self._clock()
+        if self._last_update_time is not None and now - self._last_update_time < self._update_interval and 0 < progress < 100:
+            return False
+        self._last_update_time = now
+        return True
+
+    def getProgress(self):
+        return self._progress
+
+    ##  Get the time the print has been printing, without the time it was paused, in seconds.
+    def getElapsedTime(self):
+        if self._start_time is None:
+            return 0
+        end_time = self._pause_time if self._pause_time is not None else self._clock()
+        return max(0, end_time - self._start_time - self._paused_duration)
+
+    ##  Get the estimated total time of the print, in seconds.
+    def getTotalTime(self):
+        elapsed = self.getElapsedTime()
+        fraction = min(1.0, self._progress / 100)
+        if fraction <= 0:
+            return max(self._estimated_print_time, elapsed)
+
+        measured_total = elapsed / fraction
+        if not self._estimated_print_time:
+            return measured_total
+
+        weight = min(1.0, elapsed / self._estimated_print_time)
+        return max(elapsed, weight * measured_total + (1 - weight) * self._estimated_print_time)
+
+    ##  Get the estimated time until the print is done, in seconds.
+    def getRemainingTime(self):
+        return max(0, self.getTotalTime() - self.getElapsedTime())
@@ -0,0 +1,127 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import threading
+
+import numpy
+
+##  Fixed-size history of timestamped telemetry of a printer, like its temperatures.
+#
+#   Every sample has a value for each of the channels of the buffer. Values that are unknown are stored as NaN. The
+#   samples are stored in a single numpy array, so the memory used does not grow over time.
+#
+#   With decimation, a full buffer halves its resolution by averaging every two adjacent rows, after which each row
+#   holds the average of twice as many samples. The buffer then always covers the whole history at a resolution that
+#   decreases over time. Without decimation, the oldest row is overwritten like in a plain ring buffer.
+class TelemetryBuffer:
+    ##  Create a buffer.
+    #
+    #   \param channels List of names of the values in a sample.
+    #   \param capacity Maximum number of rows that are kept. It is rounded up to an even number.
+    #   \param decimate Whether to decimate the history when the buffer is full, instead of dropping the oldest rows.
+    def __init__(self, channels, capacity = 1024, decimate = True):
+        self._channels = list(channels)
+        self._channel_indices = {channel: index + 1 for index, channel in enumerate(self._channels)}
+        self._capacity = max(2, capacity + capacity % 2)
+        self._decimate = decimate
+
+        # The first column holds the time of the row.
+        self._data = numpy.full((self._capacity, len(self._channels) + 1), numpy.nan)
+        self._start = 0  # Index of the oldest row.
+        self._count = 0
+        self._samples_per_row = 1
+
+        # Sum of the samples that are not stored in a row yet, and how many of them had a value per column.
+        self._pending_sum = numpy.zeros(len(self._channels) + 1)
+        self._pending_count = numpy.zeros(len(self._channels) + 1)
+        self._pending_samples = 0
+
+        self._lock = threading.Lock()
+
+    def getChannels(self):
+        return self._channels
+
+    def getCapacity(self):
+        return self._capacity
+
+    def __len__(self):
+        return self._count
+
+    ##  Get the number of samples that are averaged into a single row.
+    def getSamplesPerRow(self):
+        return self._samples_per_row
+
+    ##  Add a sample.
+    #
+    #   \param timestamp The time of the sample, in seconds.
+    #   \param values Dictionary of channel names to values. Channels that are not in it are unknown.
+    #   \return True if a row was stored, False if the sample is only averaged into the next row so far.
+    def append(self, timestamp, values):
+        row = numpy.full(len(self._channels) + 1, numpy.nan)
+        row[0] = timestamp
+        for channel, value in values.items():
+            index = self._channel_indices.get(channel)
+            if index is not None and value is not None:
+                row[index] = value
+
+        with self._lock:
+            known = ~numpy.isnan(row)
+            self._pending_sum[known] += row[known]
+            self._pending_count[known] += 1
+            self._pending_samples += 1
+            if self._pending_samples < self._samples_per_row:
+                return False
+
+            with numpy.errstate(invalid = "ignore", divide = "ignore"):
+                average = numpy.where(self._pending_count > 0, self._pending_sum / self._pending_count, numpy.nan)
+            self._pending_sum[:] = 0
+            self._pending_count[:] = 0
+            self._pending_samples = 0
+            self._store(average)
+            return True
+
+    ##  Get the history in chronological order.
+    #
+    #   \param channel The name of a channel, or None for all channels.
+    #   \return Tuple of an array of times and an array of the values of the channel, or a matrix with a column per
+    #           channel if no channel is given. The arrays are copies.
+    def getHistory(self, channel = None):
+        with self._lock:
+            rows = self._data[(self._start + numpy.arange(self._count)) % self._capacity]
+        if channel is None:
+            return rows[:, 0], rows[:, 1:]
+        return rows[:, 0], rows[:, self._channel_indices[channel]]
+
+    def clear(self):
+        with self._lock:
+            self._data[:] = numpy.nan
+            self._start = 0
+            self._count = 0
+            self._samples_per_row = 1
+            self._pending_sum[:] = 0
+            self._pending_count[:] = 0
+            self._pending_samples = 0
+
+    def _store(self, row):
+        if self._count == self._capacity:
+            if self._decimate:
+                self._decimateRows()
+            else:
+                self._data[self._start] = row
+                self._start = (self._start + 1) % self._capacity
+                return
+
+        self._data[(self._start + self._count) % self._capacity] = row
+        self._count += 1
+
+    ##  Merge every two adjacent rows of a full buffer. Only used with decimation, so the rows start at index 0.
+    def _decimateRows(self):
+        pairs = self._data.reshape(self._capacity // 2, 2, -1)
+        first = pairs[:, 0]
+        second = pairs[:, 1]
+        merged = numpy.where(numpy.isnan(first), second, numpy.where(numpy.isnan(second), first, (first + second) / 2))
+
+        self._count = len(merged)
+        self._data[:self._count] = merged
+        self._data[self._count:] = numpy.nan
+        self._samples_per_row *= 2
@@ -0,0 +1,117 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import os
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy
+
+_core_namespace = "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"
+_cura_namespace = "http://software.ultimaker.com/xml/cura/3mf/2015/10"
+
+_content_types = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+    <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml" />
+    <Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml" />
+</Types>
+"""
+
+_relationships = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+    <Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel" />
+</Relationships>
+"""
+
+_vertex_template = "<vertex x=\"%.9g\" y=\"%.9g\" z=\"%.9g\" />\n"
+_triangle_template = "<triangle v1=\"%d\" v2=\"%d\" v3=\"%d\" />\n"
+
+##  Writes a 3MF archive, streaming the model into a temporary file that is compressed into the zip file at the end.
+#
+#   The objects are written as they are added, in chunks of vertices and triangles that are formatted at once, so
+#   the XML of the model is never kept in memory as a whole and writing takes time linear in the number of triangles.
+#   The build items are written when the archive is closed, because they come after the objects in the model.
+#   Writing into a file in the archive directly would need Python 3.6, so the model goes through a temporary file.
+#
+#   Per-object settings are written as metadata of the object with names in the cura namespace.
+class ThreeMFArchiveWriter:
+    ##  Create a writer.
+    #
+    #   \param stream Binary file object to write the archive to.
+    #   \param chunk_size Number of vertices or triangles to format at once.
+    def __init__(self, stream, chunk_size = 16384):
+        self._chunk_size = chunk_size
+        self._build_items = []
+        self._object_ids = set()
+
+        self._archive = zipfile.ZipFile(stream, "w", compression = zipfile.ZIP_DEFLATED)
+        self._archive.writestr("[Content_Types].xml", _content_types)
+        self._archive.writestr("_rels/.rels", _relationships)
+        self._model = tempfile.NamedTemporaryFile("w", encoding = "utf-8", newline = "", suffix = ".model", delete = False)
+        self._model.write("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n")
+        self._model.write("<model unit=\"millimeter\" xml:lang=\"en-US\" xmlns=\"{0}\" xmlns:cura=\"{1}\">\n".format(_core_namespace, _cura_namespace))
+        self._model.write("<resources>\n")
+
+    ##  Add a mesh object to the model.
+    #
+    #   \param object_id The ID of the object, a positive number that is unique in the model.
+    #   \param vertices Array of the x, y and z of every vertex, in the coordinates of 3MF.
+    #   \param triangles Array of the indices of the three vertices of every triangle.
+    #   \param name The name of the object, or None.
+    #   \param settings Dictionary of the keys of per-object settings to their values, or None.
+    def addObject(self, object_id, vertices, triangles, name = None, settings = None):
+        if object_id in self._object_ids:
+            raise ValueError("There is already an object with ID {0}".format(object_id))
+        self._object_ids.add(object_id)
+
+        name_attribute = " name={0}".format(quoteattr(name)) if name else ""
+        self._model.write("<object id=\"{0}\"{1} type=\"model\">\n".format(object_id, name_attribute))
+        if settings:
+            self._model.write("<metadatagroup>\n")
+            for key, value in settings.items():
+                self._model.write("<metadata name={0}>{1}</metadata>\n".format(quoteattr("cura:" + key), escape(str(value))))
+            self._model.write("</metadatagroup>\n")
+
+        self._model.write("<mesh>\n<vertices>\n")
+        self._writeChunks(_vertex_template, numpy.asarray(vertices, dtype = numpy.float64))
+        self._model.write("</vertices>\n<triangles>\n")
+        self._writeChunks(_triangle_template, numpy.asarray(triangles, dtype = numpy.int64))
+        self._model.write("</triangles>\n</mesh>\n</object>\n")
+
+    ##  Add a build item, an instance of an object that is printed.
+    #
+    #   \param object_id The ID of the object.
+    #   \param transformation 4x4 array that transforms column vectors, or None to place the object as it is.
+    def addBuildItem(self, object_id, transformation = None):
+        if object_id not in self._object_ids:
+            raise ValueError("There is no object with ID {0}".format(object_id))
+        self._build_items.append((object_id, transformation))
+
+    ##  Write the build items and finish the archive. The stream is left open.
+    def close(self):
+        self._model.write("</resources>\n<build>\n")
+        for object_id, transformation in self._build_items:
+            if transformation is None:
+                self._model.write("<item objectid=\"{0}\" />\n".format(object_id))
+            else:
+                # The transform of 3MF is a 4x3 matrix that transforms row vectors.
+                values = numpy.asarray(transformation, dtype = numpy.float64)[:3, :].T.ravel()
+                self._model.write("<item objectid=\"{0}\" transform=\"{1}\" />\n".format(object_id, " ".join("%.9g" % value for value in values)))
+        self._model.write("</build>\n</model>\n")
+        self._model.close()
+        try:
+            self._archive.write(self._model.name, "3D/3dmodel.model")
+        finally:
+            os.remove(self._model.name)
+        self._archive.close()
+
+    ##  Stop writing without finishing the archive, such as after an error, and remove the temporary file of the model.
+    def abort(self):
+        self._model.close()
+        os.remove(self._model.name)
+
+    def _writeChunks(self, template, values):
+        for start in range(0, len(values), self._chunk_size):
+            chunk = values[start:start + self._chunk_size]
+            self._model.write((template * len(chunk)) % tuple(chunk.ravel().tolist()))
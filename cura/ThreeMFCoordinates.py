@@ -0,0 +1,47 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+# Rotation from the coordinates of Cura, with Y up and the front of the plate along Z, to those of 3MF, with Z up and
+# the back of the plate along Y.
+_rotation_to_3mf = numpy.array([[1, 0, 0, 0],
+                                [0, 0, -1, 0],
+                                [0, 1, 0, 0],
+                                [0, 0, 0, 1]], dtype = numpy.float64)
+_rotation_from_3mf = _rotation_to_3mf.T
+
+##  Get the transformation from the world coordinates of Cura to the build coordinates of 3MF.
+#
+#   The origin of Cura is in the middle of the build plate, while the origin of 3MF is in its front left corner.
+#
+#   \param machine_width The width of the build plate.
+#   \param machine_depth The depth of the build plate.
+#   \return 4x4 array that transforms column vectors.
+def getPlateTransformation(machine_width, machine_depth):
+    translation = numpy.identity(4)
+    translation[:3, 3] = [machine_width / 2, machine_depth / 2, 0]
+    return translation.dot(_rotation_to_3mf)
+
+##  Convert the world transformation of a node to the transform of a 3MF build item.
+#
+#   The mesh of the object is written in the coordinates of 3MF, so the transformation is rotated on both sides and
+#   moved from the middle of the build plate to its corner.
+#
+#   \param transformation 4x4 array of the world transformation of the node.
+#   \param machine_width The width of the build plate.
+#   \param machine_depth The depth of the build plate.
+#   \return 4x4 array of the transform of the build item.
+def toThreeMFTransformation(transformation, machine_width, machine_depth):
+    return getPlateTransformation(machine_width, machine_depth).dot(transformation).dot(_rotation_from_3mf)
+
+##  Convert the transform of a 3MF build item to the transformation of a node.
+#
+#   This is the inverse of toThreeMFTransformation, for a mesh that is rotated to the coordinates of Cura.
+#
+#   \param transformation 4x4 array of the transform of the build item.
+#   \param machine_width The width of the build plate.
+#   \param machine_depth The depth of the build plate.
+#   \return 4x4 array of the transformation of the node.
+def fromThreeMFTransformation(transformation, machine_width, machine_depth):
+    return numpy.linalg.inv(getPlateTransformation(machine_width, machine_depth)).dot(transformation).dot(_rotation_to_3mf)
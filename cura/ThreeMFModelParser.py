@@ -0,0 +1,164 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from operator import itemgetter
+
+import numpy
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+_core_namespace = "{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}"
+_object_tag = _core_namespace + "object"
+_vertex_tag = _core_namespace + "vertex"
+_vertices_tag = _core_namespace + "vertices"
+_triangle_tag = _core_namespace + "triangle"
+_triangles_tag = _core_namespace + "triangles"
+_item_tag = _core_namespace + "item"
+
+_vertex_attributes = itemgetter("x", "y", "z")
+_triangle_attributes = itemgetter("v1", "v2", "v3")
+
+##  A mesh object of a 3MF model.
+class ThreeMFObject:
+    def __init__(self, object_id, name, vertices, triangles):
+        self.id = object_id
+        self.name = name
+        self.vertices = vertices  # Array of the x, y and z of every vertex.
+        self.triangles = triangles  # Array of the indices of the three vertices of every triangle.
+
+    ##  Get the three corners of every triangle.
+    #   \return Array with the x, y and z of the corners of the triangles after each other.
+    def getTriangleVertices(self):
+        return self.vertices[self.triangles].reshape(-1, 3)
+
+##  The objects and build items of a 3MF model.
+class ThreeMFModel:
+    def __init__(self, objects, build_items):
+        self.objects = objects  # List of ThreeMFObject, in the order of the file.
+        self.build_items = build_items  # Object ID to the transform of its first build item, or None if it has none.
+
+    ##  Get the transformation of the first build item of an object.
+    #
+    #   The transform of 3MF is saved as the rows of a 4x3 matrix that multiplies row vectors. This returns the
+    #   4x4 matrix that multiplies column vectors, as everyone else uses matrices.
+    #
+    #   \param object_id The ID of the object.
+    #   \return 4x4 array, or None if the object has no build item with a transform.
+    def getTransformation(self, object_id):
+        transform = self.build_items.get(object_id)
+        if not transform:
+            return None
+        values = numpy.array(transform.split(), dtype = numpy.float64)
+        if len(values) != 12:
+            raise ValueError("The transform of object {0} does not have 12 values".format(object_id))
+        matrix = numpy.identity(4)
+        matrix[:3, :] = values.reshape(4, 3).T
+        return matrix
+
+##  Parses the 3D/3dmodel.model part of 3MF files.
+#
+#   The model is parsed as a stream, so no tree of the whole model is kept in memory. The attributes of the vertices
+#   and triangles are collected in chunks, which are converted to numpy arrays at once.
+class ThreeMFModelParser:
+    ##  Create a parser.
+    #   \param chunk_size Number of vertices or triangles to collect before converting them.
+    def __init__(self, chunk_size = 65536):
+        self._chunk_size = chunk_size
+
+    ##  Parse a model.
+    #
+    #   The build items are only known at the end of the model, but the objects come before them, so they can be
+    #   processed while the rest of the model is parsed.
+    #
+    #   \param stream Binary file object with the XML of the model, such as an entry of the 3MF archive.
+    #   \param object_callback Function that is called with every ThreeMFObject as soon as it is parsed.
+    #   \return ThreeMFModel with the mesh objects of the model and the build items.
+    def parse(self, stream, object_callback = None):
+        objects = []
+        build_items = {}
+
+        object_attributes = None
+        vertices = _ChunkedArray(numpy.float32, self._chunk_size)
+        triangles = _ChunkedArray(numpy.int32, self._chunk_size)
+        values = []  # The attributes of the vertices or the triangles of the current chunk.
+        parent = None  # The <vertices> or <triangles> element, to remove the elements that are parsed from.
+
+        for event, element in ET.iterparse(stream, events = ("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == _vertices_tag or tag == _triangles_tag:
+                    parent = element
+                elif tag == _object_tag:
+                    object_attributes = dict(element.attrib)
+                elif tag == _item_tag:
+                    object_id = element.get("objectid")
+                    if object_id not in build_items:
+                        build_items[object_id] = element.get("transform")
+                continue
+
+            if tag == _vertex_tag:
+                values.extend(_vertex_attributes(element.attrib))
+                if len(values) >= 3 * self._chunk_size:
+                    vertices.append(values)
+                    values = []
+                    del parent[:]
+            elif tag == _triangle_tag:
+                values.extend(_triangle_attributes(element.attrib))
+                if len(values) >= 3 * self._chunk_size:
+                    triangles.append(values)
+                    values = []
+                    del parent[:]
+            elif tag == _vertices_tag:
+                vertices.append(values)
+                values = []
+                element.clear()
+            elif tag == _triangles_tag:
+                triangles.append(values)
+                values = []
+                element.clear()
+            elif tag == _object_tag:
+                if len(vertices) or len(triangles):
+                    mesh_object = self._createObject(object_attributes, vertices.getArray(3), triangles.getArray(3))
+                    objects.append(mesh_object)
+                    if object_callback:
+                        object_callback(mesh_object)
+                vertices.clear()
+                triangles.clear()
+                element.clear()
+
+        return ThreeMFModel(objects, build_items)
+
+    def _createObject(self, attributes, vertices, triangles):
+        object_id = attributes.get("id")
+        if len(triangles) and (triangles.min() < 0 or triangles.max() >= len(vertices)):
+            raise ValueError("Object {0} has triangles with vertices that don't exist".format(object_id))
+        return ThreeMFObject(object_id, attributes.get("name"), vertices, triangles)
+
+##  Array that grows by chunks, doubling its capacity so appending takes linear time in total.
+class _ChunkedArray:
+    def __init__(self, dtype, chunk_size):
+        self._dtype = dtype
+        self._data = numpy.empty(3 * chunk_size, dtype = dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    ##  Append values, given as strings.
+    def append(self, values):
+        if self._size + len(values) > len(self._data):
+            data = numpy.empty(max(2 * len(self._data), self._size + len(values)), dtype = self._dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:self._size + len(values)] = numpy.array(values, dtype = self._dtype)
+        self._size += len(values)
+
+    ##  Get a copy of the values, with the given number of columns.
+    def getArray(self, columns):
+        return self._data[:self._size].reshape(-1, columns).copy()
+
+    def clear(self):
+        self._size = 0
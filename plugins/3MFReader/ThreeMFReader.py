@@ -1,6 +1,7 @@
 # Copyright (c) 2015 Ultimaker B.V.
 # Cura is released under the terms of the AGPLv3 or higher.
 
+from UM.Application import Application
 from UM.Mesh.MeshReader import MeshReader
 from UM.Mesh.MeshBuilder import MeshBuilder
 from UM.Logger import Logger
@@ -11,14 +12,15 @@ from UM.Scene.GroupDecorator import GroupDecorator
 from UM.Math.Quaternion import Quaternion
 from UM.Job import Job
 
+from cura.ThreeMFModelParser import ThreeMFModelParser
+from cura import ThreeMFCoordinates
+
+from concurrent.futures import ThreadPoolExecutor
 import math
+import numpy
+import os
 import zipfile
 
-try:
-    import xml.etree.cElementTree as ET
-except ImportError:
-    import xml.etree.ElementTree as ET
-
 ##    Base implementation for reading 3MF files. Has no support for textures. Only loads meshes!
 class ThreeMFReader(MeshReader):
     def __init__(self):
@@ -34,76 +36,31 @@ class ThreeMFReader(MeshReader):
         result = SceneNode()
         # The base object of 3mf is a zipped archive.
         archive = zipfile.ZipFile(file_name, "r")
+        executor = ThreadPoolExecutor(max_workers = os.cpu_count() or 1)
         try:
-            root = ET.parse(archive.open("3D/3dmodel.model"))
+            # The model is parsed while it is unzipped, into arrays of vertices and triangles. The meshes of the objects
+            # are built on the worker threads while the rest of the model is parsed.
+            mesh_futures = []
+            model = ThreeMFModelParser().parse(archive.open("3D/3dmodel.model"),
+                                               object_callback = lambda entry: mesh_futures.append(executor.submit(self._buildMesh, entry, file_name)))
 
             # There can be multiple objects, try to load all of them.
-            objects = root.findall("./3mf:resources/3mf:object", self._namespaces)
+            objects = model.objects
             if len(objects) == 0:
                 Logger.log("w", "No objects found in 3MF file %s, either the file is corrupt or you are using an outdated format", file_name)
                 return None
 
-            for entry in objects:
-                mesh_builder = MeshBuilder()
+            machine_width, machine_depth = self._getPlateSize()
+            for entry, mesh_future in zip(objects, mesh_futures):
                 node = SceneNode()
-                vertex_list = []
-                #for vertex in entry.mesh.vertices.vertex:
-                for vertex in entry.findall(".//3mf:vertex", self._namespaces):
-                    vertex_list.append([vertex.get("x"), vertex.get("y"), vertex.get("z")])
-                    Job.yieldThread()
-
-                triangles = entry.findall(".//3mf:triangle", self._namespaces)
-                mesh_builder.reserveFaceCount(len(triangles))
-
-                for triangle in triangles:
-                    v1 = int(triangle.get("v1"))
-                    v2 = int(triangle.get("v2"))
-                    v3 = int(triangle.get("v3"))
-
-                    mesh_builder.addFaceByPoints(vertex_list[v1][0], vertex_list[v1][1], vertex_list[v1][2],
-                                                 vertex_list[v2][0], vertex_list[v2][1], vertex_list[v2][2],
-                                                 vertex_list[v3][0], vertex_list[v3][1], vertex_list[v3][2])
-
-                    Job.yieldThread()
-
-                # Rotate the model; We use a different coordinate frame.
-                rotation = Matrix()
-                rotation.setByRotationAxis(-0.5 * math.pi, Vector(1, 0, 0))
-
-                # TODO: We currently do not check for normals and simply recalculate them.
-                mesh_builder.calculateNormals()
-                mesh_builder.setFileName(file_name)
-                node.setMeshData(mesh_builder.build().getTransformed(rotation))
+                node.setMeshData(mesh_future.result())
                 node.setSelectable(True)
 
-                transformations = root.findall("./3mf:build/3mf:item[@objectid='{0}']".format(entry.get("id")), self._namespaces)
-                transformation = transformations[0] if transformations else None
-                if transformation is not None and transformation.get("transform"):
-                    splitted_transformation = transformation.get("transform").split()
-                    ## Transformation is saved as:
-                    ## M00 M01 M02 0.0
-                    ## M10 M11 M12 0.0
-                    ## M20 M21 M22 0.0
-                    ## M30 M31 M32 1.0
-                    ## We switch the row & cols as that is how everyone else uses matrices!
-                    temp_mat = Matrix()
-                    # Rotation & Scale
-                    temp_mat._data[0,0] = splitted_transformation[0]
-                    temp_mat._data[1,0] = splitted_transformation[1]
-                    temp_mat._data[2,0] = splitted_transformation[2]
-                    temp_mat._data[0,1] = splitted_transformation[3]
-                    temp_mat._data[1,1] = splitted_transformation[4]
-                    temp_mat._data[2,1] = splitted_transformation[5]
-                    temp_mat._data[0,2] = splitted_transformation[6]
-                    temp_mat._data[1,2] = splitted_transformation[7]
-                    temp_mat._data[2,2] = splitted_transformation[8]
-
-                    # Translation
-                    temp_mat._data[0,3] = splitted_transformation[9]
-                    temp_mat._data[1,3] = splitted_transformation[10]
-                    temp_mat._data[2,3] = splitted_transformation[11]
-
-                    node.setTransformation(temp_mat)
+                # Without a transform the object is where its mesh is on the build plate of 3MF.
+                transformation = model.getTransformation(entry.id)
+                if transformation is None:
+                    transformation = numpy.identity(4)
+                node.setTransformation(Matrix(ThreeMFCoordinates.fromThreeMFTransformation(transformation, machine_width, machine_depth)))
 
                 result.addChild(node)
 
@@ -117,6 +74,8 @@ class ThreeMFReader(MeshReader):
                 result = result.getChildren()[0] # Only one object found, return that.
         except Exception as e:
             Logger.log("e", "exception occured in 3mf reader: %s", e)
+        finally:
+            executor.shutdown(wait = False)
 
         try: # Selftest - There might be more functions that should fail
             boundingBox = result.getBoundingBox()
@@ -125,3 +84,32 @@ class ThreeMFReader(MeshReader):
             return None
 
         return result
+
+    ##  Get the size of the build plate, to move the objects from its corner to its middle.
+    #   \return Tuple of the width and depth of the build plate, which are 0 without a machine.
+    def _getPlateSize(self):
+        global_container_stack = Application.getInstance().getGlobalContainerStack()
+        if not global_container_stack:
+            return 0, 0
+        return global_container_stack.getProperty("machine_width", "value"), global_container_stack.getProperty("machine_depth", "value")
+
+    ##  Build the mesh of an object of the model.
+    #
+    #   This runs on a worker thread, so it only creates mesh data and no scene nodes.
+    #
+    #   \param entry The ThreeMFObject to build the mesh of.
+    #   \param file_name The name of the 3MF file.
+    #   \return MeshData of the object.
+    def _buildMesh(self, entry, file_name):
+        mesh_builder = MeshBuilder()
+        # Every triangle gets vertices of its own, as with addFaceByPoints, so the normals are those of the faces.
+        mesh_builder.addVertices(entry.getTriangleVertices())
+
+        # TODO: We currently do not check for normals and simply recalculate them.
+        mesh_builder.calculateNormals()
+        mesh_builder.setFileName(file_name)
+
+        # Rotate the model; We use a different coordinate frame.
+        rotation = Matrix()
+        rotation.setByRotationAxis(-0.5 * math.pi, Vector(1, 0, 0))
+        return mesh_builder.build().getTransformed(rotation)
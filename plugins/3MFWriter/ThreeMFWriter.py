@@ -0,0 +1,88 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Application import Application
+from UM.Mesh.MeshWriter import MeshWriter
+from UM.Logger import Logger
+from UM.Scene.Iterator.BreadthFirstIterator import BreadthFirstIterator
+from UM.Scene.SceneNode import SceneNode
+from UM.Signal import Signal, signalemitter
+
+from cura.ThreeMFArchiveWriter import ThreeMFArchiveWriter
+from cura import ThreeMFCoordinates
+
+import numpy
+
+##  Writes the objects of the scene to a 3MF file.
+#
+#   Every object is written with its mesh and transformation in the coordinates of 3MF, as a build item on the
+#   build plate, so the 3MF reader and other programs load the plate back where the objects were. The per-object
+#   settings are written along as metadata for reference, but are not read back. The model is streamed into the
+#   archive, so it is never kept in memory as a whole.
+@signalemitter
+class ThreeMFWriter(MeshWriter):
+    def __init__(self):
+        super().__init__()
+
+    ##  Emitted with the progress of a write, between 0 and 100.
+    progress = Signal()
+
+    def write(self, stream, node, mode = MeshWriter.OutputMode.BinaryMode):
+        if mode != MeshWriter.OutputMode.BinaryMode:
+            Logger.log("e", "3MF Writer does not support text mode.")
+            return False
+
+        nodes = [n for n in BreadthFirstIterator(node) if type(n) is SceneNode and n.getMeshData() and n.getMeshData().getVertices() is not None]
+        if not nodes:
+            Logger.log("e", "There are no objects to write to the 3MF file.")
+            return False
+
+        triangle_counts = [self._getTriangleCount(n.getMeshData()) for n in nodes]
+        total_triangle_count = max(sum(triangle_counts), 1)
+        written_triangle_count = 0
+
+        machine_width, machine_depth = self._getPlateSize()
+        archive = ThreeMFArchiveWriter(stream)
+        try:
+            for object_id, (n, triangle_count) in enumerate(zip(nodes, triangle_counts), 1):
+                mesh_data = n.getMeshData()
+                vertices = mesh_data.getVertices()
+                # 3MF has Z up. This is the inverse of the rotation of the 3MF reader.
+                vertices = numpy.column_stack((vertices[:, 0], -vertices[:, 2], vertices[:, 1]))
+                indices = mesh_data.getIndices()
+                if indices is None:
+                    indices = numpy.arange(triangle_count * 3).reshape(-1, 3)
+
+                archive.addObject(object_id, vertices, indices, name = n.getName(), settings = self._getSettings(n))
+                transformation = ThreeMFCoordinates.toThreeMFTransformation(n.getWorldTransformation().getData(), machine_width, machine_depth)
+                archive.addBuildItem(object_id, transformation)
+
+                written_triangle_count += triangle_count
+                self.progress.emit(100 * written_triangle_count / total_triangle_count)
+        except:
+            archive.abort()
+            raise
+        archive.close()
+        return True
+
+    ##  Get the size of the build plate, to move the objects from its middle to its corner.
+    #   \return Tuple of the width and depth of the build plate, which are 0 without a machine.
+    def _getPlateSize(self):
+        global_container_stack = Application.getInstance().getGlobalContainerStack()
+        if not global_container_stack:
+            return 0, 0
+        return global_container_stack.getProperty("machine_width", "value"), global_container_stack.getProperty("machine_depth", "value")
+
+    def _getTriangleCount(self, mesh_data):
+        indices = mesh_data.getIndices()
+        if indices is not None:
+            return len(indices)
+        return mesh_data.getVertexCount() // 3
+
+    ##  Get the per-object settings of a node.
+    #   \return Dictionary of setting keys to their values, or None if the node has no settings of its own.
+    def _getSettings(self, node):
+        stack = node.callDecoration("getStack")
+        if not stack:
+            return None
+        return {key: stack.getProperty(key, "value") for key in stack.getTop().getAllKeys()}
@@ -54,9 +54,9 @@ class ProcessSlicedLayersJob(Job):
 
         new_node = SceneNode()
 
-        ## Remove old layer data (if any)
+        ## Remove old layer data (if any), but not that of g-code files that were opened.
         for node in DepthFirstIterator(self._scene.getRoot()):
-            if node.callDecoration("getLayerData"):
+            if node.callDecoration("getLayerData") and node.getParent() is Application.getInstance().getBuildVolume():
                 node.getParent().removeChild(node)
                 break
             if self._abort_requested:
@@ -88,9 +88,9 @@ class StartSliceJob(Job):
                 return
 
         with self._scene.getSceneLock():
-            # Remove old layer data.
+            # Remove old layer data. Layer data of g-code files that were opened is not a child of the build volume.
             for node in DepthFirstIterator(self._scene.getRoot()):
-                if node.callDecoration("getLayerData"):
+                if node.callDecoration("getLayerData") and node.getParent() is Application.getInstance().getBuildVolume():
                     node.getParent().removeChild(node)
                     break
 
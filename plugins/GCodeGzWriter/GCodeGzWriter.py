@@ -0,0 +1,57 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import gzip
+import io
+
+from UM.Mesh.MeshWriter import MeshWriter
+from UM.Logger import Logger
+from UM.PluginRegistry import PluginRegistry
+from UM.Preferences import Preferences
+from UM.Signal import Signal, signalemitter
+
+##  Writes g-code to a gzip compressed file.
+#
+#   The g-code itself, including the settings at the end of the file, is
+#   written by the g-code writer. This writer compresses it while it is being
+#   written, so the uncompressed g-code is never kept in memory as a whole.
+#   Compressed g-code is often five to ten times smaller, which makes it much
+#   faster to copy to slow SD cards and network shares.
+@signalemitter
+class GCodeGzWriter(MeshWriter):
+    def __init__(self):
+        super().__init__()
+
+        # Compression level of gzip, from 1 (fastest) to 9 (smallest).
+        Preferences.getInstance().addPreference("gcode_gz_writer/compression_level", 6)
+
+    ##  Emitted with the progress of a write, between 0 and 100.
+    progress = Signal()
+
+    def write(self, stream, node, mode = MeshWriter.OutputMode.BinaryMode):
+        if mode != MeshWriter.OutputMode.BinaryMode:
+            Logger.log("e", "Compressed GCode Writer does not support text mode.")
+            return False
+
+        gcode_writer = PluginRegistry.getInstance().getPluginObject("GCodeWriter")
+        if not gcode_writer:
+            Logger.log("e", "No GCode Writer available to write the compressed g-code with.")
+            return False
+
+        compression_level = Preferences.getInstance().getValue("gcode_gz_writer/compression_level")
+        try:
+            compression_level = min(9, max(1, int(compression_level)))
+        except (TypeError, ValueError):
+            compression_level = 6
+
+        gcode_writer.progress.connect(self.progress)
+        try:
+            # Closing the gzip file writes its trailer, but leaves the stream open for the output device.
+            with gzip.GzipFile(fileobj = stream, mode = "wb", compresslevel = compression_level) as gzip_stream:
+                text_stream = io.TextIOWrapper(gzip_stream, encoding = "utf-8", newline = "")
+                result = gcode_writer.write(text_stream, node, MeshWriter.OutputMode.TextMode)
+                text_stream.flush()
+                text_stream.detach()  # Don't let the text stream close the gzip file when it is collected.
+        finally:
+            gcode_writer.progress.disconnect(self.progress)
+        return result
@@ -3,12 +3,14 @@
 
 import re #Regular expressions for parsing escape characters in the settings.
 import json
+import gzip
 
 from UM.Settings.InstanceContainer import InstanceContainer
 from UM.Logger import Logger
 from UM.i18n import i18nCatalog
 catalog = i18nCatalog("cura")
 
+from cura.GCodeSettingsFooter import getGzipUncompressedSize, parseSettingsBlock, readSettingsBlock
 from cura.ProfileReader import ProfileReader
 
 ##  A class that reads profile data from g-code files.
@@ -45,23 +47,30 @@ class GCodeProfileReader(ProfileReader):
     #   specified file was no g-code or contained no parsable profile, \code
     #   None \endcode is returned.
     def read(self, file_name):
-        if file_name.split(".")[-1] != "gcode":
+        if file_name.endswith(".gcode"):
+            open_function = open
+        elif file_name.endswith(".gcode.gz"):
+            open_function = gzip.open
+        else:
             return None
 
         prefix = ";SETTING_" + str(GCodeProfileReader.version) + " "
         prefix_length = len(prefix)
 
-        # Loading all settings from the file.
-        # They are all at the end, but Python has no reverse seek any more since Python3.
-        # TODO: Consider moving settings to the start?
-        serialized = ""  # Will be filled with the serialized profile.
         try:
-            with open(file_name) as f:
-                for line in f:
-                    if line.startswith(prefix):
-                        # Remove the prefix and the newline from the line and add it to the rest.
-                        serialized += line[prefix_length : -1]
-        except IOError as e:
+            # The footer at the end of the file points to the settings, so only those have to be read.
+            serialized = self._readSettingsFromFooter(file_name, open_function)
+
+            if serialized is None:
+                # Files without a footer have to be scanned for the settings. They are all at the end.
+                serialized_lines = []
+                with open_function(file_name, "rt") as f:
+                    for line in f:
+                        if line.startswith(prefix):
+                            # Remove the prefix and the newline from the line and add it to the rest.
+                            serialized_lines.append(line[prefix_length : -1])
+                serialized = "".join(serialized_lines)
+        except (IOError, EOFError) as e: # EOFError for a compressed file that was cut off.
             Logger.log("e", "Unable to open file %s for reading: %s", file_name, str(e))
             return None
 
@@ -75,6 +84,24 @@ class GCodeProfileReader(ProfileReader):
 
         return [readQualityProfileFromString(profile_string) for profile_string in profile_strings]
 
+    ##  Read the settings that the footer of a g-code file points to.
+    #
+    #   \param file_name The name of the file to read the settings from.
+    #   \param open_function Function to open the file with, either open or gzip.open.
+    #   \return The serialized settings, still escaped, or None if the file has no valid footer.
+    def _readSettingsFromFooter(self, file_name, open_function):
+        size = None
+        if open_function is gzip.open:
+            # Compressed files can't seek from the end, but their size is stored at the end of the compressed file.
+            with open(file_name, "rb") as f:
+                size = getGzipUncompressedSize(f)
+
+        with open_function(file_name, "rb") as f:
+            block = readSettingsBlock(f, GCodeProfileReader.version, size)
+        if block is None:
+            return None
+        return parseSettingsBlock(block, GCodeProfileReader.version)
+
 ##  Unescape a string which has been escaped for use in a gcode comment.
 #
 #   \param string The string to unescape.
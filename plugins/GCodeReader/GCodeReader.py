@@ -0,0 +1,106 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Application import Application
+from UM.Job import Job
+from UM.Logger import Logger
+from UM.Math.Vector import Vector
+from UM.Mesh.MeshData import MeshData
+from UM.Mesh.MeshReader import MeshReader
+from UM.Message import Message
+from UM.i18n import i18nCatalog
+
+from cura import LayerDataBuilder
+from cura import LayerDataDecorator
+from cura import LayerPolygon
+from cura.GCodeLayerCollector import GCodeLayerCollector
+from cura.GCodeParser import GCodeParser
+from cura.GCodeSceneNode import GCodeSceneNode
+
+import numpy
+import os
+
+catalog = i18nCatalog("cura")
+
+##  Reads g-code files into layer data, so they can be shown in the layer view.
+#
+#   The file is parsed in blocks by a GCodeParser, so large files never have to be in memory as text. The moves are
+#   collected into the same LayerPolygon structures that are built for g-code that comes from the engine.
+class GCodeReader(MeshReader):
+    def __init__(self):
+        super().__init__()
+        self._supported_extensions = [".gcode", ".g"]
+
+        # The type of line for every ";TYPE:" comment, in the order of GCodeParser.LineTypes.
+        self._type_map = [LayerPolygon.LayerPolygon.NoneType, LayerPolygon.LayerPolygon.Inset0Type, LayerPolygon.LayerPolygon.InsetXType,
+                          LayerPolygon.LayerPolygon.SkinType, LayerPolygon.LayerPolygon.SupportType, LayerPolygon.LayerPolygon.SkirtType,
+                          LayerPolygon.LayerPolygon.InfillType, LayerPolygon.LayerPolygon.SupportInfillType]
+
+    def read(self, file_name):
+        progress = Message(catalog.i18nc("@info:status", "Parsing G-code"), 0, False, 0)
+        progress.show()
+
+        global_container_stack = Application.getInstance().getGlobalContainerStack()
+        filament_diameter = global_container_stack.getProperty("material_diameter", "value") if global_container_stack else 2.85
+        collector = GCodeLayerCollector(self._type_map, LayerPolygon.LayerPolygon.MoveCombingType, LayerPolygon.LayerPolygon.MoveRetractionType, filament_diameter)
+
+        try:
+            file_size = max(1, os.path.getsize(file_name))
+            with open(file_name, "rb") as f:
+                for moves in GCodeParser().parse(f):
+                    collector.addMoves(moves)
+                    progress.setProgress(f.tell() * 90 / file_size)
+                    Job.yieldThread()
+        except IOError as e:
+            Logger.log("e", "Unable to read g-code file %s: %s", file_name, str(e))
+            progress.hide()
+            return None
+
+        layers = collector.getLayers()
+        if not layers:
+            Logger.log("w", "No layers found in g-code file %s", file_name)
+            progress.hide()
+            return None
+
+        layer_data = LayerDataBuilder.LayerDataBuilder()
+        minimum = numpy.full(3, numpy.inf, numpy.float32)
+        maximum = numpy.full(3, -numpy.inf, numpy.float32)
+        for layer in layers:
+            layer_data.addLayer(layer.index)
+            this_layer = layer_data.getLayer(layer.index)
+            layer_data.setLayerHeight(layer.index, layer.height * 1000)  # In microns, like the layers of the engine.
+            layer_data.setLayerThickness(layer.index, layer.thickness * 1000)
+
+            for path in layer.paths:
+                # Convert from g-code to scene coordinates, where Y is up.
+                points = numpy.empty((len(path.points), 3), numpy.float32)
+                points[:, 0] = path.points[:, 0]
+                points[:, 1] = path.points[:, 2]
+                points[:, 2] = -path.points[:, 1]
+                minimum = numpy.minimum(minimum, points.min(axis = 0))
+                maximum = numpy.maximum(maximum, points.max(axis = 0))
+
+                this_poly = LayerPolygon.LayerPolygon(layer_data, path.extruder, path.line_types.reshape((-1, 1)), points, path.line_widths.reshape((-1, 1)))
+                this_poly.buildCache()
+                this_layer.polygons.append(this_poly)
+
+            progress.setProgress(90 + 9 * (layer.index + 1) / len(layers))
+            Job.yieldThread()
+
+        minimum[1] = min(minimum[1], 0)  # The print stands on the build plate, even if its first layer is higher.
+
+        decorator = LayerDataDecorator.LayerDataDecorator()
+        decorator.setLayerData(layer_data.build())
+
+        node = GCodeSceneNode()
+        node.addDecorator(decorator)
+        node.setMeshData(MeshData())
+        node.setExtents(minimum, maximum)
+
+        # The coordinates of the g-code are those of the machine.
+        if global_container_stack and not global_container_stack.getProperty("machine_center_is_zero", "value"):
+            node.setPosition(Vector(-global_container_stack.getProperty("machine_width", "value") / 2, 0.0, global_container_stack.getProperty("machine_depth", "value") / 2))
+
+        progress.setProgress(100)
+        progress.hide()
+        return node
@@ -4,9 +4,13 @@
 from UM.Mesh.MeshWriter import MeshWriter
 from UM.Logger import Logger
 from UM.Application import Application
+from UM.Job import Job
+from UM.Signal import Signal, signalemitter
 import UM.Settings.ContainerRegistry
 
 from cura.CuraApplication import CuraApplication
+from cura.GCodeSettingsFooter import createFooter
+from cura.GCodeStreamWriter import GCodeStreamWriter
 from cura.Settings.ExtruderManager import ExtruderManager
 
 from UM.Settings.InstanceContainer import InstanceContainer
@@ -24,6 +28,11 @@ import json
 #   So this plug-in takes the g-code that is stored in the root of the scene
 #   node tree, adds a bit of extra information about the profiles and writes
 #   that to the output device.
+#
+#   The g-code is written in large blocks, and the progress is emitted through
+#   the progress signal after every block. Output devices can pass it on to
+#   the WriteMeshJob that runs the writer.
+@signalemitter
 class GCodeWriter(MeshWriter):
     ##  The file format version of the serialised g-code.
     #
@@ -46,6 +55,9 @@ class GCodeWriter(MeshWriter):
     def __init__(self):
         super().__init__()
 
+    ##  Emitted with the progress of a write, between 0 and 100.
+    progress = Signal()
+
     def write(self, stream, node, mode = MeshWriter.OutputMode.TextMode):
         if mode != MeshWriter.OutputMode.TextMode:
             Logger.log("e", "GCode Writer does not support non-text mode.")
@@ -54,15 +66,38 @@ class GCodeWriter(MeshWriter):
         scene = Application.getInstance().getController().getScene()
         gcode_list = getattr(scene, "gcode_list")
         if gcode_list:
-            for gcode in gcode_list:
-                stream.write(gcode)
+            writer = GCodeStreamWriter(stream, progress_callback = self._onWriteProgress)
+            writer.writeChunks(gcode_list)
             # Serialise the current container stack and put it at the end of the file.
             settings = self._serialiseSettings(Application.getInstance().getGlobalContainerStack())
-            stream.write(settings)
+            if settings:
+                # Add a footer with the position of the settings, so they can be read without scanning the file.
+                settings_offset = self._getStreamPosition(stream, writer)
+                writer.write(settings)
+                settings_length = self._getStreamPosition(stream, writer) - settings_offset
+                writer.write(createFooter(GCodeWriter.version, settings_offset, settings_length))
+            writer.flush()
             return True
 
         return False
 
+    ##  Get the position in the file that is written.
+    #
+    #   The position of the stream is used if it has one, as that is in bytes
+    #   and includes the newlines that are translated to the line endings of
+    #   the platform. Otherwise it is the number of characters written.
+    def _getStreamPosition(self, stream, writer):
+        writer.flush()
+        try:
+            return stream.tell()
+        except (AttributeError, OSError, ValueError):
+            return writer.getPosition()
+
+    ##  Called after every block of g-code that is written.
+    def _onWriteProgress(self, progress):
+        self.progress.emit(progress)
+        Job.yieldThread()  # Writing is done in a job, so give the interface some time to show the progress.
+
     ##  Create a new container with container 2 as base and container 1 written over it.
     def _createFlattenedContainerInstance(self, instance_container1, instance_container2):
         flat_container = InstanceContainer(instance_container2.getName())
@@ -118,9 +153,8 @@ class GCodeWriter(MeshWriter):
         escaped_string = pattern.sub(lambda m: GCodeWriter.escape_characters[re.escape(m.group(0))], json_string)
 
         # Introduce line breaks so that each comment is no longer than 80 characters. Prepend each line with the prefix.
-        result = ""
-
         # Lines have 80 characters, so the payload of each line is 80 - prefix.
-        for pos in range(0, len(escaped_string), 80 - prefix_length):
-            result += prefix + escaped_string[pos : pos + 80 - prefix_length] + "\n"
-        return result
+        lines = [escaped_string[pos : pos + 80 - prefix_length] for pos in range(0, len(escaped_string), 80 - prefix_length)]
+        if not lines:
+            return ""
+        return prefix + ("\n" + prefix).join(lines) + "\n"
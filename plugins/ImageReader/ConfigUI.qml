@@ -175,6 +175,28 @@ UM.Dialog
                 }
             }
         }
+
+        UM.TooltipArea {
+            Layout.fillWidth:true
+            height: childrenRect.height
+            text: catalog.i18nc("@info:tooltip","How large images are scaled down. Averaging keeps the most detail without noise, the nearest pixel is the sharpest but can be noisy.")
+            Row {
+                width: parent.width
+
+                Label {
+                    text: catalog.i18nc("@action:label","Scaling")
+                    width: 150
+                    anchors.verticalCenter: parent.verticalCenter
+                }
+                ComboBox {
+                    id: resampling_filter
+                    objectName: "Resampling_Filter"
+                    model: [ catalog.i18nc("@item:inlistbox","Average"), catalog.i18nc("@item:inlistbox","Bilinear"), catalog.i18nc("@item:inlistbox","Nearest pixel") ]
+                    width: 180
+                    onCurrentIndexChanged: { manager.onResamplingFilterChanged(currentIndex) }
+                }
+            }
+        }
     }
 
     rightButtons: [
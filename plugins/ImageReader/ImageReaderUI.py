@@ -11,6 +11,8 @@ from UM.Application import Application
 from UM.PluginRegistry import PluginRegistry
 from UM.Logger import Logger
 
+from cura import HeightMap
+
 from UM.i18n import i18nCatalog
 catalog = i18nCatalog("cura")
 
@@ -35,6 +37,7 @@ class ImageReaderUI(QObject):
         self.peak_height = 10
         self.smoothing = 1
         self.image_color_invert = False;
+        self.resampling_filter = HeightMap.ResamplingFilter.Area
 
         self._ui_lock = threading.Lock()
         self._cancelled = False
@@ -147,6 +150,11 @@ class ImageReaderUI(QObject):
     def onSmoothingChanged(self, value):
         self.smoothing = int(value)
 
+    @pyqtSlot(int)
+    def onResamplingFilterChanged(self, index):
+        filters = [HeightMap.ResamplingFilter.Area, HeightMap.ResamplingFilter.Bilinear, HeightMap.ResamplingFilter.Nearest]
+        self.resampling_filter = filters[index] if 0 <= index < len(filters) else HeightMap.ResamplingFilter.Area
+
     @pyqtSlot(int)
     def onImageColorInvertChanged(self, value):
         if (value == 1):
@@ -78,6 +78,26 @@ Item
                 }
             }
 
+            Label
+            {
+                id: layerTimeLabel
+                property var layerPrintTimes: PrintInformation.layerPrintTimes
+
+                anchors.left: parent.right;
+                anchors.leftMargin: UM.Theme.getSize("default_margin").width / 2;
+                anchors.verticalCenter: parent.verticalCenter;
+
+                // The time that the current layer takes, as minutes:seconds.
+                text:
+                {
+                    var seconds = Math.round(layerPrintTimes[slider.value]);
+                    return Math.floor(seconds / 60) + ":" + ("0" + seconds % 60).slice(-2);
+                }
+                font: UM.Theme.getFont("default");
+                color: UM.Theme.getColor("setting_control_text");
+                visible: !UM.LayerView.busy && slider.value < layerPrintTimes.length
+            }
+
             BusyIndicator
             {
                 id: busyIndicator;
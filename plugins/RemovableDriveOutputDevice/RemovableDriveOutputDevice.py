@@ -1,4 +1,6 @@
+import io
 import os.path
+import tempfile
 
 from UM.Application import Application
 from UM.Logger import Logger
@@ -8,11 +10,23 @@ from UM.Mesh.MeshWriter import MeshWriter
 from UM.Scene.Iterator.BreadthFirstIterator import BreadthFirstIterator
 from UM.OutputDevice.OutputDevice import OutputDevice
 from UM.OutputDevice import OutputDeviceError
+from UM.Preferences import Preferences
+from UM.Signal import Signal
+
+from cura.BufferedFileCopier import BufferedFileCopier
 
 from UM.i18n import i18nCatalog
 catalog = i18nCatalog("cura")
 
+##  Saves files to a removable drive.
+#
+#   The file is first written to a temporary file on the local disk, which is fast, and then copied to the drive in
+#   large blocks on a background thread. The copy is synced to the drive while it goes, so the progress shows how much
+#   is really on the drive, and the user is only told that the drive can be ejected once all of the file is on it.
 class RemovableDriveOutputDevice(OutputDevice):
+    ##  Part of the progress, in percent, for writing the temporary file. The rest is for copying it to the drive.
+    _spool_progress = 10
+
     def __init__(self, device_id, device_name):
         super().__init__(device_id)
 
@@ -23,30 +37,30 @@ class RemovableDriveOutputDevice(OutputDevice):
         self.setPriority(1)
 
         self._writing = False
+        self._write_job = None
+        self._destination = None  # The file on the drive that the current job is saved to.
+        self._progress_writer = None  # The writer of the current job, if it reports its progress.
+        self._copier = None
+        self._copy_job = None  # The job whose file is being copied to the drive.
+        self._spool = None  # The temporary file that is being copied to the drive.
+
+        # The copy finishes on a thread of its own, which this signal moves to the main thread.
+        self._copy_finished = Signal()
+        self._copy_finished.connect(self._onCopyFinished)
 
     def requestWrite(self, node, file_name = None, filter_by_machine = False):
         filter_by_machine = True # This plugin is indended to be used by machine (regardless of what it was told to do)
         if self._writing:
             raise OutputDeviceError.DeviceBusyError()
 
-        # Formats supported by this application (File types that we can actually write)
-        file_formats = Application.getInstance().getMeshFileHandler().getSupportedFileTypesWrite()
-        if filter_by_machine:
-            container = Application.getInstance().getGlobalContainerStack().findContainer({"file_formats": "*"})
-
-            # Create a list from supported file formats string
-            machine_file_formats = [file_type.strip() for file_type in container.getMetaDataEntry("file_formats").split(";")]
-
-            # Take the intersection between file_formats and machine_file_formats.
-            file_formats = list(filter(lambda file_format: file_format["mime_type"] in machine_file_formats, file_formats))
-
-        if len(file_formats) == 0:
+        file_format = self._getFileFormat(filter_by_machine)
+        if file_format is None:
             Logger.log("e", "There are no file formats available to write with!")
             raise OutputDeviceError.WriteRequestFailedError()
 
-        # Just take the first file format available.
-        writer = Application.getInstance().getMeshFileHandler().getWriterByMimeType(file_formats[0]["mime_type"])
-        extension = file_formats[0]["extension"]
+        writer = Application.getInstance().getMeshFileHandler().getWriterByMimeType(file_format["mime_type"])
+        extension = file_format["extension"]
+        mode = file_format.get("mode", MeshWriter.OutputMode.TextMode)
 
         if file_name is None:
             for n in BreadthFirstIterator(node):
@@ -65,12 +79,27 @@ class RemovableDriveOutputDevice(OutputDevice):
 
         try:
             Logger.log("d", "Writing to %s", file_name)
-            stream = open(file_name, "wt")
-            job = WriteMeshJob(writer, stream, node, MeshWriter.OutputMode.TextMode)
+            spool = tempfile.TemporaryFile()
+            # Open the file on the drive right away, so it fails before writing if the drive is read-only or full.
+            try:
+                destination = open(file_name, "wb", buffering = 0)
+            except OSError:
+                spool.close()
+                raise
+            # Writers like the compressed g-code writer write binary data. The text is encoded like open() does.
+            stream = spool if mode == MeshWriter.OutputMode.BinaryMode else io.TextIOWrapper(spool)
+            job = WriteMeshJob(writer, stream, node, mode)
             job.setFileName(file_name)
             job.progress.connect(self._onProgress)
             job.finished.connect(self._onFinished)
 
+            # Writers that report their progress do so through a signal of their own, as they don't know the job.
+            if hasattr(writer, "progress"):
+                writer.progress.connect(self._onWriterProgress)
+                self._progress_writer = writer
+            self._write_job = job
+            self._destination = destination
+
             message = Message(catalog.i18nc("@info:progress", "Saving to Removable Drive <filename>{0}</filename>").format(self.getName()), 0, False, -1)
             message.show()
 
@@ -86,29 +115,116 @@ class RemovableDriveOutputDevice(OutputDevice):
             Logger.log("e", "Operating system would not let us write to %s: %s", file_name, str(e))
             raise OutputDeviceError.WriteRequestFailedError(catalog.i18nc("@info:status", "Could not save to <filename>{0}</filename>: <message>{1}</message>").format(file_name, str(e))) from e
 
+    ##  Get the format to write files to the drive in.
+    #
+    #   This is the first format that the machine takes. Machines take plain g-code from their SD card, but if the
+    #   removable_drive/compress_gcode preference is set, g-code is compressed, which is much faster to copy. That is
+    #   for drives that the file is copied on from, such as to a printer that takes compressed g-code.
+    #
+    #   \param filter_by_machine Whether to only use the formats of the machine.
+    #   \return The file format, as in the list of formats of the mesh file handler, or None if there is none.
+    def _getFileFormat(self, filter_by_machine):
+        # Formats supported by this application (File types that we can actually write)
+        supported_file_formats = Application.getInstance().getMeshFileHandler().getSupportedFileTypesWrite()
+        file_formats = supported_file_formats
+        if filter_by_machine:
+            container = Application.getInstance().getGlobalContainerStack().findContainer({"file_formats": "*"})
+
+            # Create a list from supported file formats string
+            machine_file_formats = [file_type.strip() for file_type in container.getMetaDataEntry("file_formats").split(";")]
+
+            # Take the intersection between file_formats and machine_file_formats.
+            file_formats = list(filter(lambda file_format: file_format["mime_type"] in machine_file_formats, file_formats))
+
+        if not file_formats:
+            return None
+
+        # Just take the first file format available.
+        file_format = file_formats[0]
+        if file_format["mime_type"] == "text/x-gcode" and Preferences.getInstance().getValue("removable_drive/compress_gcode"):
+            file_format = next((supported_format for supported_format in supported_file_formats if supported_format["mime_type"] == "application/gzip"), file_format)
+        return file_format
+
     def _onProgress(self, job, progress):
-        if hasattr(job, "_message"):
+        self._setProgress(job, progress * self._spool_progress / 100)
+
+    def _onCopyProgress(self, bytes_synced, total_size):
+        copied = bytes_synced / total_size if total_size else 1
+        self._setProgress(self._copy_job, self._spool_progress + copied * (100 - self._spool_progress))
+
+    def _setProgress(self, job, progress):
+        if job is not None and getattr(job, "_message", None) is not None:
             job._message.setProgress(progress)
         self.writeProgress.emit(self, progress)
 
+    def _onWriterProgress(self, progress):
+        job = self._write_job
+        if job is not None:
+            job.progress.emit(job, progress)
+
     def _onFinished(self, job):
+        if self._progress_writer is not None:
+            self._progress_writer.progress.disconnect(self._onWriterProgress)
+            self._progress_writer = None
+        self._write_job = None
+        destination = self._destination
+        self._destination = None
+
+        stream = job.getStream()
+        if not job.getResult():
+            stream.close()
+            destination.close()
+            self._removeFile(job.getFileName())
+            self._finishWrite(job, job.getError())
+            return
+
+        # Copy the complete file to the drive. The device stays busy until that is done.
+        if isinstance(stream, io.TextIOWrapper):
+            stream.flush()
+            stream = stream.detach()
+        self._copy_job = job
+        self._spool = stream
+        self._copier = BufferedFileCopier(stream, destination, progress_callback = self._onCopyProgress, finished_callback = self._copy_finished.emit)
+        self._copier.start()
+
+    def _onCopyFinished(self, error):
+        job = self._copy_job
+        self._spool.close()
+        self._spool = None
+        self._copier = None
+        self._copy_job = None
+        if error is not None:
+            Logger.log("e", "Could not copy %s to the removable drive: %s", job.getFileName(), str(error))
+            self._removeFile(job.getFileName())
+        self._finishWrite(job, error)
+
+    ##  Tell the user whether the file was saved, now that it is on the drive or failed.
+    #   \param job The WriteMeshJob of the file.
+    #   \param error None if the file was saved, or the error why it wasn't.
+    def _finishWrite(self, job, error):
         if hasattr(job, "_message"):
             job._message.hide()
             job._message = None
 
         self._writing = False
         self.writeFinished.emit(self)
-        if job.getResult():
+        if error is None:
             message = Message(catalog.i18nc("@info:status", "Saved to Removable Drive {0} as {1}").format(self.getName(), os.path.basename(job.getFileName())))
             message.addAction("eject", catalog.i18nc("@action:button", "Eject"), "eject", catalog.i18nc("@action", "Eject removable device {0}").format(self.getName()))
             message.actionTriggered.connect(self._onActionTriggered)
             message.show()
             self.writeSuccess.emit(self)
         else:
-            message = Message(catalog.i18nc("@info:status", "Could not save to removable drive {0}: {1}").format(self.getName(), str(job.getError())))
+            message = Message(catalog.i18nc("@info:status", "Could not save to removable drive {0}: {1}").format(self.getName(), str(error)))
             message.show()
             self.writeError.emit(self)
-        job.getStream().close()
+
+    ##  Remove a file that could not be saved completely, so no broken file is left on the drive.
+    def _removeFile(self, file_name):
+        try:
+            os.remove(file_name)
+        except OSError as e:
+            Logger.log("w", "Could not remove %s: %s", file_name, str(e))
 
     def _onActionTriggered(self, message, action):
         if action == "eject":
@@ -0,0 +1,61 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+##  A block of lines of a print job, encoded the way they are sent to the printer.
+#
+#   All lines are numbered, checksummed and encoded up front and stored back to back in a single buffer, so sending a
+#   line during the print is only a slice of that buffer. Comments and empty lines are left out and the M0 and M1
+#   commands are replaced by M105 (as M0 and M1 are handled as an LCD menu pause).
+class GCodeLineBuffer:
+    ##  Encode a block of lines.
+    #   \param lines Iterable of lines of g-code, without newlines.
+    #   \param first_line_number The line number of the first line in the block that is not left out.
+    def __init__(self, lines, first_line_number = 0):
+        self._first_line_number = first_line_number
+
+        prefixes = []
+        for line in lines:
+            if ";" in line:
+                line = line[:line.find(";")]
+            line = line.strip()
+            if not line:
+                continue
+            if line == "M0" or line == "M1":
+                line = "M105"  # Don't send the M0 or M1 to the machine, as M0 and M1 are handled as an LCD menu pause.
+            prefixes.append(("N%d%s" % (first_line_number + len(prefixes), line)).encode())
+
+        if not prefixes:
+            self._offsets = numpy.zeros(1, dtype = numpy.int64)
+            self._data = memoryview(b"")
+            return
+
+        # The checksum is the XOR of all bytes of the line, including the line number.
+        prefix_lengths = numpy.fromiter(map(len, prefixes), dtype = numpy.int64, count = len(prefixes))
+        prefix_starts = numpy.zeros(len(prefixes), dtype = numpy.int64)
+        numpy.cumsum(prefix_lengths[:-1], out = prefix_starts[1:])
+        checksums = numpy.bitwise_xor.reduceat(numpy.frombuffer(b"".join(prefixes), dtype = numpy.uint8), prefix_starts)
+
+        lines = [b"%s*%d\n" % (prefix, checksum) for prefix, checksum in zip(prefixes, checksums.tolist())]
+
+        self._offsets = numpy.zeros(len(lines) + 1, dtype = numpy.int64)
+        numpy.cumsum(numpy.fromiter(map(len, lines), dtype = numpy.int64, count = len(lines)), out = self._offsets[1:])
+        self._data = memoryview(b"".join(lines))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def getFirstLineNumber(self):
+        return self._first_line_number
+
+    ##  Get an encoded line.
+    #   \param line_number The number of the line.
+    #   \return memoryview of the line, including the line number, checksum and newline.
+    def getLine(self, line_number):
+        index = line_number - self._first_line_number
+        return self._data[self._offsets[index]:self._offsets[index + 1]]
+
+    ##  Get the size of all encoded lines together, in bytes.
+    def getSize(self):
+        return len(self._data)
@@ -0,0 +1,116 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import collections
+import os
+
+from .GCodeLineBuffer import GCodeLineBuffer
+
+##  The lines of a print job, read and encoded lazily while the job is being sent.
+#
+#   Only a bounded number of encoded lines is kept. The lines that were sent last are kept in a history, so the
+#   stream can be rewound when the printer requests a line to be sent again. Lines are encoded in blocks of
+#   GCodeLineBuffer, and a block is dropped once all of its lines are older than the history.
+class GCodeLineStream:
+    ##  Maximum number of g-code lines that are encoded in one block.
+    _block_line_count = 4096
+
+    ##  Create a stream.
+    #
+    #   \param chunks Iterable of strings of g-code, for instance the gcode_list of the scene. It is only iterated
+    #          as far as needed to get the lines that are sent.
+    #   \param total_size The total length of all chunks, used to report progress. If None, it is computed from the
+    #          chunks, which requires chunks to be a list.
+    #   \param history_size Number of lines before the last requested line that can still be requested again.
+    def __init__(self, chunks, total_size = None, history_size = 4096):
+        if total_size is None:
+            total_size = sum(len(chunk) for chunk in chunks)
+        self._total_size = total_size
+        self._chunks = iter(chunks)
+        self._history_size = history_size
+
+        # Reset line number. If this is not done, first line is sometimes ignored
+        self._pending_lines = collections.deque(["M110"])
+        self._remainder = ""
+        self._chunks_done = False
+
+        self._blocks = collections.deque()
+        self._next_line_number = 0  # Number of the first line that is not encoded yet.
+        self._encoded_size = 0  # Length of the input that is encoded so far.
+
+    ##  Create a stream that reads a g-code file from disk.
+    #
+    #   \param file_name The g-code file, which can be a temporary file a job was spooled to.
+    #   \param block_size Number of characters to read at once.
+    @classmethod
+    def fromFile(cls, file_name, block_size = 1024 * 1024, history_size = 4096):
+        def readChunks():
+            with open(file_name, "rt", encoding = "utf-8", errors = "replace") as f:
+                yield from iter(lambda: f.read(block_size), "")
+
+        return cls(readChunks(), os.path.getsize(file_name), history_size)
+
+    ##  Get an encoded line.
+    #
+    #   \param line_number The number of the line.
+    #   \return memoryview of the line, including line number, checksum and newline, or None if the job has less lines.
+    #   \exception IndexError If the line is older than the history that is kept.
+    def getLine(self, line_number):
+        while line_number >= self._next_line_number:
+            if not self._encodeBlock():
+                return None
+
+        # Forget the blocks of which all lines are older than the history.
+        oldest_line_number = line_number - self._history_size
+        while len(self._blocks) > 1 and self._blocks[0][0].getFirstLineNumber() + len(self._blocks[0][0]) <= oldest_line_number:
+            self._blocks.popleft()
+
+        for block, _, _ in reversed(self._blocks):
+            if line_number >= block.getFirstLineNumber():
+                return block.getLine(line_number)
+        raise IndexError("Line %s is no longer in the history of the g-code stream" % line_number)
+
+    ##  Get the progress through the job after sending a line.
+    #
+    #   \param line_number The number of the last line that was sent.
+    #   \return Fraction of the input that was sent, between 0 and 1.
+    def getProgress(self, line_number):
+        if not self._total_size:
+            return 1.0
+
+        for block, input_start, input_end in reversed(self._blocks):
+            first_line_number = block.getFirstLineNumber()
+            if line_number >= first_line_number:
+                fraction = min(1.0, (line_number - first_line_number + 1) / max(1, len(block)))
+                return min(1.0, (input_start + fraction * (input_end - input_start)) / self._total_size)
+        return 0.0
+
+    ##  Encode the next block of lines.
+    #   \return False if there are no more lines.
+    def _encodeBlock(self):
+        while len(self._pending_lines) < self._block_line_count and not self._chunks_done:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._chunks_done = True
+                if self._remainder:
+                    self._pending_lines.append(self._remainder)
+                    self._remainder = ""
+                break
+
+            lines = (self._remainder + chunk).split("\n")
+            self._remainder = lines.pop()
+            self._pending_lines.extend(lines)
+
+        if not self._pending_lines:
+            return False
+
+        count = min(len(self._pending_lines), self._block_line_count)
+        lines = [self._pending_lines.popleft() for _ in range(count)]
+        block = GCodeLineBuffer(lines, self._next_line_number)
+
+        input_start = self._encoded_size
+        self._encoded_size += sum(len(line) + 1 for line in lines)
+        if len(block):
+            self._blocks.append((block, input_start, self._encoded_size))
+            self._next_line_number += len(block)
+        return True
@@ -0,0 +1,314 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import collections
+import re
+import threading
+import time
+
+from UM.Logger import Logger
+
+##  Sends the lines of a print job to a printer on a dedicated thread.
+#
+#   Instead of sending a single line for every "ok" that is received, the sender keeps up to window_size lines in
+#   flight that have not been acknowledged yet, so the planner buffer of the firmware does not run dry on prints with
+#   many short segments. The window should not be larger than the command buffer of the firmware (BUFSIZE in Marlin,
+#   4 by default).
+#
+#   The sender does not read from the printer itself. Whoever reads the responses of the printer should pass them to
+#   processResponse, which keeps track of the acknowledged lines and of resend requests.
+#
+#   If a SerialReactor is given, the sender does not start a thread, but sends lines from the reactor thread whenever
+#   the window allows it. The write function must not block then, as the reactor serves all printers, so it should
+#   write through SerialReactor.write.
+class GCodeSender:
+    ##  Create a sender.
+    #
+    #   \param write_function Function that writes a bytes object to the printer.
+    #   \param window_size Maximum number of lines that are sent but not yet acknowledged.
+    #   \param progress_callback Function that is called with the number of lines sent after every line of the job
+    #          that is sent.
+    #   \param finished_callback Function that is called once all lines of the job are sent and acknowledged.
+    #   \param error_callback Function that is called with an error message if the job can not be sent any further.
+    #   \param reactor SerialReactor to send the lines from, or None to send them from a thread of the sender.
+    def __init__(self, write_function, window_size = 4, progress_callback = None, finished_callback = None, error_callback = None, reactor = None):
+        self._write = write_function
+        self._window_size = max(1, window_size)
+        self._progress_callback = progress_callback
+        self._finished_callback = finished_callback
+        self._error_callback = error_callback
+
+        self._condition = threading.Condition()
+        self._thread = None
+        self._reactor = reactor
+        self._send_scheduled = False
+        self._sending = False  # Whether the reactor thread is in _sendAvailable.
+
+        self._get_line = None
+        self._end_of_job = False
+        self._position = 0
+        self._in_flight = 0
+        self._commands = collections.deque()
+
+        self._paused = False
+        self._stopped = True
+
+        # Lines that were in flight when a resend was requested trigger a resend request for the same line.
+        self._last_resend_line = None
+        self._ignore_resends = 0
+        self._resend_count = 0
+
+        self._start_time = None
+        self._lines_per_second = 0.0
+        self._rate_time = None
+        self._rate_position = 0
+
+    ##  Start sending a job.
+    #
+    #   \param get_line Function that returns the bytes to send for a line number, including the line number,
+    #          checksum and the newline, or None if the job has no more lines. It is called on the sender thread.
+    def start(self, get_line):
+        self.stop()
+
+        with self._condition:
+            self._get_line = get_line
+            self._end_of_job = False
+            self._position = 0
+            self._in_flight = 0
+            self._paused = False
+            self._stopped = False
+            self._last_resend_line = None
+            self._ignore_resends = 0
+            self._resend_count = 0
+            self._start_time = time.monotonic()
+            self._rate_time = self._start_time
+            self._rate_position = 0
+            self._lines_per_second = 0.0
+
+        if self._reactor is not None:
+            self._scheduleSend()
+            return
+
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##  Stop sending. Lines that are still in flight are not waited for.
+    #
+    #   Once this returns, the callbacks are not called anymore, unless it is called from one of the callbacks.
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._commands.clear()
+            self._condition.notify_all()
+            if self._reactor is not None and not self._reactor.isReactorThread():
+                while self._sending:
+                    self._condition.wait()
+
+        thread = self._thread
+        self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def isRunning(self):
+        return not self._stopped
+
+    ##  Pause or resume sending the lines of the job. Queued commands are still sent while paused.
+    def setPaused(self, paused):
+        with self._condition:
+            self._paused = paused
+            self._condition.notify_all()
+        self._scheduleSend()
+
+    ##  Send a command in between the lines of the job, as soon as the window allows it.
+    #   \param command The command as bytes, including the newline.
+    def queueCommand(self, command):
+        with self._condition:
+            self._commands.append(command)
+            self._condition.notify_all()
+        self._scheduleSend()
+
+    def hasLinesInFlight(self):
+        return self._in_flight > 0
+
+    ##  Get the number of lines of the job that have been sent.
+    def getPosition(self):
+        return self._position
+
+    def getResendCount(self):
+        return self._resend_count
+
+    ##  Get the throughput of the job, measured over roughly the last second.
+    def getLinesPerSecond(self):
+        return self._lines_per_second
+
+    ##  Get the average throughput since the start of the job.
+    def getAverageLinesPerSecond(self):
+        if self._start_time is None:
+            return 0.0
+        elapsed = time.monotonic() - self._start_time
+        if elapsed <= 0:
+            return 0.0
+        return self._position / elapsed
+
+    _resend_pattern = re.compile(b"(?:resend|rs)[: ]*N?:?[ ]*([0-9]+)", re.IGNORECASE)
+
+    ##  Handle a line that was received from the printer.
+    #
+    #   \param line The received line, as bytes.
+    def processResponse(self, line):
+        if line.startswith(b"ok"):
+            self.acknowledge()
+            return
+
+        if b"resend" in line.lower() or line.startswith(b"rs"):  # Because a resend can be asked with "resend" and "rs"
+            match = self._resend_pattern.search(line)
+            if match:
+                self.resend(int(match.group(1)))
+
+    ##  Mark the oldest line in flight as acknowledged by the printer.
+    def acknowledge(self):
+        with self._condition:
+            if self._in_flight > 0:
+                self._in_flight -= 1
+            self._condition.notify_all()
+        self._scheduleSend()
+
+    ##  Continue sending from the given line number, as requested by the printer.
+    #
+    #   The firmware drops all lines after the faulty one, and every one of those that does reach it triggers a
+    #   resend request for the same line. Those duplicate requests are ignored. The dropped lines stay in the window
+    #   until the firmware answers them, as every resend request is followed by an "ok".
+    def resend(self, line_number):
+        with self._condition:
+            if line_number == self._last_resend_line and self._ignore_resends > 0:
+                self._ignore_resends -= 1
+                return
+
+            if line_number < 0 or line_number > self._position:
+                Logger.log("w", "Printer requested resend of line %s, but only %s lines have been sent.", line_number, self._position)
+                return
+
+            Logger.log("d", "Printer requested resend of line %s", line_number)
+            self._resend_count += 1
+            self._ignore_resends = max(0, self._position - line_number - 1)
+            self._last_resend_line = line_number
+            self._position = line_number
+            self._end_of_job = False
+            self._condition.notify_all()
+        self._scheduleSend()
+
+    def _canSend(self):
+        if self._in_flight >= self._window_size:
+            return False
+        if self._commands:
+            return True
+        return not self._paused and not self._end_of_job
+
+    ##  Get the next data to send. Must be called with the condition held.
+    #   \return Tuple of the data and whether it was a line of the job. The data is None at the end of the job.
+    def _takeNext(self):
+        if self._commands:
+            self._in_flight += 1
+            return self._commands.popleft(), False
+
+        data = self._get_line(self._position)
+        if data is None:
+            self._end_of_job = True
+            return None, True
+
+        self._in_flight += 1
+        self._position += 1
+        return data, True
+
+    def _updateRate(self):
+        now = time.monotonic()
+        elapsed = now - self._rate_time
+        if elapsed >= 1.0:
+            self._lines_per_second = (self._position - self._rate_position) / elapsed
+            self._rate_time = now
+            self._rate_position = self._position
+
+    def _isFinished(self):
+        return self._end_of_job and self._in_flight == 0 and not self._commands
+
+    ##  Send the next line or command, if the window allows it.
+    #   \return False if nothing was sent, because the window is full or the job is paused, finished or stopped.
+    def _sendNext(self):
+        with self._condition:
+            if self._stopped or not self._canSend():
+                return False
+            try:
+                data, is_job_line = self._takeNext()
+            except Exception as e:
+                Logger.logException("e", "Unable to get line %s of the job", self._position)
+                self._stopped = True
+                if self._error_callback:
+                    self._error_callback(str(e))
+                return False
+            position = self._position
+
+        if data is None:
+            return True  # Reached the end of the job, but a command or resend may still have to be sent.
+
+        self._write(data)
+
+        if is_job_line:
+            with self._condition:
+                if self._stopped:
+                    return False  # Stopped while writing, so the job that the position belongs to may be gone.
+                self._updateRate()
+            if self._progress_callback:
+                self._progress_callback(position)
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._canSend() and not self._isFinished():
+                    self._condition.wait()
+                if self._stopped or self._isFinished():
+                    break
+            self._sendNext()
+
+        self._finish()
+
+    ##  Have the reactor send everything the window allows, unless that is already scheduled.
+    def _scheduleSend(self):
+        if self._reactor is None:
+            return
+        with self._condition:
+            if self._send_scheduled or self._stopped:
+                return
+            self._send_scheduled = True
+        self._reactor.callSoon(self._sendAvailable)
+
+    ##  Send as many lines as the window allows. Called on the reactor thread.
+    def _sendAvailable(self):
+        with self._condition:
+            self._send_scheduled = False
+            if self._stopped:
+                return
+            self._sending = True
+        try:
+            while self._sendNext():
+                pass
+
+            with self._condition:
+                finished = not self._stopped and self._isFinished()
+            if finished:
+                self._finish()
+        finally:
+            with self._condition:
+                self._sending = False
+                self._condition.notify_all()
+
+    def _finish(self):
+        with self._condition:
+            finished = not self._stopped
+            self._stopped = True
+
+        if finished:
+            Logger.log("i", "Sent %s lines at %.1f lines/s, %s resends", self._position, self.getAverageLinesPerSecond(), self._resend_count)
+            if self._finished_callback:
+                self._finished_callback()
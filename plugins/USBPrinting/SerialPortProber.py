@@ -0,0 +1,127 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import threading
+import time
+
+import serial
+
+from UM.Logger import Logger
+
+##  Result of a successful probe of a serial port.
+class SerialPortProbeResult:
+    def __init__(self, connection, baud_rate, latency):
+        self.connection = connection  # The opened serial connection, at the detected baud rate.
+        self.baud_rate = baud_rate
+        self.latency = latency  # Time it took to detect the printer, in seconds.
+
+##  Detects the baud rate at which a printer on a serial port communicates.
+#
+#   A single prober is shared by all USB printer connections, which each probe their own port on their own thread, so
+#   all ports are probed at the same time. The baud rate that worked last for a port is remembered and tried first
+#   the next time the port is probed.
+#
+#   The baud rate is checked by sending M105 commands to the printer and waiting for a readable response. If the baud
+#   rate is correct, this should make sense, else we get gibberish.
+class SerialPortProber:
+    ##  Create a prober.
+    #
+    #   \param required_responses Number of temperature responses that need to be read before a baud rate is accepted.
+    #   \param probe_timeout Time to wait for the responses at a single baud rate, in seconds.
+    #   \param bootloader_delay Time the printer needs after the port is opened before the firmware responds.
+    #          Opening the port resets most Arduino based printers, after which the bootloader runs for a while.
+    def __init__(self, required_responses = 3, probe_timeout = 2.0, bootloader_delay = 1.5):
+        self._required_responses = required_responses
+        self._probe_timeout = probe_timeout
+        self._bootloader_delay = bootloader_delay
+
+        self._baud_rate_cache = {}
+        self._cache_lock = threading.Lock()
+
+    ##  Get the baud rate that worked last for a port.
+    #   \return The baud rate or None if the port was never probed successfully.
+    def getCachedBaudRate(self, port):
+        with self._cache_lock:
+            return self._baud_rate_cache.get(port)
+
+    ##  Get the order in which to try the baud rates for a port, with the last known good baud rate first.
+    def getBaudRateOrder(self, port, baud_rates):
+        cached_baud_rate = self.getCachedBaudRate(port)
+        if cached_baud_rate in baud_rates:
+            return [cached_baud_rate] + [baud_rate for baud_rate in baud_rates if baud_rate != cached_baud_rate]
+        return list(baud_rates)
+
+    ##  Find the baud rate of the printer on a port.
+    #
+    #   \param port The serial port to probe.
+    #   \param baud_rates List of baud rates to try.
+    #   \param connection An already opened serial connection to the port, or None to open the port.
+    #   \param abort Function that returns True if probing should be stopped, for instance because the connection
+    #          was closed.
+    #   \return SerialPortProbeResult or None if the printer did not respond at any of the baud rates.
+    def probe(self, port, baud_rates, connection = None, abort = None):
+        start_time = time.monotonic()
+        opened_time = start_time
+
+        for baud_rate in self.getBaudRateOrder(port, baud_rates):
+            if abort and abort():
+                break
+
+            Logger.log("d", "Attempting to connect to printer with serial %s on baud rate %s", port, baud_rate)
+            try:
+                if connection is None:
+                    connection = serial.Serial(str(port), baud_rate, timeout = 0.5, writeTimeout = 10000)
+                    opened_time = time.monotonic()
+                else:
+                    connection.baudrate = baud_rate
+                    connection.timeout = 0.5
+            except (serial.SerialException, ValueError, OSError) as e:
+                Logger.log("d", "Could not open port %s at baud rate %s: %s", port, baud_rate, e)
+                continue
+
+            # Ensure that we are not talking to the bootloader. Only the first baud rate after opening the port needs
+            # to wait for it, as changing the baud rate does not reset the printer.
+            remaining_delay = self._bootloader_delay - (time.monotonic() - opened_time)
+            if remaining_delay > 0:
+                time.sleep(remaining_delay)
+
+            try:
+                responding = self._checkResponses(connection, abort)
+            except (serial.SerialException, OSError) as e:
+                Logger.log("d", "Error while probing port %s at baud rate %s: %s", port, baud_rate, e)
+                responding = False
+
+            if responding:
+                with self._cache_lock:
+                    self._baud_rate_cache[port] = baud_rate
+                latency = time.monotonic() - start_time
+                Logger.log("i", "Detected printer on port %s at baud rate %s in %.2f seconds", port, baud_rate, latency)
+                return SerialPortProbeResult(connection, baud_rate, latency)
+
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        Logger.log("e", "Baud rate detection for %s failed after %.2f seconds", port, time.monotonic() - start_time)
+        return None
+
+    ##  Check if the printer sends temperature responses at the current baud rate.
+    def _checkResponses(self, connection, abort):
+        connection.flushInput()
+        connection.write(b"\nM105\n")  # Request temperature, as this should (if baudrate is correct) result in a command with "T:" in it
+
+        successful_responses = 0
+        timeout_time = time.monotonic() + self._probe_timeout
+        while time.monotonic() < timeout_time:
+            if abort and abort():
+                return False
+
+            line = connection.readline()
+            if b"T:" in line:
+                successful_responses += 1
+                if successful_responses >= self._required_responses:
+                    return True
+
+            connection.write(b"M105\n")  # Send M105 as long as we are listening, otherwise we end up in an undefined state
+        return False
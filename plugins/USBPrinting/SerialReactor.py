@@ -0,0 +1,348 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import collections
+import heapq
+import itertools
+import os
+import selectors
+import socket
+import threading
+import time
+
+from UM.Logger import Logger
+
+try:
+    import fcntl
+except ImportError:  # Windows, where serial ports have no file descriptor to register anyway.
+    fcntl = None
+
+##  Handle of a call that was scheduled on a SerialReactor, which can be used to cancel it.
+class SerialReactorTimer:
+    def __init__(self, callback, interval):
+        self._callback = callback
+        self._interval = interval  # None for a call that is only done once.
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def isCancelled(self):
+        return self._cancelled
+
+##  A serial connection that is registered with a SerialReactor.
+class _SerialReactorConnection:
+    def __init__(self, connection, line_callback, closed_callback, idle_timeout, write_timeout):
+        self.connection = connection
+        self.line_callback = line_callback
+        self.closed_callback = closed_callback
+        self.idle_timeout = idle_timeout
+        self.write_timeout = write_timeout
+        self.buffer = b""
+        self.last_activity = time.monotonic()
+        self.pending = bytearray()  # Data that is written but that the connection couldn't take yet.
+        self.last_write = time.monotonic()  # When the connection last took data.
+        self.events = selectors.EVENT_READ
+
+##  Multiplexes the serial connections of all USB printers on a single thread.
+#
+#   Instead of a thread per printer that blocks in readline, the reactor waits for data on the file descriptors of all
+#   registered connections at once, and calls the line callback of a connection for every line that is received. If a
+#   connection did not receive anything for its idle timeout, the line callback is called with an empty line, like
+#   readline returns an empty line after the timeout of the serial port. The reactor also runs timers, so periodic work
+#   like polling the end stops does not need a thread of its own either.
+#
+#   Data that is written through the reactor is written whenever a connection can take it, so a printer that stops
+#   reading doesn't hold up the others. All callbacks are called on the reactor thread, so they should not block.
+class SerialReactor:
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+        self._connections = {}  # File descriptor to _SerialReactorConnection.
+        self._calls = collections.deque()  # Calls to do on the reactor thread as soon as possible.
+        self._timers = []  # Heap of (due time, sequence number, SerialReactorTimer).
+        self._timer_sequence = itertools.count()
+
+        # Writing to this socket wakes up the reactor when calls or timers are added from another thread.
+        self._wakeup_receiver, self._wakeup_sender = socket.socketpair()
+        self._wakeup_receiver.setblocking(False)
+        self._wakeup_sender.setblocking(False)
+        self._selector.register(self._wakeup_receiver, selectors.EVENT_READ)
+
+    ##  Check if a serial connection can be registered, which requires it to have a file descriptor.
+    #   The serial ports on Windows have none, so connections there have to be read by a thread of their own.
+    @staticmethod
+    def canRegister(connection):
+        try:
+            return connection.fileno() >= 0
+        except (AttributeError, OSError, ValueError):
+            return False
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##  Stop the reactor. Registered connections are not closed.
+    def stop(self):
+        with self._lock:
+            self._running = False
+        self._wakeup()
+        thread = self._thread
+        self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def isRunning(self):
+        return self._running
+
+    def isReactorThread(self):
+        return threading.current_thread() is self._thread
+
+    ##  Call a function on the reactor thread as soon as possible.
+    def callSoon(self, callback):
+        with self._lock:
+            self._calls.append(callback)
+        self._wakeup()
+
+    ##  Call a function on the reactor thread after a delay.
+    #   \return SerialReactorTimer to cancel the call with.
+    def callLater(self, delay, callback):
+        return self._addTimer(SerialReactorTimer(callback, None), delay)
+
+    ##  Call a function on the reactor thread with a fixed interval.
+    #   \return SerialReactorTimer to cancel the calls with.
+    def callPeriodically(self, interval, callback):
+        return self._addTimer(SerialReactorTimer(callback, interval), interval)
+
+    ##  Start reading lines from a serial connection.
+    #
+    #   \param connection The serial connection, which must be open.
+    #   \param line_callback Function that is called with every line that is received, as bytes including the newline.
+    #   \param closed_callback Function that is called with an error message if the connection can no longer be read.
+    #          The connection is unregistered before it is called.
+    #   \param idle_timeout Time after which the line callback is called with an empty line if nothing was received.
+    #   \param write_timeout Time after which the connection is closed if it doesn't take the data that is written.
+    def register(self, connection, line_callback, closed_callback = None, idle_timeout = None, write_timeout = None):
+        registered_connection = _SerialReactorConnection(connection, line_callback, closed_callback, idle_timeout, write_timeout)
+        self._callOnReactorThread(lambda: self._register(registered_connection))
+
+    ##  Stop reading from a serial connection. Once this returns, no callbacks are called for the connection anymore,
+    #   so it can be closed.
+    def unregister(self, connection):
+        self._callOnReactorThread(lambda: self._unregister(connection.fileno()))
+
+    ##  Write data to a registered serial connection without blocking.
+    #
+    #   The data is written on the reactor thread whenever the connection can take it, in the order of the calls. Data
+    #   for a connection that is not registered is dropped. Can be called from any thread.
+    #
+    #   \param connection The registered serial connection.
+    #   \param data The data to write, as bytes.
+    def write(self, connection, data):
+        try:
+            file_descriptor = connection.fileno()
+        except (AttributeError, OSError, ValueError):
+            return  # Closed already.
+        registered_connection = self._connections.get(file_descriptor)
+        if registered_connection is None:
+            return
+
+        with self._lock:
+            if not registered_connection.pending:
+                registered_connection.last_write = time.monotonic()
+            registered_connection.pending += data
+        if self.isReactorThread():
+            self._flush(file_descriptor)
+        else:
+            self.callSoon(lambda: self._flush(file_descriptor))
+
+    def _callOnReactorThread(self, callback):
+        if not self._running or self.isReactorThread():
+            callback()
+            return
+
+        done = threading.Event()
+        def call():
+            try:
+                callback()
+            finally:
+                done.set()
+        self.callSoon(call)
+        done.wait()
+
+    def _register(self, registered_connection):
+        file_descriptor = registered_connection.connection.fileno()
+        if fcntl is not None:
+            # Reading and writing must not block the reactor, whatever mode the serial library opened the port in.
+            flags = fcntl.fcntl(file_descriptor, fcntl.F_GETFL)
+            fcntl.fcntl(file_descriptor, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self._connections[file_descriptor] = registered_connection
+        self._selector.register(file_descriptor, selectors.EVENT_READ)
+
+    def _unregister(self, file_descriptor):
+        if self._connections.pop(file_descriptor, None) is not None:
+            self._selector.unregister(file_descriptor)
+
+    def _addTimer(self, timer, delay):
+        with self._lock:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._timer_sequence), timer))
+        self._wakeup()
+        return timer
+
+    def _wakeup(self):
+        if self.isReactorThread():
+            return
+        try:
+            self._wakeup_sender.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # The reactor is already being woken up.
+
+    ##  Get the time until the next timer or idle timeout is due.
+    def _getTimeout(self, now):
+        timeout = None
+        with self._lock:
+            if self._calls:
+                return 0
+            if self._timers:
+                timeout = self._timers[0][0] - now
+        for registered_connection in self._connections.values():
+            if registered_connection.idle_timeout is not None:
+                idle = registered_connection.last_activity + registered_connection.idle_timeout - now
+                timeout = idle if timeout is None else min(timeout, idle)
+            if registered_connection.write_timeout is not None and registered_connection.pending:
+                stalled = registered_connection.last_write + registered_connection.write_timeout - now
+                timeout = stalled if timeout is None else min(timeout, stalled)
+        return None if timeout is None else max(0, timeout)
+
+    def _run(self):
+        while self._running:
+            events = self._selector.select(self._getTimeout(time.monotonic()))
+            for key, mask in events:
+                if key.fileobj is self._wakeup_receiver:
+                    try:
+                        while self._wakeup_receiver.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                else:
+                    if mask & selectors.EVENT_READ:
+                        self._read(key.fileobj)
+                    if mask & selectors.EVENT_WRITE:
+                        self._flush(key.fileobj)
+
+            self._runCalls()
+            self._runTimers()
+            self._checkIdleConnections()
+
+        with self._lock:
+            calls = list(self._calls)
+            self._calls.clear()
+        for callback in calls:
+            self._call(callback)  # Make sure that nobody keeps waiting in _callOnReactorThread.
+
+    def _read(self, file_descriptor):
+        registered_connection = self._connections.get(file_descriptor)
+        if registered_connection is None:
+            return
+
+        try:
+            data = os.read(file_descriptor, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._closeConnection(file_descriptor, str(e))
+            return
+        if not data:
+            # A file descriptor that is readable but has no data means that the device was disconnected.
+            self._closeConnection(file_descriptor, "Device disconnected")
+            return
+
+        registered_connection.last_activity = time.monotonic()
+        *lines, registered_connection.buffer = (registered_connection.buffer + data).split(b"\n")
+        for line in lines:
+            if file_descriptor not in self._connections:
+                break  # Unregistered by the callback of a previous line.
+            self._call(lambda: registered_connection.line_callback(line + b"\n"))
+
+    ##  Write as much of the pending data of a connection as it can take, and wait until it can take more if needed.
+    def _flush(self, file_descriptor):
+        registered_connection = self._connections.get(file_descriptor)
+        if registered_connection is None:
+            return
+
+        with self._lock:
+            data = bytes(registered_connection.pending)
+        if data:
+            try:
+                written = os.write(file_descriptor, data)
+            except BlockingIOError:
+                written = 0
+            except OSError as e:
+                self._closeConnection(file_descriptor, str(e))
+                return
+            with self._lock:
+                del registered_connection.pending[:written]
+                if written:
+                    registered_connection.last_write = time.monotonic()
+
+        with self._lock:
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if registered_connection.pending else 0)
+        if events != registered_connection.events:
+            self._selector.modify(file_descriptor, events)
+            registered_connection.events = events
+
+    def _closeConnection(self, file_descriptor, error):
+        registered_connection = self._connections.get(file_descriptor)
+        self._unregister(file_descriptor)
+        if registered_connection is not None and registered_connection.closed_callback is not None:
+            self._call(lambda: registered_connection.closed_callback(error))
+
+    def _checkIdleConnections(self):
+        now = time.monotonic()
+        for file_descriptor, registered_connection in list(self._connections.items()):
+            if registered_connection.write_timeout is not None and registered_connection.pending and now - registered_connection.last_write >= registered_connection.write_timeout:
+                self._closeConnection(file_descriptor, "Write timeout")
+                continue
+            if registered_connection.idle_timeout is None:
+                continue
+            if now - registered_connection.last_activity >= registered_connection.idle_timeout:
+                registered_connection.last_activity = now
+                if file_descriptor in self._connections:
+                    self._call(lambda: registered_connection.line_callback(b""))
+
+    def _runCalls(self):
+        with self._lock:
+            calls = list(self._calls)
+            self._calls.clear()
+        for callback in calls:
+            self._call(callback)
+
+    def _runTimers(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > now:
+                    return
+                due, _, timer = heapq.heappop(self._timers)
+                if timer._interval is not None and not timer.isCancelled():
+                    # Schedule from the due time, so periodic calls do not drift, unless the reactor fell behind.
+                    next_due = due + timer._interval
+                    if next_due < now:
+                        next_due = now + timer._interval
+                    heapq.heappush(self._timers, (next_due, next(self._timer_sequence), timer))
+            if not timer.isCancelled():
+                self._call(timer._callback)
+
+    def _call(self, callback):
+        try:
+            callback()
+        except Exception:
+            Logger.logException("e", "Exception in serial reactor callback")
@@ -0,0 +1,25 @@
+# Copyright (c) 2016 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import re
+
+# Matches "T:210.0 /210.0", "T1:180.5 /0.0" and "B:60.0 /60.0", with an optional target after the slash. "B@:" and
+# "@:" (the heater power) do not match, as there must be a colon directly after the heater name and index.
+_temperature_pattern = re.compile(rb"\b([TB])([0-9]*) *: *(-?[0-9]+(?:\.[0-9]*)?)(?: */ *(-?[0-9]+(?:\.[0-9]*)?))?")
+
+##  Parse a temperature report of the printer, like "ok T:210.0 /210.0 B:60.0 /60.0 @:0 B@:0".
+#
+#   \param line The line as received from the printer, as bytes.
+#   \return Tuple of a dictionary of hotend index to a (temperature, target) tuple, and a (temperature, target)
+#           tuple of the bed or None if the bed is not reported. The target is None if it is not reported. The index
+#           is None for the "T:" of the active hotend.
+def parseTemperatures(line):
+    hotends = {}
+    bed = None
+    for heater, index, temperature, target in _temperature_pattern.findall(line):
+        value = (float(temperature), float(target) if target else None)
+        if heater == b"B":
+            bed = value
+        else:
+            hotends[int(index) if index else None] = value
+    return hotends, bed
@@ -2,15 +2,19 @@
 # Cura is released under the terms of the AGPLv3 or higher.
 
 from .avr_isp import stk500v2, ispBase, intelHex
+from .GCodeSender import GCodeSender
+from .GCodeLineStream import GCodeLineStream
+from .SerialPortProber import SerialPortProber
+from .SerialReactor import SerialReactor
+from .TemperatureParser import parseTemperatures
 import serial
 import threading
 import time
-import queue
 import re
-import functools
 
 from UM.Application import Application
 from UM.Logger import Logger
+from UM.Preferences import Preferences
 from cura.PrinterOutputDevice import PrinterOutputDevice, ConnectionState
 from UM.Message import Message
 
@@ -21,7 +25,13 @@ catalog = i18nCatalog("cura")
 
 
 class USBPrinterOutputDevice(PrinterOutputDevice):
-    def __init__(self, serial_port):
+    ##  Create a connection to a printer on a serial port.
+    #   \param serial_port The serial port of the printer.
+    #   \param port_prober SerialPortProber that detects the baud rate of the printer. It is shared between the
+    #          connections, so they share the baud rates that worked for each port.
+    #   \param reactor SerialReactor that reads from all printers and sends their prints on a single thread. If None,
+    #          the connection uses threads of its own.
+    def __init__(self, serial_port, port_prober = None, reactor = None):
         super().__init__(serial_port)
         self.setName(catalog.i18nc("@item:inmenu", "USB printing"))
         self.setShortDescription(catalog.i18nc("@action:button", "Print via USB"))
@@ -36,11 +46,16 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
         self._connect_thread.daemon = True
 
         self._end_stop_thread = None
+        self._end_stop_timer = None
         self._poll_endstop = False
 
-        # The baud checking is done by sending a number of m105 commands to the printer and waiting for a readable
-        # response. If the baudrate is correct, this should make sense, else we get giberish.
-        self._required_responses_auto_baud = 3
+        self._reactor = reactor
+        self._registered_serial = None  # The serial connection that is read by the reactor.
+
+        self._port_prober = port_prober if port_prober is not None else SerialPortProber()
+
+        # Time it took to detect the printer and its baud rate when the connection was last established, in seconds.
+        self._connection_latency = None
 
         self._listen_thread = threading.Thread(target=self._listen)
         self._listen_thread.daemon = True
@@ -51,8 +66,19 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
 
         self._heatup_wait_start_time = time.time()
 
-        ## Queue for commands that need to be send. Used when command is sent when a print is active.
-        self._command_queue = queue.Queue()
+        # State of the responses of the printer, which are handled one line at a time by _processLine.
+        self._temperature_request_timeout = time.time()
+        self._ok_timeout = time.time()
+        self._error_line_start = None
+
+        ## Sends the g-code of a print on its own thread. Commands that are sent while a print is active are queued
+        #  in between the lines of the print by the sender.
+        self._gcode_sender = GCodeSender(self._writeSerial, Preferences.getInstance().getValue("usb_printing/gcode_window_size"),
+                                         progress_callback = self._onGcodeLineSent, finished_callback = self._onGcodeSent,
+                                         error_callback = self._setErrorState, reactor = self._reactor)
+
+        # Lock to prevent the sender thread and other threads from writing to the serial port at the same time.
+        self._serial_write_lock = threading.Lock()
 
         self._is_printing = False
         self._is_paused = False
@@ -64,8 +90,8 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
         ## Keep track where in the provided g-code the print is
         self._gcode_position = 0
 
-        # List of gcode lines to be printed
-        self._gcode = []
+        # Stream of encoded gcode lines to be printed
+        self._gcode = None
 
         # Check if endstops are ever pressed (used for first run)
         self._x_min_endstop_pressed = False
@@ -80,8 +106,6 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
         # This index is the extruder we requested data from the last time.
         self._temperature_requested_extruder_index = 0
 
-        self._current_z = 0
-
         self._updating_firmware = False
 
         self._firmware_file_name = None
@@ -141,22 +165,30 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
             self.writeError.emit(self)
             return
 
-        self._gcode.clear()
-        for layer in gcode_list:
-            self._gcode.extend(layer.split("\n"))
-
-        # Reset line number. If this is not done, first line is sometimes ignored
-        self._gcode.insert(0, "M110")
+        # The lines are numbered, checksummed and encoded in blocks while the print is being sent, so only a bounded
+        # number of lines is kept in memory next to the g-code of the scene.
+        self._gcode = GCodeLineStream(gcode_list)
         self._gcode_position = 0
         self._print_start_time_100 = None
         self._is_printing = True
         self._print_start_time = time.time()
+        self._startProgressEstimate(self._getEstimatedPrintTime())
 
-        for i in range(0, 4):  # Push first 4 entries before accepting other inputs
-            self._sendNextGcodeLine()
+        self._gcode_sender.start(self._gcode.getLine)
 
         self.writeFinished.emit(self)
 
+    ##  Get the estimate of the slicer of the time the current print takes.
+    #   \return Time in seconds, or 0 if there is no estimate.
+    def _getEstimatedPrintTime(self):
+        print_information = Application.getInstance().getPrintInformation()
+        if print_information is None:
+            return 0
+        try:
+            return int(print_information.currentPrintTime)
+        except (TypeError, ValueError):
+            return 0
+
     ##  Get the serial port string of this connection.
     #   \return serial port
     def getSerialPort(self):
@@ -180,7 +212,7 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
             return 
 
         programmer = stk500v2.Stk500v2()
-        programmer.progressCallback = self.setProgress 
+        programmer.progress_callback = self.setProgress
 
         try:
             programmer.connect(self._serial_port)
@@ -220,6 +252,9 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
     def startPollEndstop(self):
         if not self._poll_endstop:
             self._poll_endstop = True
+            if self._reactor is not None:
+                self._end_stop_timer = self._reactor.callPeriodically(0.5, self._requestEndstopState)
+                return
             if self._end_stop_thread is None:
                 self._end_stop_thread = threading.Thread(target=self._pollEndStop)
                 self._end_stop_thread.daemon = True
@@ -229,12 +264,20 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
     def stopPollEndstop(self):
         self._poll_endstop = False
         self._end_stop_thread = None
+        if self._end_stop_timer is not None:
+            self._end_stop_timer.cancel()
+            self._end_stop_timer = None
 
     def _pollEndStop(self):
         while self._connection_state == ConnectionState.connected and self._poll_endstop:
             self.sendCommand("M119")
             time.sleep(0.5)
 
+    ##  Called by the reactor every half second while the end stops are polled.
+    def _requestEndstopState(self):
+        if self._connection_state == ConnectionState.connected:
+            self.sendCommand("M119")
+
     ##  Private connect function run by thread. Can be started by calling connect.
     def _connect(self):
         Logger.log("d", "Attempting to connect to %s", self._serial_port)
@@ -250,45 +293,33 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
 
         # If the programmer connected, we know its an atmega based version.
         # Not all that useful, but it does give some debugging information.
-        for baud_rate in self._getBaudrateList(): # Cycle all baud rates (auto detect)
-            Logger.log("d","Attempting to connect to printer with serial %s on baud rate %s", self._serial_port, baud_rate)
-            if self._serial is None:
-                try:
-                    self._serial = serial.Serial(str(self._serial_port), baud_rate, timeout = 3, writeTimeout = 10000)
-                except serial.SerialException:
-                    Logger.log("d", "Could not open port %s" % self._serial_port)
-                    continue
-            else:
-                if not self.setBaudRate(baud_rate):
-                    continue # Could not set the baud rate, go to the next
-
-            time.sleep(1.5) # Ensure that we are not talking to the bootloader. 1.5 seconds seems to be the magic number
-            sucesfull_responses = 0
-            timeout_time = time.time() + 5
-            self._serial.write(b"\n")
-            self._sendCommand("M105")  # Request temperature, as this should (if baudrate is correct) result in a command with "T:" in it
-            while timeout_time > time.time():
-                line = self._readline()
-                if line is None:
-                    # Something went wrong with reading, could be that close was called.
-                    self.setConnectionState(ConnectionState.closed)
-                    return
-
-                if b"T:" in line:
-                    self._serial.timeout = 0.5
-                    sucesfull_responses += 1
-                    if sucesfull_responses >= self._required_responses_auto_baud:
-                        self._serial.timeout = 2 # Reset serial timeout
-                        self.setConnectionState(ConnectionState.connected)
-                        self._listen_thread.start()  # Start listening
-                        Logger.log("i", "Established printer connection on port %s" % self._serial_port)
-                        return 
-
-                self._sendCommand("M105")  # Send M105 as long as we are listening, otherwise we end up in an undefined state
-
-        Logger.log("e", "Baud rate detection for %s failed", self._serial_port)
-        self.close()  # Unable to connect, wrap up.
-        self.setConnectionState(ConnectionState.closed)
+        result = self._port_prober.probe(self._serial_port, self._getBaudrateList(), self._serial,
+                                         abort = lambda: self._connection_state == ConnectionState.closed)
+        if result is None:
+            self._serial = None
+            self.close()  # Unable to connect, wrap up.
+            self.setConnectionState(ConnectionState.closed)
+            return
+
+        self._serial = result.connection
+        self._serial.timeout = 2 # Reset serial timeout
+        self._connection_latency = result.latency
+        self._temperature_request_timeout = time.time()
+        self._ok_timeout = time.time()
+        self._error_line_start = None
+        self.setConnectionState(ConnectionState.connected)
+        if self._reactor is not None and SerialReactor.canRegister(self._serial):
+            # Read like readline with the timeout of 2 seconds would, but without a thread of our own.
+            self._registered_serial = self._serial
+            self._reactor.register(self._serial, self._processLine, self._onSerialClosed, idle_timeout = 2, write_timeout = 10)
+        else:
+            self._listen_thread.start()  # Start listening
+        Logger.log("i", "Established printer connection on port %s at baud rate %s in %.2f seconds", self._serial_port, result.baud_rate, result.latency)
+
+    ##  Get the time it took to detect the printer when the connection was last established.
+    #   \return Time in seconds, or None if the printer was never connected.
+    def getConnectionLatency(self):
+        return self._connection_latency
 
     ##  Set the baud rate of the serial. This can cause exceptions, but we simply want to ignore those.
     def setBaudRate(self, baud_rate):
@@ -301,6 +332,7 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
     ##  Close the printer connection
     def close(self):
         Logger.log("d", "Closing the USB printer connection.")
+        self._gcode_sender.stop()
         if self._connect_thread.isAlive():
             try:
                 self._connect_thread.join()
@@ -312,6 +344,12 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
         self._connect_thread.daemon = True
         
         self.setConnectionState(ConnectionState.closed)
+        if self._end_stop_timer is not None:
+            self._end_stop_timer.cancel()
+            self._end_stop_timer = None
+        if self._registered_serial is not None:
+            self._reactor.unregister(self._registered_serial)
+            self._registered_serial = None
         if self._serial is not None:
             try:
                 self._listen_thread.join()
@@ -332,15 +370,32 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
         if "M109" in cmd or "M190" in cmd:
             self._heatup_wait_start_time = time.time()
 
+        self._writeSerial(b"\n" + (cmd + "\n").encode())
+
+    ##  Write data to the serial port, retrying once on a timeout.
+    #
+    #   A port that is served by the reactor is written to without blocking, so a printer that stops reading doesn't
+    #   hold up the other printers.
+    #   \param data bytes to write.
+    def _writeSerial(self, data):
+        registered_serial = self._registered_serial
+        if registered_serial is not None:
+            self._reactor.write(registered_serial, data)
+            return
+
+        serial_port = self._serial
+        if serial_port is None:
+            return
+
         try:
-            command = (cmd + "\n").encode()
-            self._serial.write(b"\n")
-            self._serial.write(command)
+            with self._serial_write_lock:
+                serial_port.write(data)
         except serial.SerialTimeoutException:
             Logger.log("w","Serial timeout while writing to serial port, trying again.")
             try:
                 time.sleep(0.5)
-                self._serial.write((cmd + "\n").encode())
+                with self._serial_write_lock:
+                    serial_port.write(data)
             except Exception as e:
                 Logger.log("e","Unexpected error while writing serial port %s " % e)
                 self._setErrorState("Unexpected error while writing serial port %s " % e)
@@ -353,8 +408,8 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
     ##  Send a command to printer.
     #   \param cmd string with g-code
     def sendCommand(self, cmd):
-        if self._progress:
-            self._command_queue.put(cmd)
+        if self._gcode_sender.isRunning():
+            self._gcode_sender.queueCommand((cmd + "\n").encode())
         elif self._connection_state == ConnectionState.connected:
             self._sendCommand(cmd)
 
@@ -383,117 +438,132 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
                 self.endstopStateChanged.emit("z_min", value)
             self._z_min_endstop_pressed = value
 
-    ##  Listen thread function.
+    ##  Listen thread function, used when there is no reactor to read the serial port.
     def _listen(self):
         Logger.log("i", "Printer connection listen thread started for %s" % self._serial_port)
-        temperature_request_timeout = time.time()
-        ok_timeout = time.time()
         while self._connection_state == ConnectionState.connected:
             line = self._readline()
             if line is None:
                 break  # None is only returned when something went wrong. Stop listening
-
-            if time.time() > temperature_request_timeout:
-                if self._num_extruders > 0:
-                    self._temperature_requested_extruder_index = (self._temperature_requested_extruder_index + 1) % self._num_extruders
-                    self.sendCommand("M105 T%d" % (self._temperature_requested_extruder_index))
-                else:
-                    self.sendCommand("M105")
-                temperature_request_timeout = time.time() + 5
-
-            if line.startswith(b"Error:"):
-                # Oh YEAH, consistency.
-                # Marlin reports a MIN/MAX temp error as "Error:x\n: Extruder switched off. MAXTEMP triggered !\n"
-                # But a bed temp error is reported as "Error: Temperature heated bed switched off. MAXTEMP triggered !!"
-                # So we can have an extra newline in the most common case. Awesome work people.
-                if re.match(b"Error:[0-9]\n", line):
-                    line = line.rstrip() + self._readline()
-
-                # Skip the communication errors, as those get corrected.
-                if b"Extruder switched off" in line or b"Temperature heated bed switched off" in line or b"Something is wrong, please turn off the printer." in line:
-                    if not self.hasError():
-                        self._setErrorState(line[6:])
-
-            elif b" T:" in line or line.startswith(b"T:"):  # Temperature message
-                try:
-                    self._setHotendTemperature(self._temperature_requested_extruder_index, float(re.search(b"T: *([0-9\.]*)", line).group(1)))
-                except:
-                    pass
-                if b"B:" in line:  # Check if it's a bed temperature
-                    try:
-                        self._setBedTemperature(float(re.search(b"B: *([0-9\.]*)", line).group(1)))
-                    except Exception as e:
-                        pass
-                #TODO: temperature changed callback
-            elif b"_min" in line or b"_max" in line:
-                tag, value = line.split(b":", 1)
-                self._setEndstopState(tag,(b"H" in value or b"TRIGGERED" in value))
-
-            if self._is_printing:
-                if line == b"" and time.time() > ok_timeout:
-                    line = b"ok"  # Force a timeout (basically, send next command)
-
-                if b"ok" in line:
-                    ok_timeout = time.time() + 5
-                    if not self._command_queue.empty():
-                        self._sendCommand(self._command_queue.get())
-                    elif self._is_paused:
-                        line = b""  # Force getting temperature as keep alive
-                    else:
-                        self._sendNextGcodeLine()
-                elif b"resend" in line.lower() or b"rs" in line:  # Because a resend can be asked with "resend" and "rs"
-                    try:
-                        self._gcode_position = int(line.replace(b"N:",b" ").replace(b"N",b" ").replace(b":",b" ").split()[-1])
-                    except:
-                        if b"rs" in line:
-                            self._gcode_position = int(line.split()[1])
-
-            # Request the temperature on comm timeout (every 2 seconds) when we are not printing.)
-            if line == b"":
-                if self._num_extruders > 0:
-                    self._temperature_requested_extruder_index = (self._temperature_requested_extruder_index + 1) % self._num_extruders
-                    self.sendCommand("M105 T%d" % self._temperature_requested_extruder_index)
-                else:
-                    self.sendCommand("M105")
+            self._processLine(line)
 
         Logger.log("i", "Printer connection listen thread stopped for %s" % self._serial_port)
 
-    ##  Send next Gcode in the gcode list
-    def _sendNextGcodeLine(self):
-        if self._gcode_position >= len(self._gcode):
+    ##  Called by the reactor if the serial port can no longer be read or written.
+    def _onSerialClosed(self, error):
+        Logger.log("e", "Unexpected error on serial port. %s" % error)
+        self._registered_serial = None
+        self._setErrorState("Printer has been disconnected")
+        self.close()
+
+    ##  Handle a line that was received from the printer.
+    #   \param line The line as bytes, or an empty line if nothing was received for a while.
+    def _processLine(self, line):
+        if self._connection_state != ConnectionState.connected:
             return
-        if self._gcode_position == 100:
-            self._print_start_time_100 = time.time()
-        line = self._gcode[self._gcode_position]
 
-        if ";" in line:
-            line = line[:line.find(";")]
-        line = line.strip()
-        try:
-            if line == "M0" or line == "M1":
-                line = "M105"  # Don't send the M0 or M1 to the machine, as M0 and M1 are handled as an LCD menu pause.
-            if ("G0" in line or "G1" in line) and "Z" in line:
-                z = float(re.search("Z([0-9\.]*)", line).group(1))
-                if self._current_z != z:
-                    self._current_z = z
-        except Exception as e:
-            Logger.log("e", "Unexpected error with printer connection: %s" % e)
-            self._setErrorState("Unexpected error: %s" %e)
-        checksum = functools.reduce(lambda x,y: x^y, map(ord, "N%d%s" % (self._gcode_position, line)))
+        if self._error_line_start is not None:
+            line = self._error_line_start + line
+            self._error_line_start = None
 
-        self._sendCommand("N%d%s*%d" % (self._gcode_position, line, checksum))
-        self._gcode_position += 1
-        self.setProgress((self._gcode_position / len(self._gcode)) * 100)
-        self.progressChanged.emit()
+        if time.time() > self._temperature_request_timeout:
+            if self._num_extruders > 0:
+                self._temperature_requested_extruder_index = (self._temperature_requested_extruder_index + 1) % self._num_extruders
+                self.sendCommand("M105 T%d" % (self._temperature_requested_extruder_index))
+            else:
+                self.sendCommand("M105")
+            self._temperature_request_timeout = time.time() + 5
+
+        if line.startswith(b"Error:"):
+            # Oh YEAH, consistency.
+            # Marlin reports a MIN/MAX temp error as "Error:x\n: Extruder switched off. MAXTEMP triggered !\n"
+            # But a bed temp error is reported as "Error: Temperature heated bed switched off. MAXTEMP triggered !!"
+            # So we can have an extra newline in the most common case. Awesome work people.
+            if re.match(b"Error:[0-9]\n", line):
+                self._error_line_start = line.rstrip()  # Handled together with the next line.
+                return
+
+            # Skip the communication errors, as those get corrected.
+            if b"Extruder switched off" in line or b"Temperature heated bed switched off" in line or b"Something is wrong, please turn off the printer." in line:
+                if not self.hasError():
+                    self._setErrorState(line[6:])
+
+        elif b" T:" in line or line.startswith(b"T:"):  # Temperature message
+            self._processTemperatures(line)
+        elif b"_min" in line or b"_max" in line:
+            tag, value = line.split(b":", 1)
+            self._setEndstopState(tag,(b"H" in value or b"TRIGGERED" in value))
+
+        if self._is_printing:
+            if line == b"" and time.time() > self._ok_timeout and self._gcode_sender.hasLinesInFlight():
+                line = b"ok"  # Force a timeout (basically, send next command)
+
+            if line.startswith(b"ok"):
+                self._ok_timeout = time.time() + 5
+
+            # Every ok frees a place in the window, also while paused, so queued commands still get sent.
+            self._gcode_sender.processResponse(line)
+
+            if line.startswith(b"ok") and self._is_paused:
+                line = b""  # Force getting temperature as keep alive
+
+        # Request the temperature on comm timeout (every 2 seconds) when we are not printing.)
+        if line == b"":
+            if self._num_extruders > 0:
+                self._temperature_requested_extruder_index = (self._temperature_requested_extruder_index + 1) % self._num_extruders
+                self.sendCommand("M105 T%d" % self._temperature_requested_extruder_index)
+            else:
+                self.sendCommand("M105")
+
+    ##  Handle a temperature report of the printer, and record it in the telemetry history.
+    def _processTemperatures(self, line):
+        hotends, bed = parseTemperatures(line)
+        if any(index is not None for index in hotends):
+            # Printers with multiple hotends report each of them with its index, next to the active one.
+            hotends.pop(None, None)
+        elif None in hotends:
+            hotends = {self._temperature_requested_extruder_index: hotends[None]}
+
+        telemetry = {"line_rate": self._gcode_sender.getLinesPerSecond() if self._is_printing else 0.0,
+                     "resends": self._gcode_sender.getResendCount()}
+        for index, (temperature, target) in hotends.items():
+            if 0 <= index < self._num_extruders:
+                self._setHotendTemperature(index, temperature)
+                telemetry["target_hotend_temperature_%d" % index] = target
+        if bed is not None:
+            self._setBedTemperature(bed[0])
+            telemetry["target_bed_temperature"] = bed[1]
+
+        # Reported targets that are unknown (None) fall back to the targets that were set.
+        self._recordTelemetry({channel: value for channel, value in telemetry.items() if value is not None})
+
+    def _getTelemetryChannels(self):
+        return super()._getTelemetryChannels() + ["line_rate", "resends"]
+
+    ##  Called by the g-code sender after a line of the print was sent.
+    def _onGcodeLineSent(self, position):
+        self._gcode_position = position
+        if position >= 100 and self._print_start_time_100 is None:
+            self._print_start_time_100 = time.time()
+        # Progress 100 means the print is done, which is only known once all lines are acknowledged.
+        self._updateProgressEstimate(min(self._gcode.getProgress(position - 1) * 100, 99.9))
+
+    ##  Called by the g-code sender once all lines of the print are sent and acknowledged.
+    def _onGcodeSent(self):
+        self.setProgress(100)
 
     ##  Set the state of the print.
     #   Sent from the print monitor
     def _setJobState(self, job_state):
         if job_state == "pause":
             self._is_paused = True
+            self._gcode_sender.setPaused(True)
+            self._pauseProgressEstimate(True)
             self._updateJobState("paused")
         elif job_state == "print":
             self._is_paused = False
+            self._gcode_sender.setPaused(False)
+            self._pauseProgressEstimate(False)
             self._updateJobState("printing")
         elif job_state == "abort":
             self.cancelPrint()
@@ -504,6 +574,8 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
         self._progress = (progress / max_progress) * 100  # Convert to scale of 0-100
         if self._progress == 100:
             # Printing is done, reset progress
+            self._gcode_sender.stop()
+            self._stopProgressEstimate()
             self._gcode_position = 0
             self.setProgress(0)
             self._is_printing = False
@@ -513,9 +585,11 @@ class USBPrinterOutputDevice(PrinterOutputDevice):
 
     ##  Cancel the current print. Printer connection wil continue to listen.
     def cancelPrint(self):
+        self._gcode_sender.stop()
+        self._stopProgressEstimate()
         self._gcode_position = 0
         self.setProgress(0)
-        self._gcode = []
+        self._gcode = None
 
         # Turn off temperatures, fan and steppers
         self._sendCommand("M140 S0")
@@ -3,6 +3,8 @@
 
 from UM.Signal import Signal, signalemitter
 from . import USBPrinterOutputDevice
+from .SerialPortProber import SerialPortProber
+from .SerialReactor import SerialReactor
 from UM.Application import Application
 from UM.Resources import Resources
 from UM.Logger import Logger
@@ -11,13 +13,13 @@ from UM.OutputDevice.OutputDevicePlugin import OutputDevicePlugin
 from cura.PrinterOutputDevice import ConnectionState
 from UM.Qt.ListModel import ListModel
 from UM.Message import Message
+from UM.Preferences import Preferences
 
 from cura.CuraApplication import CuraApplication
 
 import threading
 import platform
 import glob
-import time
 import os.path
 from UM.Extension import Extension
 
@@ -35,12 +37,21 @@ class USBPrinterOutputDeviceManager(QObject, OutputDevicePlugin, Extension):
         self._serial_port_list = []
         self._usb_output_devices = {}
         self._usb_output_devices_model = None
-        self._update_thread = threading.Thread(target = self._updateThread)
-        self._update_thread.setDaemon(True)
+
+        # Shared by all devices, so the baud rate that worked last for a port is remembered.
+        self._port_prober = SerialPortProber()
+
+        # Reads from all connected printers, sends their prints and polls for new serial ports, all on one thread.
+        self._reactor = SerialReactor()
+        self._update_timer = None
 
         self._check_updates = True
         self._firmware_view = None
 
+        # Number of g-code lines that are sent to a printer before waiting for them to be acknowledged. This should not
+        # be larger than the command buffer of the firmware.
+        Preferences.getInstance().addPreference("usb_printing/gcode_window_size", 4)
+
         Application.getInstance().applicationShuttingDown.connect(self.stop)
         self.addUSBOutputDeviceSignal.connect(self.addOutputDevice) #Because the model needs to be created in the same thread as the QMLEngine, we use a signal.
 
@@ -59,20 +70,22 @@ class USBPrinterOutputDeviceManager(QObject, OutputDevicePlugin, Extension):
 
     def start(self):
         self._check_updates = True
-        self._update_thread.start()
+        self._reactor.start()
+        if self._update_timer is None:
+            # Listing the ports is cheap, and a new printer should be connected to quickly.
+            self._update_timer = self._reactor.callPeriodically(1, self._updatePorts)
 
     def stop(self):
         self._check_updates = False
-        try:
-            self._update_thread.join()
-        except RuntimeError:
-            pass
+        if self._update_timer is not None:
+            self._update_timer.cancel()
+            self._update_timer = None
+        self._reactor.stop()
 
-    def _updateThread(self):
-        while self._check_updates:
+    def _updatePorts(self):
+        if self._check_updates:
             result = self.getSerialPortList(only_list_usb = True)
             self._addRemovePorts(result)
-            time.sleep(5)
 
     ##  Show firmware interface.
     #   This will create the view if its not already created.
@@ -188,7 +201,10 @@ class USBPrinterOutputDeviceManager(QObject, OutputDevicePlugin, Extension):
         devices_to_remove = []
         for port, device in self._usb_output_devices.items():
             if port not in self._serial_port_list:
-                device.close()
+                # Closing waits for a connection attempt to finish, which should not hold up the reactor.
+                close_thread = threading.Thread(target = device.close)
+                close_thread.daemon = True
+                close_thread.start()
                 devices_to_remove.append(port)
 
         for port in devices_to_remove:
@@ -196,7 +212,7 @@ class USBPrinterOutputDeviceManager(QObject, OutputDevicePlugin, Extension):
 
     ##  Because the model needs to be created in the same thread as the QMLEngine, we use a signal.
     def addOutputDevice(self, serial_port):
-        device = USBPrinterOutputDevice.USBPrinterOutputDevice(serial_port)
+        device = USBPrinterOutputDevice.USBPrinterOutputDevice(serial_port, self._port_prober, self._reactor)
         device.connectionStateChanged.connect(self._onConnectionStateChanged)
         device.connect()
         device.progressChanged.connect(self.progressChanged)
@@ -8,6 +8,7 @@ import struct
 import sys
 import time
 
+import numpy
 from serial import Serial
 from serial import SerialException
 from serial import SerialTimeoutException
@@ -33,17 +34,11 @@ class Stk500v2(ispBase.IspBase):
             raise ispBase.IspError("Unexpected error while connecting to serial port:" + port + ":" + str(sys.exc_info()[0]))
         self.seq = 1
 
-        #Reset the controller
-        for n in range(0, 2):
-            self.serial.setDTR(True)
-            time.sleep(0.1)
-            self.serial.setDTR(False)
-            time.sleep(0.1)
-        time.sleep(0.2)
+        self._resetController()
 
         self.serial.flushInput()
         self.serial.flushOutput()
-        if self.sendMessage([0x10, 0xc8, 0x64, 0x19, 0x20, 0x00, 0x53, 0x03, 0xac, 0x53, 0x00, 0x00]) != [0x10, 0x00]:
+        if self.sendMessage([0x10, 0xc8, 0x64, 0x19, 0x20, 0x00, 0x53, 0x03, 0xac, 0x53, 0x00, 0x00]) != b"\x10\x00":
             self.close()
             raise ispBase.IspError("Failed to enter programming mode")
 
@@ -54,6 +49,15 @@ class Stk500v2(ispBase.IspBase):
             self._has_checksum = False
         self.serial.timeout = 5
 
+    #Reset the controller, so it starts the bootloader.
+    def _resetController(self):
+        for n in range(0, 2):
+            self.serial.setDTR(True)
+            time.sleep(0.1)
+            self.serial.setDTR(False)
+            time.sleep(0.1)
+        time.sleep(0.2)
+
     def close(self):
         if self.serial is not None:
             self.serial.close()
@@ -63,7 +67,7 @@ class Stk500v2(ispBase.IspBase):
     #	This allows you to use the serial port without opening it again.
     def leaveISP(self):
         if self.serial is not None:
-            if self.sendMessage([0x11]) != [0x11, 0x00]:
+            if self.sendMessage([0x11]) != b"\x11\x00":
                 raise ispBase.IspError("Failed to leave programming mode")
             ret = self.serial
             self.serial = None
@@ -81,6 +85,7 @@ class Stk500v2(ispBase.IspBase):
         return recv[2:6]
     
     def writeFlash(self, flash_data):
+        flash_data = _toBuffer(flash_data)
         #Set load addr to 0, in case we have more then 64k flash we need to enable the address extension
         page_size = self.chip["pageSize"] * 2
         flash_size = page_size * self.chip["pageCount"]
@@ -89,26 +94,31 @@ class Stk500v2(ispBase.IspBase):
             self.sendMessage([0x06, 0x80, 0x00, 0x00, 0x00])
         else:
             self.sendMessage([0x06, 0x00, 0x00, 0x00, 0x00])
-        load_count = (len(flash_data) + page_size - 1) / page_size   
-        for i in range(0, int(load_count)):
-            recv = self.sendMessage([0x13, page_size >> 8, page_size & 0xFF, 0xc1, 0x0a, 0x40, 0x4c, 0x20, 0x00, 0x00] + flash_data[(i * page_size):(i * page_size + page_size)])
+        load_count = (len(flash_data) + page_size - 1) // page_size
+        command = bytes([0x13, page_size >> 8, page_size & 0xFF, 0xc1, 0x0a, 0x40, 0x4c, 0x20, 0x00, 0x00])
+        for i in range(0, load_count):
+            page = flash_data[(i * page_size):(i * page_size + page_size)]
+            if len(page) < page_size:
+                # The page size is sent along with the page, so the last page is padded with erased flash.
+                page = bytes(page) + b"\xFF" * (page_size - len(page))
+            recv = self.sendMessage(command, page)
+            if recv[1] != 0x00:
+                raise ispBase.IspError("Failed to write flash page %d" % i)
             if self.progress_callback is not None:
                 if self._has_checksum:
                     self.progress_callback(i + 1, load_count)
                 else:
                     self.progress_callback(i + 1, load_count*2)
-    
+
     def verifyFlash(self, flash_data):
+        flash_data = _toBuffer(flash_data)
         if self._has_checksum:
             self.sendMessage([0x06, 0x00, (len(flash_data) >> 17) & 0xFF, (len(flash_data) >> 9) & 0xFF, (len(flash_data) >> 1) & 0xFF])
             res = self.sendMessage([0xEE])
             checksum_recv = res[2] | (res[3] << 8)
-            checksum = 0
-            for d in flash_data:
-                checksum += d
-            checksum &= 0xFFFF
-            if hex(checksum) != hex(checksum_recv):
-                raise ispBase.IspError("Verify checksum mismatch: 0x%x != 0x%x" % (checksum & 0xFFFF, checksum_recv))
+            checksum = int(numpy.frombuffer(flash_data, dtype = numpy.uint8).sum(dtype = numpy.uint64)) & 0xFFFF
+            if checksum != checksum_recv:
+                raise ispBase.IspError("Verify checksum mismatch: 0x%x != 0x%x" % (checksum, checksum_recv))
         else:
             #Set load addr to 0, in case we have more then 64k flash we need to enable the address extension
             flash_size = self.chip["pageSize"] * 2 * self.chip["pageCount"]
@@ -117,68 +127,67 @@ class Stk500v2(ispBase.IspBase):
             else:
                 self.sendMessage([0x06, 0x00, 0x00, 0x00, 0x00])
 
-            load_count = (len(flash_data) + 0xFF) / 0x100
-            for i in range(0, int(load_count)):
-                recv = self.sendMessage([0x14, 0x01, 0x00, 0x20])[2:0x102]
+            load_count = (len(flash_data) + 0xFF) // 0x100
+            for i in range(0, load_count):
+                expected = flash_data[(i * 0x100):(i * 0x100 + 0x100)]
+                recv = memoryview(self.sendMessage([0x14, 0x01, 0x00, 0x20]))[2:2 + len(expected)]
                 if self.progress_callback is not None:
                     self.progress_callback(load_count + i + 1, load_count*2)
-                for j in range(0, 0x100):
-                    if i * 0x100 + j < len(flash_data) and flash_data[i * 0x100 + j] != recv[j]:
-                        raise ispBase.IspError("Verify error at: 0x%x" % (i * 0x100 + j))
-
-    def sendMessage(self, data):
-        message = struct.pack(">BBHB", 0x1B, self.seq, len(data), 0x0E)
-        for c in data:
-            message += struct.pack(">B", c)
-        checksum = 0
-        for c in message:
-            checksum ^= c
-        message += struct.pack(">B", checksum)
+                if recv != expected:
+                    if len(recv) < len(expected):
+                        raise ispBase.IspError("Verify error at: 0x%x" % (i * 0x100 + len(recv)))
+                    mismatch = numpy.flatnonzero(numpy.frombuffer(recv, dtype = numpy.uint8) != numpy.frombuffer(expected, dtype = numpy.uint8))[0]
+                    raise ispBase.IspError("Verify error at: 0x%x" % (i * 0x100 + mismatch))
+
+    ##  Send a message to the programmer and wait for the answer.
+    #   \param data The body of the message, as bytes or a list of byte values.
+    #   \param payload Optional bytes-like object that is appended to the body without copying it first, like a page
+    #          of flash data.
+    #   \return The body of the answer, as bytes.
+    def sendMessage(self, data, payload = b""):
+        message = bytearray(struct.pack(">BBHB", 0x1B, self.seq, len(data) + len(payload), 0x0E))
+        message += bytes(data)
+        message += payload
+        message.append(_checksum(message))
         try:
+            # No need to wait for the message to be transmitted, as we wait for the answer anyway.
             self.serial.write(message)
-            self.serial.flush()
         except SerialTimeoutException:
             raise ispBase.IspError("Serial send timeout")
         self.seq = (self.seq + 1) & 0xFF
         return self.recvMessage()
-    
+
+    ##  Receive a message from the programmer.
+    #   Bytes that are not part of a message with a valid token and checksum are skipped.
+    #   \return The body of the message, as bytes.
     def recvMessage(self):
-        state = "Start"
-        checksum = 0
         while True:
-            s = self.serial.read()
-            if len(s) < 1:
-                raise ispBase.IspError("Timeout")
-            b = struct.unpack(">B", s)[0]
-            checksum ^= b
-            #print(hex(b))
-            if state == "Start":
-                if b == 0x1B:
-                    state = "GetSeq"
-                    checksum = 0x1B
-            elif state == "GetSeq":
-                state = "MsgSize1"
-            elif state == "MsgSize1":
-                msg_size = b << 8
-                state = "MsgSize2"
-            elif state == "MsgSize2":
-                msg_size |= b
-                state = "Token"
-            elif state == "Token":
-                if b != 0x0E:
-                    state = "Start"
-                else:
-                    state = "Data"
-                    data = []
-            elif state == "Data":
-                data.append(b)
-                if len(data) == msg_size:
-                    state = "Checksum"
-            elif state == "Checksum":
-                if checksum != 0:
-                    state = "Start"
-                else:
-                    return data
+            start = self._read(1)
+            if start[0] != 0x1B:
+                continue
+            header = self._read(4) # Sequence number, message size and token.
+            if header[3] != 0x0E:
+                continue
+            msg_size = (header[1] << 8) | header[2]
+            body = self._read(msg_size + 1) # Message and checksum.
+            if _checksum(start + header + body) == 0:
+                return body[:-1]
+
+    def _read(self, size):
+        data = self.serial.read(size)
+        if len(data) < size:
+            raise ispBase.IspError("Timeout")
+        return data
+
+##  Get the XOR of all bytes of a message, as used by the STK500v2 protocol.
+def _checksum(data):
+    return int(numpy.bitwise_xor.reduce(numpy.frombuffer(data, dtype = numpy.uint8)))
+
+##  Get the flash data as a buffer that can be sliced without copying.
+def _toBuffer(flash_data):
+    if isinstance(flash_data, (bytes, bytearray, memoryview)):
+        return memoryview(flash_data)
+    return memoryview(bytes(flash_data))
 
 def portList():
     ret = []
@@ -39,6 +39,8 @@ UM.PreferencesPage
         scaleTinyCheckbox.checked = boolCheck(UM.Preferences.getValue("mesh/scale_tiny_meshes"))
         UM.Preferences.resetPreference("cura/jobname_prefix")
         prefixJobNameCheckbox.checked = boolCheck(UM.Preferences.getValue("cura/jobname_prefix"))
+        UM.Preferences.resetPreference("removable_drive/compress_gcode")
+        compressGCodeCheckbox.checked = boolCheck(UM.Preferences.getValue("removable_drive/compress_gcode"))
         UM.Preferences.resetPreference("view/show_overhang");
         showOverhangCheckbox.checked = boolCheck(UM.Preferences.getValue("view/show_overhang"))
         UM.Preferences.resetPreference("view/center_on_select");
@@ -286,6 +288,20 @@ UM.PreferencesPage
             }
         }
 
+        UM.TooltipArea {
+            width: childrenRect.width
+            height: childrenRect.height
+            text: catalog.i18nc("@info:tooltip", "Should g-code be compressed when it is saved to a removable drive? Compressed g-code is much faster to copy, but most printers can't print it from their SD card.")
+
+            CheckBox
+            {
+                id: compressGCodeCheckbox
+                text: catalog.i18nc("@option:check", "Compress g-code on removable drives")
+                checked: boolCheck(UM.Preferences.getValue("removable_drive/compress_gcode"))
+                onCheckedChanged: UM.Preferences.setValue("removable_drive/compress_gcode", checked)
+            }
+        }
+
         Item
         {
             //: Spacer
@@ -0,0 +1,113 @@
+import functools
+import os
+import queue
+import re
+import select
+import termios
+import threading
+import time
+import tty
+
+##  Stand-in for a printer running Marlin, on the master side of a pseudo terminal.
+#
+#   Open FakeMarlin.port with pyserial to talk to it. Numbered lines are checked for their line number and checksum
+#   like Marlin does, and every response is sent after a fixed latency to mimic the time the printer takes to
+#   process a command. If a baud rate is given, the printer only responds with gibberish while the port is opened at
+#   a different baud rate.
+class FakeMarlin:
+    def __init__(self, latency = 0.0, corrupt_lines = (), baud_rate = None):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+        self._latency = latency
+        self._corrupt_lines = set(corrupt_lines)  # Line numbers that fail the checksum test once.
+        self._baud_rate = baud_rate
+
+        self.received = []  # Commands that were accepted, without line number and checksum.
+        self.resends = 0
+        self._last_line = 0
+
+        self._responses = queue.Queue()
+        self._running = True
+        self._reader = threading.Thread(target = self._read)
+        self._reader.daemon = True
+        self._reader.start()
+        self._writer = threading.Thread(target = self._write)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def close(self):
+        self._running = False
+        self._reader.join()
+        self._writer.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _respond(self, response):
+        self._responses.put((time.monotonic() + self._latency, response))
+
+    def _write(self):
+        while self._running:
+            try:
+                due, response = self._responses.get(timeout = 0.1)
+            except queue.Empty:
+                continue
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            os.write(self._master, response)
+
+    def _read(self):
+        data = b""
+        while self._running:
+            readable, _, _ = select.select([self._master], [], [], 0.1)
+            if not readable:
+                continue
+            data += os.read(self._master, 4096)
+            *lines, data = data.split(b"\n")
+            for line in lines:
+                self._handleLine(line.strip())
+
+    def _resend(self, error):
+        self.resends += 1
+        self._respond(b"Error:" + error + b", Last Line: %d\nResend: %d\nok\n" % (self._last_line, self._last_line + 1))
+
+    ##  Check if the port is opened at the baud rate of the printer.
+    #   Baud rates without a termios constant can not be told apart, as they are all set through BOTHER.
+    def _baudRateMatches(self):
+        if self._baud_rate is None:
+            return True
+        speed = termios.tcgetattr(self._slave)[4]
+        return speed == getattr(termios, "B%d" % self._baud_rate, getattr(termios, "BOTHER", 0o10000))
+
+    def _handleLine(self, line):
+        if not line:
+            return
+        if not self._baudRateMatches():
+            self._respond(b"\xfe\x8f\x0b\xe0\x80\n")
+            return
+
+        match = re.match(b"N([0-9]+)(.*)\\*([0-9]+)$", line)
+        if match:
+            number = int(match.group(1))
+            command = match.group(2).strip()
+            checksum = functools.reduce(lambda x, y: x ^ y, line[:line.rfind(b"*")], 0)
+
+            if command != b"M110" and number != self._last_line + 1:
+                self._resend(b"Line Number is not Last Line Number+1")
+                return
+            if checksum != int(match.group(3)) or number in self._corrupt_lines:
+                self._corrupt_lines.discard(number)
+                self._resend(b"checksum mismatch")
+                return
+            self._last_line = number
+        else:
+            command = line
+
+        self.received.append(command)
+        if command.startswith(b"M105"):
+            self._respond(b"ok T:20.0 /0.0 B:20.0 /0.0 @:0 B@:0\n")
+        else:
+            self._respond(b"ok\n")
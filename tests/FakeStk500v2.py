@@ -0,0 +1,95 @@
+import functools
+import os
+import select
+import struct
+import threading
+import tty
+
+##  Stand-in for the STK500v2 bootloader of an ATMega2560, on the master side of a pseudo terminal.
+#
+#   Open FakeStk500v2.port with pyserial to talk to it. Only the commands that Stk500v2 uses are implemented. If
+#   has_checksum is False, the bootloader does not know the checksum command, so the flash has to be verified by
+#   reading it back.
+class FakeStk500v2:
+    signature = bytes([0x1E, 0x98, 0x01])
+    page_size = 256
+    flash_size = 256 * 1024
+
+    def __init__(self, has_checksum = True):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+        self._has_checksum = has_checksum
+        self.flash = bytearray(b"\xFF" * self.flash_size)
+        self.messages = 0
+        self._address = 0  # Byte address of the next page to program or read.
+
+        self._running = True
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _run(self):
+        data = b""
+        while self._running:
+            readable, _, _ = select.select([self._master], [], [], 0.1)
+            if not readable:
+                continue
+            data += os.read(self._master, 65536)
+            while len(data) >= 6:
+                start = data.find(b"\x1B")
+                if start < 0:
+                    data = b""
+                    break
+                data = data[start:]
+                size = struct.unpack(">H", data[2:4])[0]
+                if len(data) < size + 6:
+                    break
+                message, data = data[:size + 6], data[size + 6:]
+                if functools.reduce(lambda x, y: x ^ y, message) != 0:
+                    continue
+                self.messages += 1
+                self._send(message[1], self._handle(message[5:5 + size]))
+
+    def _send(self, sequence, body):
+        message = struct.pack(">BBHB", 0x1B, sequence, len(body), 0x0E) + body
+        message += bytes([functools.reduce(lambda x, y: x ^ y, message)])
+        os.write(self._master, message)
+
+    def _handle(self, body):
+        command = body[0]
+        if command == 0x10 or command == 0x11:  # Enter and leave programming mode.
+            return bytes([command, 0x00])
+        if command == 0x06:  # Load address, in words.
+            self._address = (struct.unpack(">I", body[1:5])[0] & 0x7FFFFFFF) * 2
+            return bytes([command, 0x00])
+        if command == 0x1D:  # SPI multi, used to read the signature and to erase the chip.
+            instruction = body[4:8]
+            result = 0x00
+            if instruction[0] == 0x30:
+                result = self.signature[instruction[2]]
+            elif instruction[0] == 0xAC and instruction[1] == 0x80:
+                self.flash[:] = b"\xFF" * self.flash_size
+            return bytes([command, 0x00, 0x00, 0x00, 0x00, result, 0x00])
+        if command == 0x13:  # Program a page.
+            size = (body[1] << 8) | body[2]
+            self.flash[self._address:self._address + size] = body[10:10 + size]
+            self._address += size
+            return bytes([command, 0x00])
+        if command == 0x14:  # Read flash.
+            size = (body[1] << 8) | body[2]
+            data = bytes(self.flash[self._address:self._address + size])
+            self._address += size
+            return bytes([command, 0x00]) + data + b"\x00"
+        if command == 0xEE and self._has_checksum:  # Checksum of the flash up to the loaded address.
+            checksum = sum(self.flash[:self._address]) & 0xFFFF
+            return bytes([command, 0x00, checksum & 0xFF, checksum >> 8])
+        return bytes([command, 0xC9])  # Unknown command.
@@ -0,0 +1,95 @@
+import io
+import os
+
+import pytest
+
+from cura.BufferedFileCopier import BufferedFileCopier
+
+##  Destination that writes at most a few bytes at once and records the syncs.
+class SlowFile(io.RawIOBase):
+    def __init__(self, path, fail_after = None):
+        self._file = open(path, "wb", buffering = 0)
+        self._fail_after = fail_after
+        self.written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._fail_after is not None and self.written >= self._fail_after:
+            raise OSError(28, "No space left on device")
+        count = self._file.write(bytes(data[:1000]))
+        self.written += count
+        return count
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+def createSource(size):
+    return io.BytesIO(bytes(index % 251 for index in range(size)))
+
+@pytest.mark.parametrize("size", [0, 1, 4096, 10000, 100000])
+def test_copy(tmpdir, size):
+    source = createSource(size)
+    path = str(tmpdir.join("copy.gcode"))
+    finished = []
+    copier = BufferedFileCopier(source, open(path, "wb", buffering = 0), block_size = 4096, finished_callback = finished.append)
+    copier.start()
+    assert copier.wait(10)
+
+    assert finished == [None]
+    assert copier.getError() is None
+    assert copier.getBytesSynced() == size
+    with open(path, "rb") as f:
+        assert f.read() == source.getvalue()
+
+def test_partialWritesAndProgress(tmpdir):
+    source = createSource(50000)
+    source.seek(123)  # Copied from the start anyway.
+    destination = SlowFile(str(tmpdir.join("copy.gcode")))
+    progress = []
+    copier = BufferedFileCopier(source, destination, block_size = 4096, buffer_count = 3, sync_interval = 10000,
+                                progress_callback = lambda synced, total: progress.append((synced, total)))
+    copier.start()
+    assert copier.wait(10)
+
+    assert destination.written == 50000
+    assert destination.closed
+    # Progress is reported after every sync, with blocks of 4096 bytes, and at the end.
+    assert progress == [(12288, 50000), (24576, 50000), (36864, 50000), (49152, 50000), (50000, 50000)]
+
+def test_writeError(tmpdir):
+    destination = SlowFile(str(tmpdir.join("copy.gcode")), fail_after = 20000)
+    finished = []
+    copier = BufferedFileCopier(createSource(100000), destination, block_size = 4096, finished_callback = finished.append)
+    copier.start()
+    assert copier.wait(10)
+
+    assert isinstance(copier.getError(), OSError)
+    assert finished == [copier.getError()]
+    assert copier.getBytesSynced() < 100000
+    assert destination.closed
+
+def test_readError(tmpdir):
+    class BrokenSource(io.BytesIO):
+        def readinto(self, buffer):
+            raise OSError("Can't read")
+
+    path = str(tmpdir.join("copy.gcode"))
+    copier = BufferedFileCopier(BrokenSource(b"data"), open(path, "wb", buffering = 0))
+    copier.start()
+    assert copier.wait(10)
+    assert str(copier.getError()) == "Can't read"
+
+def test_cancel(tmpdir):
+    path = str(tmpdir.join("copy.gcode"))
+    copier = BufferedFileCopier(createSource(100000), open(path, "wb", buffering = 0), block_size = 1024)
+    copier.cancel()
+    copier.start()
+    assert copier.wait(10)
+    assert isinstance(copier.getError(), InterruptedError)
+    assert os.path.getsize(path) < 100000
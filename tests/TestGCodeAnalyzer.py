@@ -0,0 +1,162 @@
+import math
+import random
+import time
+
+import pytest
+
+from cura.GCodeAnalyzer import GCodeAnalyzer
+
+gcode = """;FLAVOR:RepRap
+M82 ;absolute extrusion mode
+G28 ;home all axes
+G1 Z15.0 F9000
+G92 E0
+G1 F200 E3
+G92 E0
+;LAYER:0
+G0 F3000 X10 Y10 Z0.3
+G1 F1200 X20 Y10 E1.5
+G1 X20 Y20 E3.0 ; comment X100 E100
+G1 E1 F2400
+;LAYER:1
+G0 X0 Y0 Z0.5
+G1 E3
+G4 P500
+G1 X10 Y0 E4.25
+G91 ;relative positioning
+G1 Z+0.5 E-5 X-20 Y-20 F9000
+G90
+M84
+"""
+
+def test_layerStatistics():
+    analysis = GCodeAnalyzer().analyse(gcode)
+
+    assert list(analysis.getLayerNumbers()) == [0, 1]
+    assert analysis.getMoveCount() == 10
+    assert analysis.getLayerExtrusionLengths() == pytest.approx([1, -1.75])
+    assert analysis.getLayerPrintDistances() == pytest.approx([20, 10])
+    travel_0 = math.sqrt(10 ** 2 + 10 ** 2 + 14.7 ** 2)
+    travel_1 = math.sqrt(20 ** 2 + 20 ** 2 + 0.2 ** 2) + math.sqrt(20 ** 2 + 20 ** 2 + 0.5 ** 2)
+    assert analysis.getLayerTravelDistances() == pytest.approx([travel_0, travel_1])
+    assert analysis.getTotalExtrusionLength() == pytest.approx(3 + 1 - 1.75)
+
+    layer_times = analysis.getLayerPrintTimes()
+    assert layer_times[0] > 20 / 20  # The printing moves can't be faster than their feedrate.
+    assert layer_times[1] > 0.5  # Includes the dwell.
+    assert analysis.getTotalPrintTime() > layer_times.sum()  # The start g-code takes time too.
+
+def test_relativeExtrusion():
+    analysis = GCodeAnalyzer().analyse(["M83\n;LAYER:0\n", "G1 X10 E1\nG1 X20 E1\nG1 E-2\nG1 E2\n"])
+    assert analysis.getLayerExtrusionLengths() == pytest.approx([2])
+    assert analysis.getLayerPrintDistances() == pytest.approx([20])
+
+def test_moveTime():
+    # A long move at a constant speed takes about its length divided by its speed.
+    analysis = GCodeAnalyzer(acceleration = 1000, jerk = 10).analyse(";LAYER:0\nG1 F6000 X1000\n")
+    acceleration_time = (100 - 10) / 1000
+    acceleration_distance = (100 ** 2 - 10 ** 2) / 2000
+    expected = 2 * acceleration_time + (1000 - 2 * acceleration_distance) / 100
+    assert analysis.getTotalPrintTime() == pytest.approx(expected)
+
+    # Going straight on doesn't slow down, going back does.
+    straight = GCodeAnalyzer().analyse("G1 F6000 X10\nG1 X20\n").getTotalPrintTime()
+    back = GCodeAnalyzer().analyse("G1 F6000 X10\nG1 X0\n").getTotalPrintTime()
+    assert straight < back
+
+def test_numbers():
+    analysis = GCodeAnalyzer().analyse(";LAYER:-2\nG1 X-1.5 Y.5 E+0.25\nG1 X 7 Ynothing E0.25\n;LAYER:-1\n;LAYER:0\nG1 X123456789012345678 Y2.500\n")
+    assert list(analysis.getLayerNumbers()) == [-2, -1, 0]
+    assert analysis.getLayerPrintDistances()[0] == pytest.approx(math.sqrt(1.5 ** 2 + 0.5 ** 2))
+    assert analysis.getLayerTravelDistances()[2] == pytest.approx(2)  # The X is too long to be parsed.
+
+def test_printTimesPerLayerNumber():
+    # Two objects printed one at a time, on a raft.
+    analysis = GCodeAnalyzer().analyse(";LAYER:-1\nG1 F600 X10\n;LAYER:0\nG1 X20\n;LAYER:1\nG1 X30\n;LAYER:0\nG1 X40\n")
+    layer_times = analysis.getLayerPrintTimes()
+    times = analysis.getPrintTimesPerLayerNumber()
+    assert len(times) == 3
+    assert times[0] == pytest.approx(layer_times[0])
+    assert times[1] == pytest.approx(layer_times[1] + layer_times[3])
+    assert times[2] == pytest.approx(layer_times[2])
+    assert len(GCodeAnalyzer().analyse("G1 X10\n").getPrintTimesPerLayerNumber()) == 0
+
+def test_feedrateHistogram():
+    analysis = GCodeAnalyzer().analyse(";LAYER:0\nG1 F600 X100 E1\nG0 F6000 X0\n;LAYER:1\nG1 F1200 X100 E2\n")
+    times, edges = analysis.getFeedrateHistogram(bins = [0, 15, 30])
+    assert list(edges) == [0, 15, 30]
+    assert times[0] == pytest.approx(10, rel = 0.01)
+    assert times[1] == pytest.approx(5, rel = 0.01)
+    times, edges = analysis.getFeedrateHistogram(bins = [0, 15, 30], layer = 1)
+    assert times[0] == 0
+
+def test_empty():
+    analysis = GCodeAnalyzer().analyse([])
+    assert analysis.getLayerCount() == 0
+    assert analysis.getMoveCount() == 0
+    assert analysis.getTotalPrintTime() == 0
+
+##  Create g-code like CuraEngine writes it.
+def createGCode(layer_count, moves_per_layer):
+    random.seed(layer_count)
+    gcode_list = [";FLAVOR:RepRap\nM82\nG28\nG92 E0\n"]
+    e = 0
+    for layer in range(layer_count):
+        lines = [";LAYER:%d\n" % layer, "G0 F7200 X%.3f Y%.3f Z%.3f\n" % (random.uniform(0, 200), random.uniform(0, 200), 0.2 * layer + 0.3), ";TYPE:WALL-OUTER\n"]
+        for move in range(moves_per_layer):
+            if move % 50 == 0:
+                lines.append("G1 F2400 E%.5f\nG0 F7200 X%.3f Y%.3f\nG1 F2400 E%.5f\n" % (e - 4.5, random.uniform(0, 200), random.uniform(0, 200), e))
+            e += random.uniform(0, 0.1)
+            feedrate = "F1800 " if move % 7 == 0 else ""
+            lines.append("G1 %sX%.3f Y%.3f E%.5f\n" % (feedrate, random.uniform(0, 200), random.uniform(0, 200), e))
+        gcode_list.append("".join(lines))
+    gcode_list.append("M104 S0\nM84\n")
+    return gcode_list
+
+##  Reference that parses the g-code line by line.
+def analyseLineByLine(gcode_list):
+    position = [0.0, 0.0, 0.0, 0.0]
+    layer = -1
+    extrusions = {}
+    distances = {}
+    for line in "".join(gcode_list).split("\n"):
+        line = line.split(";")[0] if not line.startswith(";LAYER:") else line
+        if line.startswith(";LAYER:"):
+            layer += 1
+            extrusions[layer] = 0
+            distances[layer] = 0
+        parts = line.split()
+        if not parts or parts[0] not in ("G0", "G1", "G92"):
+            continue
+        new_position = list(position)
+        for part in parts[1:]:
+            if part[0] in "XYZE":
+                new_position["XYZE".index(part[0])] = float(part[1:])
+        if parts[0] != "G92" and layer >= 0:
+            extrusions[layer] += new_position[3] - position[3]
+            distances[layer] += math.sqrt(sum((new_position[axis] - position[axis]) ** 2 for axis in range(3)))
+        position = new_position
+    return [extrusions[layer] for layer in sorted(extrusions)], [distances[layer] for layer in sorted(distances)]
+
+def test_compareToReference():
+    gcode_list = createGCode(20, 500)
+    analysis = GCodeAnalyzer(block_size = 10000).analyse(gcode_list)  # Many blocks.
+    extrusions, distances = analyseLineByLine(gcode_list)
+    assert analysis.getLayerExtrusionLengths() == pytest.approx(extrusions)
+    assert analysis.getLayerPrintDistances() + analysis.getLayerTravelDistances() == pytest.approx(distances)
+
+@pytest.mark.benchmark
+def test_benchmark(record_property):
+    gcode_list = createGCode(100, 5000)
+    size = sum(map(len, gcode_list)) / 1e6
+
+    start_time = time.monotonic()
+    analyseLineByLine(gcode_list)
+    reference_time = time.monotonic() - start_time
+
+    start_time = time.monotonic()
+    GCodeAnalyzer().analyse(gcode_list)
+    analyse_time = time.monotonic() - start_time
+
+    record_property("reference_megabytes_per_second", size / reference_time)
+    record_property("megabytes_per_second", size / analyse_time)
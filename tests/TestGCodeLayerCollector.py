@@ -0,0 +1,81 @@
+import math
+
+import numpy
+import pytest
+
+from cura.GCodeLayerCollector import GCodeLayerCollector
+from cura.GCodeParser import GCodeParser
+
+# Line types as numbers: 1 before the first type comment, then 10 and up for the types of the parser.
+type_map = [1] + [10 + index for index in range(len(GCodeParser.LineTypes))]
+travel_type = 2
+retraction_type = 3
+
+def collect(gcode, block_size = 1024):
+    collector = GCodeLayerCollector(type_map, travel_type, retraction_type, filament_diameter = 2)
+    for moves in GCodeParser(block_size = block_size).parse(gcode):
+        collector.addMoves(moves)
+    return collector.getLayers()
+
+gcode = """G28
+G1 Z5
+G1 X100 E10 ; Prime line, before the first layer.
+G92 E0
+;LAYER:0
+;TYPE:WALL-OUTER
+G0 X10 Y10 Z0.2
+G1 X20 Y10 E0.1
+G1 X20 Y20 E0.2
+;TYPE:FILL
+G1 X10 Y20 E0.3
+G1 E-1
+G0 X0 Y0
+G1 E0.3
+T1
+G1 X10 Y0 E0.4
+;LAYER:1
+G0 Z0.4
+G1 X10 Y10 E0.5
+"""
+
+def test_layers():
+    layers = collect(gcode)
+    assert [layer.index for layer in layers] == [0, 1]
+    assert layers[0].height == pytest.approx(0.2)
+    assert layers[1].height == pytest.approx(0.4)
+    assert layers[1].thickness == pytest.approx(0.2)
+
+    paths = layers[0].paths
+    assert [path.extruder for path in paths] == [0, 1]
+    assert paths[0].points == pytest.approx(numpy.array([[100, 0, 5], [10, 10, 0.2], [20, 10, 0.2], [20, 20, 0.2], [10, 20, 0.2], [0, 0, 0.2]]))
+    wall, fill = 10 + GCodeParser.LineTypes.index("WALL-OUTER"), 10 + GCodeParser.LineTypes.index("FILL")
+    assert paths[0].line_types.tolist() == [travel_type, wall, wall, fill, retraction_type]
+    assert paths[1].line_types.tolist() == [fill]
+    assert paths[1].points == pytest.approx(numpy.array([[0, 0, 0.2], [10, 0, 0.2]]))
+
+    # 0.1 mm of filament with a diameter of 2 mm over 10 mm of a layer of 0.2 mm.
+    assert paths[0].line_widths[1] == pytest.approx(0.1 * math.pi / (10 * 0.2))
+
+    # The travel of the next layer goes up, the line after it is on the layer.
+    assert layers[1].paths[0].line_types.tolist() == [travel_type, fill]
+    assert layers[1].paths[0].points[-1] == pytest.approx(numpy.array([10, 10, 0.4]))
+
+@pytest.mark.parametrize("block_size", [16, 100, 10000])
+def test_blocks(block_size):
+    expected = collect(gcode)
+    layers = collect(gcode, block_size)
+    assert len(layers) == len(expected)
+    for layer, expected_layer in zip(layers, expected):
+        assert len(layer.paths) == len(expected_layer.paths)
+        for path, expected_path in zip(layer.paths, expected_layer.paths):
+            assert path.points.tolist() == expected_path.points.tolist()
+            assert path.line_types.tolist() == expected_path.line_types.tolist()
+
+def test_withoutLayerComments():
+    layers = collect("G1 Z0.3\nG1 X10 E1\nG1 Y10 E2\nG1 Z0.6\nG1 X0 E3\nG1 Z1 X5\nG1 Z0.9 Y0 E4\n")
+    assert [layer.height for layer in layers] == pytest.approx([0.3, 0.6, 0.9])
+    assert len(layers[0].paths[0].line_types) == 3  # Includes the move up, until the first extruding move on the next height.
+
+def test_empty():
+    assert collect("") == []
+    assert collect("G28\nM104 S200\n") == []
@@ -0,0 +1,26 @@
+import functools
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.GCodeLineBuffer import GCodeLineBuffer
+
+def numberedLine(number, line):
+    checksum = functools.reduce(lambda x, y: x ^ y, map(ord, "N%d%s" % (number, line)))
+    return ("N%d%s*%d\n" % (number, line, checksum)).encode()
+
+def test_encode():
+    lines = ";FLAVOR:RepRap\nM104 S200 ; heat up\n\nG28\n;LAYER:0\nG1 X10.5 Y3 E0.1\n  M0  \nG1 Z0.3".split("\n")
+    buffer = GCodeLineBuffer(lines, 10)
+
+    expected = ["M104 S200", "G28", "G1 X10.5 Y3 E0.1", "M105", "G1 Z0.3"]
+    assert len(buffer) == len(expected)
+    assert buffer.getFirstLineNumber() == 10
+    for number, line in enumerate(expected, 10):
+        assert bytes(buffer.getLine(number)) == numberedLine(number, line)
+    assert buffer.getSize() == sum(len(numberedLine(number, line)) for number, line in enumerate(expected, 10))
+
+def test_encodeEmpty():
+    buffer = GCodeLineBuffer([";Only a comment", ""])
+    assert len(buffer) == 0
+    assert buffer.getSize() == 0
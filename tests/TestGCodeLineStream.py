@@ -0,0 +1,55 @@
+import functools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.GCodeLineStream import GCodeLineStream
+
+def numberedLine(number, line):
+    checksum = functools.reduce(lambda x, y: x ^ y, map(ord, "N%d%s" % (number, line)))
+    return ("N%d%s*%d\n" % (number, line, checksum)).encode()
+
+def createGCodeList(layer_count, lines_per_layer):
+    return [";LAYER:%d\n" % layer + "".join("G1 X%d Y%d\n" % (layer, line) for line in range(lines_per_layer)) for layer in range(layer_count)]
+
+def test_readLines():
+    gcode_list = createGCodeList(20, 1000)
+    stream = GCodeLineStream(gcode_list, history_size = 100)
+
+    assert bytes(stream.getLine(0)) == numberedLine(0, "M110")
+    for number in range(1, 20001):
+        layer, line = divmod(number - 1, 1000)
+        assert bytes(stream.getLine(number)) == numberedLine(number, "G1 X%d Y%d" % (layer, line))
+    assert stream.getLine(20001) is None
+    assert stream.getProgress(20000) == 1.0
+
+def test_rewind():
+    stream = GCodeLineStream(createGCodeList(20, 1000), history_size = 100)
+
+    stream.getLine(15000)
+    # Lines within the history can be requested again, older lines are forgotten.
+    assert bytes(stream.getLine(14901)) == numberedLine(14901, "G1 X14 Y900")
+    with pytest.raises(IndexError):
+        stream.getLine(10)
+
+    # Only the blocks of lines that are needed for the history are kept.
+    assert len(stream._blocks) <= 2
+
+def test_linesAcrossChunks():
+    stream = GCodeLineStream(["G1 X1", "0 Y2\nG1", " Z3\n", "M84"])
+    assert bytes(stream.getLine(1)) == numberedLine(1, "G1 X10 Y2")
+    assert bytes(stream.getLine(2)) == numberedLine(2, "G1 Z3")
+    assert bytes(stream.getLine(3)) == numberedLine(3, "M84")
+    assert stream.getLine(4) is None
+
+def test_fromFile(tmpdir):
+    path = str(tmpdir.join("test.gcode"))
+    with open(path, "w") as f:
+        f.write("".join(createGCodeList(5, 100)))
+
+    stream = GCodeLineStream.fromFile(path, block_size = 333)
+    assert bytes(stream.getLine(250)) == numberedLine(250, "G1 X2 Y49")
+    assert stream.getProgress(250) == pytest.approx(0.5, abs = 0.01)
+    assert stream.getLine(501) is None
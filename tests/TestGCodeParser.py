@@ -0,0 +1,79 @@
+import io
+
+import numpy
+import pytest
+
+from cura.GCodeParser import GCodeParser
+
+gcode = b"""M82
+G28
+G92 E0
+;LAYER:0
+;TYPE:SKIRT
+G0 F3000 X10 Y10 Z0.3
+G1 F1200 X20 Y10 E1.5
+;TYPE:SUPPORT-INTERFACE
+G1 X20 Y20 E3
+T1
+;TYPE:SUPPORT
+G1 X10 Y20 E4.5\r
+;TYPE:SOMETHING-ELSE
+G1 X10 Y10 E6
+;LAYER:1
+G4 S2
+G91
+G1 Z0.2 E-1
+G90
+M83
+G1 X20 E1
+"""
+
+def parseAll(parser, data):
+    blocks = list(parser.parse(data))
+    return blocks, {name: numpy.concatenate([getattr(block, name) for block in blocks]) for name in ("start_positions", "end_positions", "feedrates", "layers", "line_types", "extruders", "layer_numbers", "dwell_times")}
+
+def test_parse():
+    blocks, moves = parseAll(GCodeParser(), gcode)
+    assert len(blocks) == 1
+
+    assert moves["end_positions"].tolist() == [[10, 10, 0.3, 0], [20, 10, 0.3, 1.5], [20, 20, 0.3, 3], [10, 20, 0.3, 4.5], [10, 10, 0.3, 6], [10, 10, 0.5, 5], [20, 10, 0.5, 6]]
+    assert moves["start_positions"][0].tolist() == [0, 0, 0, 0]
+    assert (moves["start_positions"][1:] == moves["end_positions"][:-1]).all()
+    assert moves["feedrates"].tolist() == [3000, 1200, 1200, 1200, 1200, 1200, 1200]
+    assert moves["layers"].tolist() == [0, 0, 0, 0, 0, 1, 1]
+    types = GCodeParser.LineTypes
+    assert moves["line_types"].tolist() == [types.index("SKIRT"), types.index("SKIRT"), types.index("SUPPORT-INTERFACE"), types.index("SUPPORT"), -1, -1, -1]
+    assert moves["extruders"].tolist() == [0, 0, 0, 1, 1, 1, 1]
+    assert moves["layer_numbers"].tolist() == [0, 1]
+    assert moves["dwell_times"].tolist() == [2]
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1000])
+def test_blocks(block_size):
+    # The state is kept from one block to the next, also if a block ends halfway a line.
+    _, expected = parseAll(GCodeParser(), gcode)
+    blocks, moves = parseAll(GCodeParser(block_size = block_size), io.BytesIO(gcode))
+    assert len(blocks) > 1 or block_size == 1000
+    for name in expected:
+        assert moves[name].tolist() == expected[name].tolist()
+
+def test_noNewlineAtEnd():
+    _, moves = parseAll(GCodeParser(), "G1 X10\nG1 X20")
+    assert moves["end_positions"][:, 0].tolist() == [10, 20]
+
+def test_empty():
+    assert list(GCodeParser().parse(b"")) == []
+    blocks, moves = parseAll(GCodeParser(), "; Nothing but a comment\n")
+    assert len(moves["end_positions"]) == 0
+
+def test_numbers():
+    _, moves = parseAll(GCodeParser(), "G1 X-1.5 Y+2 Z.5 E1234567.12345\nG1 X- Y12345678901234567 Z7.\n")
+    assert moves["end_positions"].tolist() == [[-1.5, 2, 0.5, 1234567.12345], [-1.5, 2, 7, 1234567.12345]]  # Parameters without a valid number are left out.
+
+def test_withoutSpaces():
+    _, moves = parseAll(GCodeParser(), "G1X10Y20E1\nG1 X30Y40 ;X50\n")
+    assert moves["end_positions"].tolist() == [[10, 20, 0, 1], [30, 40, 0, 1]]
+
+def test_homeNamedAxes():
+    # G28 only homes the axes that it names, with or without a number, and all of them if it names none.
+    _, moves = parseAll(GCodeParser(), "G1 X10 Y20 Z5\nG28 X\nG1 E1\nG28 Y0 Z\nG1 E2\nG28\nG1 E3\n")
+    assert moves["end_positions"].tolist() == [[10, 20, 5, 0], [0, 20, 5, 1], [0, 0, 0, 2], [0, 0, 0, 3]]
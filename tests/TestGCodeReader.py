@@ -0,0 +1,77 @@
+import os
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("PyQt5.QtCore")
+pytest.importorskip("UM.Application")
+from UM.Math.AxisAlignedBox import AxisAlignedBox
+from UM.Math.Vector import Vector
+from UM.Scene.SceneNode import SceneNode
+
+from cura.ConvexHullDecorator import ConvexHullDecorator
+from cura.GCodeSceneNode import GCodeSceneNode
+from cura.PlatformPhysics import PlatformPhysics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+import GCodeReader.GCodeReader
+
+gcode = """G28
+;LAYER:0
+G0 F3000 X10 Y10 Z0.3
+G1 F1200 X20 Y10 E1
+G1 X20 Y30 E2
+"""
+
+class FakeStack:
+    def getProperty(self, key, property_name):
+        return {"material_diameter": 2.85, "machine_center_is_zero": False, "machine_width": 200, "machine_depth": 200}[key]
+
+class FakeMessage:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def show(self):
+        pass
+
+    def hide(self):
+        pass
+
+    def setProgress(self, progress):
+        pass
+
+@pytest.fixture
+def node(tmpdir, monkeypatch):
+    application = types.SimpleNamespace(getGlobalContainerStack = lambda: FakeStack())
+    monkeypatch.setattr(GCodeReader.GCodeReader.Application, "getInstance", lambda: application)
+    monkeypatch.setattr(GCodeReader.GCodeReader, "Message", FakeMessage)
+    path = tmpdir.join("test.gcode")
+    path.write(gcode)
+    return GCodeReader.GCodeReader.GCodeReader().read(str(path))
+
+def test_boundingBox(node):
+    assert type(node) is GCodeSceneNode
+    # The g-code, including the travel from the origin, is moved from the corner of the build plate to the middle,
+    # with Y up and the Y of the g-code as -Z.
+    bounding_box = node.getBoundingBox()
+    assert (bounding_box.left, bounding_box.right) == pytest.approx((-100, -80))
+    assert (bounding_box.bottom, bounding_box.top) == pytest.approx((0, 0.3))
+    assert (bounding_box.back, bounding_box.front) == pytest.approx((70, 100))
+
+    # Scaling to fit the build volume scales the bounding box along.
+    node.scale(Vector(2, 2, 2))
+    assert node.getBoundingBox().width == pytest.approx(40)
+
+def test_platformPhysics(node):
+    root = SceneNode()
+    node.setParent(root)
+    physics = PlatformPhysics.__new__(PlatformPhysics)  # Without the timer and the signals of the controller.
+    physics._controller = types.SimpleNamespace(getScene = lambda: types.SimpleNamespace(getRoot = lambda: root))
+    physics._build_volume = types.SimpleNamespace(getBoundingBox = lambda: AxisAlignedBox(minimum = Vector(-100, 0, -100), maximum = Vector(100, 200, 100)))
+    physics._enabled = True
+    physics._onChangeTimerFinished()
+
+    # The g-code has no vertices to calculate a convex hull of and stays where the machine prints it.
+    assert node.getDecorator(ConvexHullDecorator) is None
+    assert node.getPosition() == Vector(-100, 0, 100)
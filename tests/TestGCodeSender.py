@@ -0,0 +1,103 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+import pytest
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.GCodeSender import GCodeSender
+
+from FakeMarlin import FakeMarlin
+
+def numberedLine(number, line):
+    checksum = functools.reduce(lambda x, y: x ^ y, map(ord, "N%d%s" % (number, line)))
+    return ("N%d%s*%d\n" % (number, line, checksum)).encode()
+
+##  Send a job to a fake printer, reading its responses like USBPrinterOutputDevice does.
+#   \return The sender and the largest number of lines that were in flight at once.
+def sendJob(printer, lines, window_size):
+    connection = serial.Serial(printer.port, 250000, timeout = 0.1)
+    in_flight = [0, 0]  # Current and maximum number of lines in flight.
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def write(data):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        connection.write(data)
+
+    sender = GCodeSender(write, window_size, finished_callback = finished.set)
+    sender.start(lambda position: numberedLine(position, lines[position]) if position < len(lines) else None)
+
+    while not finished.is_set():
+        response = connection.readline()
+        if response.startswith(b"ok"):
+            with lock:
+                in_flight[0] = max(0, in_flight[0] - 1)
+        elif response.startswith(b"Resend"):
+            with lock:
+                in_flight[0] = 0
+        sender.processResponse(response)
+
+    connection.close()
+    return sender, in_flight[1]
+
+@pytest.fixture
+def job():
+    return ["M110"] + ["G1 X%d Y%d E%d" % (i % 200, i % 150, i) for i in range(1, 300)]
+
+@pytest.mark.parametrize("window_size", [1, 4, 8])
+def test_sendJob(job, window_size):
+    printer = FakeMarlin(latency = 0.001)
+    sender, max_in_flight = sendJob(printer, job, window_size)
+    printer.close()
+
+    assert printer.received == [line.encode() for line in job]
+    assert max_in_flight <= window_size
+    assert printer.resends == 0
+    assert sender.getAverageLinesPerSecond() > 0
+
+def test_sendJobWithResends(job):
+    printer = FakeMarlin(latency = 0.001, corrupt_lines = [5, 50, 51, 298])
+    sender, max_in_flight = sendJob(printer, job, 4)
+    printer.close()
+
+    # Every line arrives exactly once and in order, even though some had to be sent again.
+    assert printer.received == [line.encode() for line in job]
+    assert sender.getResendCount() == 4
+
+def test_queueCommandWhilePaused(job):
+    printer = FakeMarlin()
+    connection = serial.Serial(printer.port, 250000, timeout = 0.1)
+    sender = GCodeSender(connection.write, 4)
+    sender.start(lambda position: numberedLine(position, job[position]) if position < len(job) else None)
+    sender.setPaused(True)
+    sender.queueCommand(b"M105\n")
+
+    deadline = time.monotonic() + 5
+    while b"M105" not in printer.received and time.monotonic() < deadline:
+        sender.processResponse(connection.readline())
+    sender.stop()
+    connection.close()
+    printer.close()
+
+    assert b"M105" in printer.received
+    assert len(printer.received) < len(job)
+
+@pytest.mark.benchmark
+def test_windowThroughputBenchmark(job, record_property):
+    # With a latency of 5ms per response, a window of one line can at most send 200 lines per second.
+    printer = FakeMarlin(latency = 0.005)
+    single_line_sender, _ = sendJob(printer, job, 1)
+    printer.close()
+
+    printer = FakeMarlin(latency = 0.005)
+    window_sender, _ = sendJob(printer, job, 4)
+    printer.close()
+
+    record_property("single_line_rate", single_line_sender.getAverageLinesPerSecond())
+    record_property("window_rate", window_sender.getAverageLinesPerSecond())
@@ -0,0 +1,70 @@
+import gzip
+import io
+
+from cura.GCodeSettingsFooter import createFooter, getGzipUncompressedSize, parseSettingsBlock, readSettingsBlock
+from cura.GCodeStreamWriter import GCodeStreamWriter
+
+settings = ";SETTING_2 {\\\"global_qual\n;SETTING_2 ity\\\": \\\"[general]\\\\nname = test\\\"}\n"
+
+##  Write g-code with settings and a footer, like GCodeWriter does.
+def writeGCode(text_stream, gcode_list):
+    writer = GCodeStreamWriter(text_stream)
+    writer.writeChunks(gcode_list)
+    writer.flush()
+    offset = text_stream.tell()
+    writer.write(settings)
+    writer.flush()
+    length = text_stream.tell() - offset
+    writer.write(createFooter(2, offset, length))
+    writer.flush()
+
+gcode_list = [";FLAVOR:RepRap\n", "G28\n;SETTING_2 not really settings\n", "G1 X10 Y10 ; ünïcödé\n" * 1000]
+
+def test_plainFile(tmpdir):
+    file_name = str(tmpdir.join("test.gcode"))
+    with open(file_name, "w", encoding = "utf-8", newline = "\r\n") as f:
+        writeGCode(f, gcode_list)
+
+    with open(file_name, "rb") as f:
+        block = readSettingsBlock(f, 2)
+    assert block == settings.replace("\n", "\r\n").encode()
+    assert parseSettingsBlock(block, 2) == "{\\\"global_quality\\\": \\\"[general]\\\\nname = test\\\"}"
+
+def test_gzipFile(tmpdir):
+    file_name = str(tmpdir.join("test.gcode.gz"))
+    with gzip.open(file_name, "wb") as gzip_stream:
+        text_stream = io.TextIOWrapper(gzip_stream, encoding = "utf-8", newline = "")
+        writeGCode(text_stream, gcode_list)
+        text_stream.flush()
+        text_stream.detach()
+
+    with open(file_name, "rb") as f:
+        size = getGzipUncompressedSize(f)
+    with gzip.open(file_name, "rb") as f:
+        assert size == len(f.read())
+        block = readSettingsBlock(f, 2, size)
+    assert block == settings.encode()
+
+def test_noFooter():
+    stream = io.BytesIO(("".join(gcode_list) + settings).encode())
+    assert readSettingsBlock(stream, 2) is None
+    assert readSettingsBlock(io.BytesIO(b""), 2) is None
+
+def test_wrongVersion():
+    data = "".join(gcode_list)
+    stream = io.BytesIO((data + settings + createFooter(2, len(data.encode()), len(settings))).encode())
+    assert readSettingsBlock(stream, 2) is not None
+    assert readSettingsBlock(stream, 3) is None
+
+def test_invalidOffsets():
+    data = "".join(gcode_list).encode()
+    for offset, length in [(0, len(settings)), (len(data) + 1, len(settings)), (len(data), 10 ** 9), (len(data), 0)]:
+        stream = io.BytesIO(data + settings.encode() + createFooter(2, offset, length).encode())
+        assert readSettingsBlock(stream, 2) is None
+
+def test_linesAfterFooter():
+    # Post-processing may add a few lines after the footer.
+    data = "".join(gcode_list).encode()
+    footer = createFooter(2, len(data), len(settings)).encode()
+    stream = io.BytesIO(data + settings.encode() + footer + b"M84\n;Post-processed\n")
+    assert readSettingsBlock(stream, 2) == settings.encode()
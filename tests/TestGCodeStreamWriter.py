@@ -0,0 +1,67 @@
+import io
+import os
+import tempfile
+import time
+
+import pytest
+
+from cura.GCodeStreamWriter import GCodeStreamWriter
+
+def createLayer(layer_number, line_count):
+    lines = [";LAYER:%d" % layer_number]
+    lines.extend("G1 X%.3f Y%.3f E%.5f" % (i % 200 + 0.5, i % 150 + 0.25, i * 0.01) for i in range(line_count))
+    return "\n".join(lines) + "\n"
+
+def test_writeChunks():
+    chunks = [createLayer(i, 50) for i in range(100)]
+    progress = []
+    stream = io.StringIO()
+    writer = GCodeStreamWriter(stream, block_size = 10000, progress_callback = progress.append)
+    writer.writeChunks(chunks)
+    writer.write(";SETTING_3 {}\n")
+    writer.flush()
+
+    assert stream.getvalue() == "".join(chunks) + ";SETTING_3 {}\n"
+    assert writer.getPosition() == len(stream.getvalue())
+    assert len(progress) > 10
+    assert progress == sorted(progress)
+    assert progress[-1] == 100
+
+def test_largeChunk():
+    chunk = createLayer(0, 10000)
+    stream = io.StringIO()
+    writer = GCodeStreamWriter(stream, block_size = 1000)
+    writer.writeChunks([";FLAVOR:UltiGCode\n", chunk, ""])
+
+    assert stream.getvalue() == ";FLAVOR:UltiGCode\n" + chunk
+
+##  Write 500 MB of g-code to tmpfs, chunk by chunk and in blocks.
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason = "Needs a tmpfs at /dev/shm")
+def test_benchmark(record_property):
+    # Small chunks, like the start and end g-code and the short layers at the top of a model.
+    layers = [createLayer(i, 10) for i in range(100)]
+    chunk_count = 500 * 1024 * 1024 // (sum(map(len, layers)) // len(layers))
+    chunks = [layers[i % len(layers)] for i in range(chunk_count)]
+    total_size = sum(map(len, chunks))
+
+    with tempfile.NamedTemporaryFile("wt", dir = "/dev/shm") as stream:
+        start_time = time.monotonic()
+        for chunk in chunks:
+            stream.write(chunk)
+        stream.flush()
+        chunk_time = time.monotonic() - start_time
+        assert os.path.getsize(stream.name) == total_size
+
+    progress = []
+    with tempfile.NamedTemporaryFile("wt", dir = "/dev/shm") as stream:
+        start_time = time.monotonic()
+        GCodeStreamWriter(stream, progress_callback = progress.append).writeChunks(chunks, total_size)
+        stream.flush()
+        block_time = time.monotonic() - start_time
+        assert os.path.getsize(stream.name) == total_size
+
+    record_property("chunk_time", chunk_time)
+    record_property("block_time", block_time)
+    record_property("progress_updates", len(progress))
+    assert progress[-1] == 100
@@ -0,0 +1,164 @@
+import time
+
+import numpy
+import pytest
+
+from cura import HeightMap
+
+def test_pixelHeights():
+    pixels = numpy.array([[0xFF000000, 0xFFFFFFFF], [0x00FF0000, 0x80102030]], dtype = numpy.uint32)
+    heights = HeightMap.getPixelHeights(pixels)
+    assert heights.dtype == numpy.float32
+    # The alpha is ignored, as with qRed, qGreen and qBlue.
+    assert numpy.allclose(heights, [[0, 1], [1 / 3, (0x10 + 0x20 + 0x30) / (3 * 255)]])
+
+##  Reference that creates the walls one pair of triangles at a time, as ImageReader did with addFaceByPoints.
+def createWallsOneByOne(height_data, texel_width, texel_height):
+    height_minus_one, width_minus_one = height_data.shape[0] - 1, height_data.shape[1] - 1
+    geo_width = width_minus_one * texel_width
+    geo_height = height_minus_one * texel_height
+    faces = [(0, 0, 0, 0, 0, geo_height, geo_width, 0, geo_height), (geo_width, 0, geo_height, geo_width, 0, 0, 0, 0, 0)]
+    for n in range(0, width_minus_one):
+        x = n * texel_width
+        nx = (n + 1) * texel_width
+        hn0, hn1 = height_data[0, n], height_data[0, n + 1]
+        hs0, hs1 = height_data[height_minus_one, n], height_data[height_minus_one, n + 1]
+        faces.append((x, 0, 0, nx, 0, 0, nx, hn1, 0))
+        faces.append((nx, hn1, 0, x, hn0, 0, x, 0, 0))
+        faces.append((x, 0, geo_height, nx, 0, geo_height, nx, hs1, geo_height))
+        faces.append((nx, hs1, geo_height, x, hs0, geo_height, x, 0, geo_height))
+    for n in range(0, height_minus_one):
+        y = n * texel_height
+        ny = (n + 1) * texel_height
+        hw0, hw1 = height_data[n, 0], height_data[n + 1, 0]
+        he0, he1 = height_data[n, width_minus_one], height_data[n + 1, width_minus_one]
+        faces.append((0, 0, y, 0, 0, ny, 0, hw1, ny))
+        faces.append((0, hw1, ny, 0, hw0, y, 0, 0, y))
+        faces.append((geo_width, 0, y, geo_width, 0, ny, geo_width, he1, ny))
+        faces.append((geo_width, he1, ny, geo_width, he0, y, geo_width, 0, y))
+    return numpy.array(faces, dtype = numpy.float32).reshape(-1, 3)
+
+##  Sort the triangles of an array of triangle corners, to compare meshes that have the triangles in another order.
+def sortTriangles(vertices):
+    triangles = numpy.round(vertices.reshape(-1, 9), 5)
+    return triangles[numpy.lexsort(triangles.T[::-1])]
+
+def test_walls():
+    height_data = numpy.random.uniform(1, 5, (7, 11)).astype(numpy.float32)
+    vertices = HeightMap.createWallVertices(height_data, 0.5, 0.25)
+    assert vertices.dtype == numpy.float32
+    # The same triangles, with the same winding, but the walls one after the other.
+    assert numpy.allclose(sortTriangles(vertices), sortTriangles(createWallsOneByOne(height_data, 0.5, 0.25)))
+
+##  Reference that creates the top with six vertices for every square, as ImageReader did.
+def createTexelQuads(height_data, texel_width, texel_height):
+    height_minus_one, width_minus_one = height_data.shape[0] - 1, height_data.shape[1] - 1
+    heightmap_vertices = numpy.zeros((width_minus_one * height_minus_one, 6, 3), dtype = numpy.float32)
+    heightmap_vertices = heightmap_vertices + numpy.array([[
+        [0, 0, 0], [0, 0, texel_height], [texel_width, 0, texel_height],
+        [texel_width, 0, texel_height], [texel_width, 0, 0], [0, 0, 0]
+    ]], dtype = numpy.float32)
+    offsetsz, offsetsx = numpy.mgrid[0: height_minus_one, 0: width_minus_one]
+    offsetsx = numpy.array(offsetsx, numpy.float32).reshape(-1, 1) * texel_width
+    offsetsz = numpy.array(offsetsz, numpy.float32).reshape(-1, 1) * texel_height
+    offsets = numpy.concatenate([offsetsx, numpy.zeros(offsetsx.shape, dtype = numpy.float32), offsetsz], 1)
+    heightmap_vertices += offsets.repeat(6, 0).reshape(-1, 6, 3)
+    heightmap_vertices[:, 0, 1] = heightmap_vertices[:, 5, 1] = height_data[:-1, :-1].reshape(-1)
+    heightmap_vertices[:, 1, 1] = height_data[1:, :-1].reshape(-1)
+    heightmap_vertices[:, 2, 1] = heightmap_vertices[:, 3, 1] = height_data[1:, 1:].reshape(-1)
+    heightmap_vertices[:, 4, 1] = height_data[:-1, 1:].reshape(-1)
+    return heightmap_vertices.reshape(-1, 3)
+
+def test_gridMesh():
+    height_data = numpy.random.uniform(1, 5, (7, 11)).astype(numpy.float32)
+    vertices, indices = HeightMap.createGridMesh(height_data, 0.5, 0.25)
+    assert vertices.shape == (7 * 11, 3)
+    assert indices.shape == (2 * 6 * 10, 3)
+    assert indices.dtype == numpy.int32
+    # The same triangles in the same order as with a vertex of their own for every corner.
+    assert numpy.allclose(vertices[indices].reshape(-1, 3), createTexelQuads(height_data, 0.5, 0.25))
+
+def test_flatNormalsPointUp():
+    vertices, indices = HeightMap.createGridMesh(numpy.full((7, 11), 2.5, dtype = numpy.float32), 0.5, 0.25)
+    normals = HeightMap.calculateVertexNormals(vertices, indices)
+    assert normals.shape == vertices.shape
+    assert normals.dtype == numpy.float32
+    assert numpy.allclose(normals, [0, 1, 0])
+
+def test_normalsAreAreaWeighted():
+    # A vertex that is shared by a large horizontal triangle and a small vertical one.
+    vertices = numpy.array([[0, 0, 0], [0, 0, 10], [10, 0, 0], [0, 1, 0], [0, 0, -1]], dtype = numpy.float32)
+    indices = numpy.array([[0, 1, 2], [0, 3, 4]], dtype = numpy.int32)
+    normals = HeightMap.calculateVertexNormals(vertices, indices)
+    expected = numpy.array([-1, 100, 0]) / numpy.sqrt(1 + 100 ** 2)
+    assert numpy.allclose(normals[0], expected)
+    assert numpy.allclose(normals[1], [0, 1, 0])
+    assert numpy.allclose(normals[3], [-1, 0, 0])
+
+##  Reference that blurs with a 3x3 box blur a number of times, as ImageReader did.
+def blurIteratively(height_data, blur_iterations):
+    height_data = height_data.copy()
+    for _ in range(0, blur_iterations):
+        copy = numpy.pad(height_data, ((1, 1), (1, 1)), mode = "edge")
+        height_data += copy[1:-1, 2:]
+        height_data += copy[1:-1, :-2]
+        height_data += copy[2:, 1:-1]
+        height_data += copy[:-2, 1:-1]
+        height_data += copy[2:, 2:]
+        height_data += copy[:-2, 2:]
+        height_data += copy[2:, :-2]
+        height_data += copy[:-2, :-2]
+        height_data /= 9
+    return height_data
+
+@pytest.mark.parametrize("iterations", [0, 1, 2, 5, 20, 60])  # Direct and FFT convolution.
+def test_smoothHeights(iterations):
+    numpy.random.seed(iterations)
+    height_data = numpy.random.uniform(0, 1, (150, 170)).astype(numpy.float32)
+    expected = blurIteratively(height_data, iterations)
+    smoothed = HeightMap.smoothHeights(height_data, iterations)
+    assert smoothed is height_data  # In place.
+    assert smoothed.dtype == numpy.float32
+
+    # The result is the same, up to the weights that are cut off from the kernel, also at the edges.
+    assert numpy.allclose(smoothed, expected, atol = 1e-5)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("iterations", [10, 100])
+def test_smoothingBenchmark(iterations, record_property):
+    height_data = numpy.random.uniform(0, 1, (1024, 1024)).astype(numpy.float32)
+    start_time = time.monotonic()
+    blurIteratively(height_data, iterations)
+    reference_time = time.monotonic() - start_time
+
+    start_time = time.monotonic()
+    HeightMap.smoothHeights(height_data.copy(), iterations)
+    smooth_time = time.monotonic() - start_time
+
+    # Heavy smoothing should not take much longer than light smoothing, unlike with the box blur loop.
+    record_property("reference_time", reference_time)
+    record_property("smooth_time", smooth_time)
+
+@pytest.mark.parametrize("resampling_filter", [HeightMap.ResamplingFilter.Nearest, HeightMap.ResamplingFilter.Bilinear, HeightMap.ResamplingFilter.Area])
+def test_resampleHeights(resampling_filter):
+    height_data = numpy.random.uniform(0, 1, (40, 60)).astype(numpy.float32)
+    resampled = HeightMap.resampleHeights(height_data, 17, 23, resampling_filter)
+    assert resampled.shape == (17, 23)
+    assert resampled.dtype == numpy.float32
+    assert height_data.min() <= resampled.min() and resampled.max() <= height_data.max()
+
+    # A flat image stays flat and the same size stays the same.
+    assert numpy.allclose(HeightMap.resampleHeights(numpy.full((40, 60), 0.25), 17, 23, resampling_filter), 0.25)
+    assert numpy.allclose(HeightMap.resampleHeights(height_data, 40, 60, resampling_filter), height_data)
+
+def test_resampleArea():
+    height_data = numpy.arange(24, dtype = numpy.float32).reshape(4, 6)
+    # Halving averages blocks of 2x2 pixels.
+    expected = height_data.reshape(2, 2, 3, 2).mean(axis = (1, 3))
+    assert numpy.allclose(HeightMap.resampleHeights(height_data, 2, 3, HeightMap.ResamplingFilter.Area), expected)
+    # The pixels at the borders of a new pixel count for the part that it covers.
+    assert numpy.allclose(HeightMap.resampleHeights(numpy.array([[0, 3, 6]]), 1, 2), [[(0 + 3 / 2) / 1.5, (3 / 2 + 6) / 1.5]])
+
+def test_unknownFilter():
+    with pytest.raises(ValueError):
+        HeightMap.resampleHeights(numpy.zeros((4, 4)), 2, 2, "lanczos")
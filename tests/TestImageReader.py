@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy
+import pytest
+
+QtGui = pytest.importorskip("PyQt5.QtGui")
+pytest.importorskip("UM.Mesh.MeshReader")
+
+from cura import HeightMap
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from ImageReader.ImageReader import ImageReader
+
+##  Save an image that gets lighter from left to right.
+def saveGradient(path, width, height):
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    for x in range(width):
+        value = x * 255 // (width - 1)
+        for y in range(height):
+            image.setPixel(x, y, QtGui.qRgb(value, value, value))
+    assert image.save(path)
+
+@pytest.mark.parametrize("resampling_filter", [HeightMap.ResamplingFilter.Nearest, HeightMap.ResamplingFilter.Bilinear, HeightMap.ResamplingFilter.Area])
+def test_scaleDownLargeImage(tmpdir, resampling_filter):
+    path = str(tmpdir.join("gradient.png"))
+    saveGradient(path, 1000, 500)
+    reader = ImageReader.__new__(ImageReader)  # Without the dialog.
+    node = reader._generateSceneNode(path, 100, 10, 1, 0, 50, False, resampling_filter)
+
+    # The top has a vertex for every pixel of the image scaled down to the largest size.
+    heights = node.getMeshData().getVertices()[:50 * 25, 1].reshape(25, 50)
+    assert heights.min() == pytest.approx(1, abs = 0.2)
+    assert heights.max() == pytest.approx(11, abs = 0.2)
+    assert numpy.all(numpy.diff(heights, axis = 1) >= -1e-4)
+    assert numpy.allclose(heights, heights[0])
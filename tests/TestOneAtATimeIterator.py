@@ -0,0 +1,35 @@
+import numpy
+
+from cura.OneAtATimeIterator import OneAtATimeIterator
+
+class Node:
+    def getChildren(self):
+        return []
+
+def test_computePrintOrder():
+    iterator = OneAtATimeIterator(Node())
+
+    # Nothing blocks anything, so the original order is kept.
+    hit_map = numpy.zeros((3, 3), dtype = numpy.bool_)
+    assert iterator._computePrintOrder(hit_map) == [0, 1, 2]
+
+    # Object 0 can not be printed before object 2, so 2 has to go first.
+    hit_map[0, 2] = True
+    assert iterator._computePrintOrder(hit_map) == [1, 2, 0]
+
+    # Two objects that block each other can not be printed.
+    hit_map[2, 0] = True
+    assert iterator._computePrintOrder(hit_map) is None
+
+def test_computePrintOrderLongChain():
+    iterator = OneAtATimeIterator(Node())
+
+    # Every object has to be printed after the next one, so the order is reversed.
+    node_count = 200
+    hit_map = numpy.zeros((node_count, node_count), dtype = numpy.bool_)
+    hit_map[numpy.arange(node_count - 1), numpy.arange(1, node_count)] = True
+    assert iterator._computePrintOrder(hit_map) == list(reversed(range(node_count)))
+
+    # Closing the chain into a cycle means there is no solution.
+    hit_map[node_count - 1, 0] = True
+    assert iterator._computePrintOrder(hit_map) is None
@@ -0,0 +1,82 @@
+import time
+
+import numpy
+import pytest
+
+from cura.PolygonBatch import PolygonBatch
+
+##  Per pair separating axis test, the same test Polygon.intersectsPolygon does.
+def intersects(a, b):
+    for points in (a, b):
+        for n in range(len(points)):
+            edge = points[n] - points[n - 1]
+            normal = numpy.array([edge[1], -edge[0]])
+            projection_a = a.dot(normal)
+            projection_b = b.dot(normal)
+            if projection_a.min() > projection_b.max() or projection_b.min() > projection_a.max():
+                return False
+    return True
+
+def createPolygons(count, seed, spread):
+    random = numpy.random.RandomState(seed)
+    polygons = []
+    for _ in range(count):
+        # Random convex polygons: regular polygons with a random size, rotation and number of corners.
+        corners = random.randint(3, 9)
+        angles = numpy.linspace(0, 2 * numpy.pi, corners, endpoint = False) + random.uniform(0, numpy.pi)
+        radius = random.uniform(5, 30)
+        center = random.uniform(-spread, spread, 2)
+        polygons.append(numpy.stack((numpy.cos(angles), numpy.sin(angles)), axis = 1) * radius + center)
+    return polygons
+
+def test_intersectsBatch():
+    polygons = createPolygons(60, seed = 1, spread = 150)
+    heads = createPolygons(60, seed = 2, spread = 150)
+
+    result = PolygonBatch(polygons).intersectsBatch(PolygonBatch(heads))
+
+    expected = numpy.array([[intersects(a, b) for b in heads] for a in polygons])
+    assert result.shape == (60, 60)
+    assert (result == expected).all()
+    assert result.any() and not result.all()
+
+def test_intersectsBatchTouchingAndEmpty():
+    square = numpy.array([[0, 0], [0, 10], [10, 10], [10, 0]])
+    touching = square + [10, 0]
+    apart = square + [10.5, 0]
+
+    result = PolygonBatch([square, numpy.zeros((0, 2))]).intersectsBatch(PolygonBatch([touching, apart, square]))
+    assert result.tolist() == [[True, False, True], [False, False, False]]
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [100, 500])
+def test_intersectsBatchBenchmark(count, record_property):
+    polygons = createPolygons(count, seed = 3, spread = 1000)
+    heads = createPolygons(count, seed = 4, spread = 1000)
+
+    start = time.perf_counter()
+    PolygonBatch(polygons).intersectsBatch(PolygonBatch(heads))
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for a in polygons[:50]:
+        for b in heads:
+            intersects(a, b)
+    pair_time = (time.perf_counter() - start) * count / 50
+
+    record_property("batch_time", batch_time)
+    record_property("pair_time", pair_time)
+
+def test_rasterize():
+    polygons = createPolygons(10, seed = 5, spread = 40)
+    origin = numpy.array([-50.0, -30.0])
+    cell_size = 2.5
+
+    mask = PolygonBatch(polygons).rasterize(origin, cell_size, (24, 40))
+
+    # Every cell that touches a polygon is marked, and no other cells.
+    for row in range(24):
+        for column in range(40):
+            corner = origin + [column * cell_size, row * cell_size]
+            cell = numpy.array([corner, corner + [0, cell_size], corner + [cell_size, cell_size], corner + [cell_size, 0]])
+            assert mask[row, column] == any(intersects(cell, polygon) for polygon in polygons)
@@ -0,0 +1,68 @@
+import pytest
+
+from cura.ProgressEstimator import ProgressEstimator
+
+class FakeClock:
+    def __init__(self):
+        self.time = 1000.0
+
+    def __call__(self):
+        return self.time
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_rateLimit(clock):
+    estimator = ProgressEstimator(update_interval = 0.5, clock = clock)
+    estimator.start()
+
+    updates = 0
+    for line in range(1000):  # 1000 lines in 2 seconds.
+        clock.time += 0.002
+        if estimator.update(line / 10):
+            updates += 1
+
+    assert updates <= 5
+    assert estimator.getProgress() == 99.9
+    assert estimator.update(100)  # The end of the print is always reported.
+
+def test_measuredEstimate(clock):
+    estimator = ProgressEstimator(clock = clock)
+    estimator.start()
+    clock.time += 100
+    estimator.update(25)
+
+    assert estimator.getElapsedTime() == 100
+    assert estimator.getTotalTime() == pytest.approx(400)
+    assert estimator.getRemainingTime() == pytest.approx(300)
+
+def test_blendWithSlicerEstimate(clock):
+    estimator = ProgressEstimator(clock = clock)
+    estimator.start(1000)
+    assert estimator.getTotalTime() == 1000
+
+    # The printer is twice as slow as estimated. A quarter into the estimate, a quarter of the measurement counts.
+    clock.time += 250
+    estimator.update(12.5)
+    assert estimator.getTotalTime() == pytest.approx(0.25 * 2000 + 0.75 * 1000)
+
+    # Once the estimated time has passed, only the measurement counts.
+    clock.time += 750
+    estimator.update(50)
+    assert estimator.getTotalTime() == pytest.approx(2000)
+    assert estimator.getRemainingTime() == pytest.approx(1000)
+
+def test_pause(clock):
+    estimator = ProgressEstimator(clock = clock)
+    estimator.start()
+    clock.time += 50
+    estimator.setPaused(True)
+    clock.time += 500
+    assert estimator.getElapsedTime() == 50
+    estimator.setPaused(False)
+    clock.time += 50
+    estimator.update(50)
+
+    assert estimator.getElapsedTime() == 100
+    assert estimator.getTotalTime() == pytest.approx(200)
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+import types
+
+import pytest
+
+pytest.importorskip("UM.OutputDevice.OutputDevice")
+from UM.Mesh.MeshWriter import MeshWriter
+from UM.Preferences import Preferences
+from UM.Signal import Signal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+import RemovableDriveOutputDevice.RemovableDriveOutputDevice
+from RemovableDriveOutputDevice.RemovableDriveOutputDevice import RemovableDriveOutputDevice as Device
+
+gcode_format = {"mime_type": "text/x-gcode", "extension": "gcode", "description": "GCode File"}
+compressed_format = {"mime_type": "application/gzip", "extension": "gcode.gz", "description": "Compressed GCode File", "mode": MeshWriter.OutputMode.BinaryMode}
+stl_format = {"mime_type": "application/x-stl-ascii", "extension": "stl", "description": "STL File"}
+
+class FakeWriter:
+    def __init__(self, data):
+        self._data = data
+
+    def write(self, stream, node, mode):
+        stream.write(self._data)
+        return True
+
+writers = {"text/x-gcode": FakeWriter("G1 X10\n"), "application/gzip": FakeWriter(b"\x1f\x8bG1 X10\n")}
+
+class FakeMessage:
+    def __init__(self, *args, **kwargs):
+        self.actionTriggered = Signal()
+
+    def show(self):
+        pass
+
+    def hide(self):
+        pass
+
+    def setProgress(self, progress):
+        pass
+
+    def addAction(self, *args):
+        pass
+
+##  Writes the file right away, instead of on the job queue.
+class FakeWriteMeshJob:
+    def __init__(self, writer, stream, node, mode):
+        self._writer = writer
+        self._stream = stream
+        self._node = node
+        self._mode = mode
+        self._result = None
+        self.progress = Signal()
+        self.finished = Signal()
+
+    def setFileName(self, file_name):
+        self._file_name = file_name
+
+    def getFileName(self):
+        return self._file_name
+
+    def getStream(self):
+        return self._stream
+
+    def getResult(self):
+        return self._result
+
+    def getError(self):
+        return None
+
+    def start(self):
+        self._result = self._writer.write(self._stream, self._node, self._mode)
+        self.finished.emit(self)
+
+class FakeDefinition:
+    def __init__(self, file_formats):
+        self._file_formats = file_formats
+
+    def getMetaDataEntry(self, key):
+        return self._file_formats
+
+@pytest.fixture
+def device(monkeypatch):
+    def setUp(machine_file_formats, compress_gcode, drive_path = "/media/drive"):
+        definition = FakeDefinition(machine_file_formats)
+        mesh_file_handler = types.SimpleNamespace(getSupportedFileTypesWrite = lambda: [stl_format, gcode_format, compressed_format],
+                                                  getWriterByMimeType = writers.get)
+        application = types.SimpleNamespace(getMeshFileHandler = lambda: mesh_file_handler,
+                                            getGlobalContainerStack = lambda: types.SimpleNamespace(findContainer = lambda criteria: definition))
+        monkeypatch.setattr(RemovableDriveOutputDevice.RemovableDriveOutputDevice.Application, "getInstance", lambda: application)
+        monkeypatch.setattr(RemovableDriveOutputDevice.RemovableDriveOutputDevice, "Message", FakeMessage)
+        monkeypatch.setattr(RemovableDriveOutputDevice.RemovableDriveOutputDevice, "WriteMeshJob", FakeWriteMeshJob)
+        Preferences.getInstance().addPreference("removable_drive/compress_gcode", False)
+        Preferences.getInstance().setValue("removable_drive/compress_gcode", compress_gcode)
+        return Device(drive_path, "Drive")
+    yield setUp
+    Preferences.getInstance().resetPreference("removable_drive/compress_gcode")
+
+def test_plainGCodeByDefault(device):
+    assert device("text/x-gcode", compress_gcode = False)._getFileFormat(True) == gcode_format
+
+def test_compressedGCode(device):
+    assert device("text/x-gcode", compress_gcode = True)._getFileFormat(True) == compressed_format
+
+def test_compressOnlyGCode(device):
+    assert device("application/x-stl-ascii;text/x-gcode", compress_gcode = True)._getFileFormat(True) == stl_format
+
+def test_noFileFormats(device):
+    assert device("application/x-wavefront-obj", compress_gcode = True)._getFileFormat(True) is None
+
+@pytest.mark.parametrize("compress_gcode, file_name, data", [(False, "cube.gcode", b"G1 X10\n"), (True, "cube.gcode.gz", b"\x1f\x8bG1 X10\n")])
+def test_saveToDrive(device, tmpdir, compress_gcode, file_name, data):
+    drive = device("text/x-gcode", compress_gcode, str(tmpdir))
+    finished = threading.Event()
+    drive.writeSuccess.connect(lambda output_device: finished.set())
+    drive.requestWrite(None, "cube.stl")
+
+    assert finished.wait(5)  # Once the file is copied from the spool to the drive.
+    assert tmpdir.join(file_name).read_binary() == data
+    assert drive._destination is None
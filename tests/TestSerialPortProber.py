@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.SerialPortProber import SerialPortProber
+
+from FakeMarlin import FakeMarlin
+
+baud_rates = [115200, 57600, 38400, 19200]
+
+def createProber():
+    return SerialPortProber(probe_timeout = 0.5, bootloader_delay = 0.05)
+
+def test_detectBaudRate():
+    printer = FakeMarlin(baud_rate = 57600)
+    prober = createProber()
+    result = prober.probe(printer.port, baud_rates)
+    printer.close()
+
+    assert result is not None
+    assert result.baud_rate == 57600
+    assert result.latency > 0
+    assert prober.getCachedBaudRate(printer.port) == 57600
+    result.connection.close()
+
+def test_cachedBaudRateIsTriedFirst():
+    printer = FakeMarlin(baud_rate = 19200)
+    prober = createProber()
+    first = prober.probe(printer.port, baud_rates)
+    first.connection.close()
+
+    assert prober.getBaudRateOrder(printer.port, baud_rates)[0] == 19200
+    second = prober.probe(printer.port, baud_rates)
+    second.connection.close()
+    printer.close()
+
+    assert second.baud_rate == 19200
+    assert second.latency < first.latency
+
+##  Probe the ports of some printers, all at the same time.
+#   \return The results of the ports and the time it took to probe all of them.
+def probeInParallel(printers):
+    prober = createProber()
+    results = {}
+
+    def probe(port):
+        results[port] = prober.probe(port, baud_rates)
+
+    start_time = time.monotonic()
+    threads = [threading.Thread(target = probe, args = (printer.port,)) for printer in printers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total_time = time.monotonic() - start_time
+
+    for printer in printers:
+        printer.close()
+        results[printer.port].connection.close()
+    return results, total_time
+
+def test_probePortsInParallel():
+    printers = [FakeMarlin(baud_rate = 38400) for _ in range(4)]
+    results, _ = probeInParallel(printers)
+
+    for printer in printers:
+        assert results[printer.port].baud_rate == 38400
+
+@pytest.mark.benchmark
+def test_probePortsInParallelBenchmark(record_property):
+    # The ports are probed at the same time, so all of them together should take about as long as the slowest one.
+    results, total_time = probeInParallel([FakeMarlin(baud_rate = 38400) for _ in range(4)])
+    record_property("total_time", total_time)
+    record_property("slowest_latency", max(result.latency for result in results.values()))
+
+def test_noResponse():
+    master, slave = os.openpty()
+    port = os.ttyname(slave)
+    prober = createProber()
+    result = prober.probe(port, baud_rates[:2])
+    os.close(master)
+    os.close(slave)
+
+    assert result is None
+    assert prober.getCachedBaudRate(port) is None
+
+def test_abort():
+    printer = FakeMarlin(baud_rate = 19200)
+    prober = createProber()
+    result = prober.probe(printer.port, baud_rates, abort = lambda: True)
+    printer.close()
+
+    assert result is None
@@ -0,0 +1,162 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+import pytest
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.GCodeSender import GCodeSender
+from USBPrinting.SerialReactor import SerialReactor
+
+from FakeMarlin import FakeMarlin
+
+def numberedLine(number, line):
+    checksum = functools.reduce(lambda x, y: x ^ y, map(ord, "N%d%s" % (number, line)))
+    return ("N%d%s*%d\n" % (number, line, checksum)).encode()
+
+@pytest.fixture
+def reactor():
+    reactor = SerialReactor()
+    reactor.start()
+    yield reactor
+    reactor.stop()
+
+def waitFor(condition, timeout = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_readLines(reactor):
+    printers = [FakeMarlin() for _ in range(3)]
+    connections = [serial.Serial(printer.port, 250000, timeout = 0) for printer in printers]
+    received = [[] for _ in printers]
+    for connection, lines in zip(connections, received):
+        reactor.register(connection, lines.append)
+
+    for connection in connections:
+        connection.write(b"M105\nG28\n")
+    assert waitFor(lambda: all(len(lines) == 2 for lines in received))
+
+    for connection in connections:
+        reactor.unregister(connection)
+        connection.close()
+    for printer in printers:
+        printer.close()
+
+    for lines in received:
+        assert lines[0].startswith(b"ok T:") and lines[0].endswith(b"\n")
+        assert lines[1] == b"ok\n"
+
+def test_idleTimeout(reactor):
+    printer = FakeMarlin()
+    connection = serial.Serial(printer.port, 250000, timeout = 0)
+    received = []
+    reactor.register(connection, received.append, idle_timeout = 0.05)
+
+    assert waitFor(lambda: len(received) >= 2)
+    reactor.unregister(connection)
+    connection.close()
+    printer.close()
+
+    assert set(received) == {b""}
+
+def test_disconnect(reactor):
+    master, slave = os.openpty()
+    connection = serial.Serial(os.ttyname(slave), 250000, timeout = 0)
+    os.close(slave)
+    errors = []
+    reactor.register(connection, lambda line: None, errors.append)
+
+    os.close(master)  # Like unplugging the printer.
+    assert waitFor(lambda: errors)
+    connection.close()
+
+def test_timers(reactor):
+    calls = []
+    reactor.callLater(0.05, lambda: calls.append("later"))
+    cancelled = reactor.callLater(0.05, lambda: calls.append("cancelled"))
+    cancelled.cancel()
+    periodic = reactor.callPeriodically(0.01, lambda: calls.append("periodic"))
+
+    assert waitFor(lambda: "later" in calls and calls.count("periodic") >= 5)
+    periodic.cancel()
+    count = calls.count("periodic")
+    time.sleep(0.05)
+
+    assert calls.count("periodic") <= count + 1
+    assert "cancelled" not in calls
+
+def test_sendJobsFromOneThread(reactor):
+    job = ["M110"] + ["G1 X%d Y%d E%d" % (i % 200, i % 150, i) for i in range(1, 500)]
+    printers = [FakeMarlin(latency = 0.001, corrupt_lines = [10]) for _ in range(8)]
+    finished = []
+    thread_count = threading.active_count()
+
+    connections = []
+    for printer in printers:
+        connection = serial.Serial(printer.port, 250000, timeout = 0)
+        sender = GCodeSender(functools.partial(reactor.write, connection), 4, finished_callback = lambda: finished.append(True), reactor = reactor)
+        reactor.register(connection, sender.processResponse)
+        sender.start(lambda position: numberedLine(position, job[position]) if position < len(job) else None)
+        connections.append(connection)
+
+    # No thread was started for any of the printers.
+    assert threading.active_count() == thread_count
+    assert waitFor(lambda: len(finished) == len(printers), timeout = 30)
+
+    for connection in connections:
+        reactor.unregister(connection)
+        connection.close()
+    for printer in printers:
+        printer.close()
+        assert printer.received == [line.encode() for line in job]
+
+def test_writeStalledConnection(reactor):
+    # Nobody reads the other end of this port, like a printer that hangs.
+    master, slave = os.openpty()
+    stalled = serial.Serial(os.ttyname(slave), 250000, timeout = 0)
+    errors = []
+    reactor.register(stalled, lambda line: None, errors.append, write_timeout = 0.2)
+    printer = FakeMarlin()
+    connection = serial.Serial(printer.port, 250000, timeout = 0)
+    received = []
+    reactor.register(connection, received.append)
+
+    reactor.write(stalled, b"G1 X10 Y10\n" * 100000)  # Much more than the port can take.
+    reactor.write(connection, b"M105\n")
+    assert waitFor(lambda: received)  # The other printer is still served.
+    assert waitFor(lambda: errors == ["Write timeout"])
+
+    reactor.unregister(connection)
+    connection.close()
+    printer.close()
+    stalled.close()
+    os.close(slave)
+    os.close(master)
+
+def test_stopWaitsForSend(reactor):
+    writing = threading.Event()
+    release = threading.Event()
+    def write(data):
+        writing.set()
+        release.wait()
+
+    sent = []
+    sender = GCodeSender(write, 4, progress_callback = sent.append, reactor = reactor)
+    sender.start(lambda position: b"G1 X10\n")
+    assert writing.wait(5)
+
+    stopping = threading.Thread(target = sender.stop)
+    stopping.start()
+    try:
+        stopping.join(0.1)
+        assert stopping.is_alive()  # Waiting for the line that the reactor is writing.
+    finally:
+        release.set()
+    stopping.join(5)
+    assert not stopping.is_alive()
+    assert sent == []  # The job was stopped before the line was reported as sent.
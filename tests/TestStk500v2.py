@@ -0,0 +1,122 @@
+import os
+import random
+import struct
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.avr_isp import ispBase, intelHex, stk500v2
+
+from FakeStk500v2 import FakeStk500v2
+
+##  Programmer for a fake bootloader, which can not be reset through DTR.
+class PtyStk500v2(stk500v2.Stk500v2):
+    def _resetController(self):
+        pass
+
+##  Reference programmer that builds, sends and receives messages byte by byte, like Stk500v2 used to.
+class ByteByByteStk500v2(PtyStk500v2):
+    def sendMessage(self, data, payload = b""):
+        message = struct.pack(">BBHB", 0x1B, self.seq, len(data) + len(payload), 0x0E)
+        for c in list(data) + list(payload):
+            message += struct.pack(">B", c)
+        checksum = 0
+        for c in message:
+            checksum ^= c
+        message += struct.pack(">B", checksum)
+        self.serial.write(message)
+        self.serial.flush()
+        self.seq = (self.seq + 1) & 0xFF
+        return self.recvMessage()
+
+    def recvMessage(self):
+        header = b""
+        while len(header) < 5:
+            header += self._read(1)
+            if header[0] != 0x1B:
+                header = b""
+        msg_size = (header[2] << 8) | header[3]
+        body = b""
+        for _ in range(msg_size + 1):
+            body += self._read(1)
+        return body[:-1]
+
+def createFirmware(size):
+    random.seed(size)
+    return bytearray(random.getrandbits(8) for _ in range(size))
+
+def flash(programmer_type, target, firmware):
+    programmer = programmer_type()
+    programmer.connect(target.port)
+    start_time = time.monotonic()
+    programmer.programChip(firmware)
+    elapsed = time.monotonic() - start_time
+    programmer.close()
+    return elapsed
+
+@pytest.mark.parametrize("has_checksum", [True, False])
+def test_programChip(has_checksum):
+    target = FakeStk500v2(has_checksum)
+    firmware = createFirmware(10000)  # Not a multiple of the page size.
+    progress = []
+
+    programmer = PtyStk500v2()
+    programmer.progress_callback = lambda value, maximum: progress.append((value, maximum))
+    programmer.connect(target.port)
+    assert programmer.hasChecksumFunction() == has_checksum
+    programmer.programChip(firmware)
+    programmer.close()
+    target.close()
+
+    assert target.flash[:len(firmware)] == firmware
+    assert target.flash[len(firmware):] == b"\xFF" * (target.flash_size - len(firmware))
+    assert progress[-1][0] == progress[-1][1]
+
+@pytest.mark.parametrize("has_checksum", [True, False])
+def test_verifyError(has_checksum):
+    target = FakeStk500v2(has_checksum)
+    firmware = createFirmware(1000)
+
+    programmer = PtyStk500v2()
+    programmer.connect(target.port)
+    programmer.programChip(firmware)
+    target.flash[700] ^= 0xFF
+    with pytest.raises(ispBase.IspError) as error:
+        programmer.verifyFlash(firmware)
+    programmer.close()
+    target.close()
+
+    if not has_checksum:
+        assert "0x2bc" in str(error.value)
+
+def test_readHex(tmpdir):
+    firmware = createFirmware(300)
+    lines = []
+    for address in range(0, len(firmware), 16):
+        record = bytes([min(16, len(firmware) - address), address >> 8, address & 0xFF, 0x00]) + firmware[address:address + 16]
+        record += bytes([-sum(record) & 0xFF])
+        lines.append(":" + record.hex().upper())
+    lines.append(":00000001FF")
+    hex_file = tmpdir.join("firmware.hex")
+    hex_file.write("\n".join(lines) + "\n")
+
+    assert intelHex.readHex(str(hex_file)) == firmware
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("has_checksum", [True, False])
+def test_benchmark(has_checksum, record_property):
+    firmware = createFirmware(128 * 1024)
+
+    target = FakeStk500v2(has_checksum)
+    reference_time = flash(ByteByByteStk500v2, target, firmware)
+    target.close()
+
+    target = FakeStk500v2(has_checksum)
+    buffer_time = flash(PtyStk500v2, target, firmware)
+    target.close()
+    assert target.flash[:len(firmware)] == firmware
+
+    record_property("reference_time", reference_time)
+    record_property("buffer_time", buffer_time)
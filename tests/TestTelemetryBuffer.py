@@ -0,0 +1,47 @@
+import numpy
+
+from cura.TelemetryBuffer import TelemetryBuffer
+
+def test_appendAndHistory():
+    buffer = TelemetryBuffer(["hotend", "bed"], capacity = 8)
+    for i in range(5):
+        assert buffer.append(float(i), {"hotend": 200.0 + i, "bed": 60.0 if i % 2 else None})
+
+    times, values = buffer.getHistory()
+    assert len(buffer) == 5
+    assert times.tolist() == [0, 1, 2, 3, 4]
+    assert values[:, 0].tolist() == [200, 201, 202, 203, 204]
+    _, bed = buffer.getHistory("bed")
+    assert numpy.isnan(bed[0]) and bed[1] == 60
+
+def test_ringBuffer():
+    buffer = TelemetryBuffer(["value"], capacity = 4, decimate = False)
+    for i in range(10):
+        buffer.append(float(i), {"value": i})
+
+    times, values = buffer.getHistory("value")
+    assert times.tolist() == [6, 7, 8, 9]
+    assert values.tolist() == [6, 7, 8, 9]
+
+def test_decimation():
+    buffer = TelemetryBuffer(["value"], capacity = 16)
+    sample_count = 1000
+    for i in range(sample_count):
+        buffer.append(float(i), {"value": 2.0 * i})
+
+    # The memory stays the same, while the history still covers all samples.
+    assert len(buffer) <= buffer.getCapacity() == 16
+    assert buffer.getSamplesPerRow() == 64
+    times, values = buffer.getHistory("value")
+    assert times[0] < 64
+    assert times[-1] > sample_count - 2 * 64
+    assert numpy.all(numpy.diff(times) > 0)
+    numpy.testing.assert_allclose(values, 2.0 * times)
+
+def test_decimationKeepsKnownValues():
+    buffer = TelemetryBuffer(["value"], capacity = 4)
+    for i in range(8):
+        buffer.append(float(i), {"value": 10.0} if i % 2 == 0 else {})
+
+    _, values = buffer.getHistory("value")
+    assert values.tolist() == [10.0] * len(buffer)
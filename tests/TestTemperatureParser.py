@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.TemperatureParser import parseTemperatures
+
+def test_singleHotend():
+    assert parseTemperatures(b"ok T:210.5 /215.0 B:60.0 /60.0 @:0 B@:127\n") == ({None: (210.5, 215.0)}, (60.0, 60.0))
+
+def test_multipleHotends():
+    hotends, bed = parseTemperatures(b"ok T:200.0 /200.0 B:55.2 /0.0 T0:200.0 /200.0 T1:21.3 /0.0 @:0 B@:0\n")
+    assert hotends == {None: (200.0, 200.0), 0: (200.0, 200.0), 1: (21.3, 0.0)}
+    assert bed == (55.2, 0.0)
+
+def test_withoutTargets():
+    assert parseTemperatures(b"T:19.8 E:0 W:?\n") == ({None: (19.8, None)}, None)
+    assert parseTemperatures(b"ok\n") == ({}, None)
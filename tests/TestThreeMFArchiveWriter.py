@@ -0,0 +1,82 @@
+import io
+import time
+import zipfile
+
+import numpy
+import pytest
+
+from cura.ThreeMFArchiveWriter import ThreeMFArchiveWriter
+from cura.ThreeMFModelParser import ThreeMFModelParser
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+namespaces = {"3mf": "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"}
+
+pyramid_vertices = numpy.array([[0, 0, 0], [10, 0, 0], [0, 10.5, 0], [0, 0, 0.1]], dtype = numpy.float32)
+pyramid_triangles = numpy.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]])
+
+def writeArchive(**kwargs):
+    stream = io.BytesIO()
+    writer = ThreeMFArchiveWriter(stream, **kwargs)
+    writer.addObject(1, pyramid_vertices, pyramid_triangles, name = "Pyramid <1>", settings = {"infill_sparse_density": 20, "support_enable": True})
+    writer.addObject(2, pyramid_vertices * 2, pyramid_triangles[::-1])
+    transformation = numpy.identity(4)
+    transformation[:3, 3] = [10, 20, 30]
+    transformation[0, 1] = 0.5
+    writer.addBuildItem(1, transformation)
+    writer.addBuildItem(2)
+    writer.addBuildItem(1)
+    writer.close()
+    assert not stream.closed
+    return stream, transformation
+
+def test_roundTrip():
+    stream, transformation = writeArchive(chunk_size = 3)  # Several chunks per object.
+    archive = zipfile.ZipFile(stream)
+    assert set(archive.namelist()) == {"[Content_Types].xml", "_rels/.rels", "3D/3dmodel.model"}
+
+    model = ThreeMFModelParser().parse(archive.open("3D/3dmodel.model"))
+    assert [mesh_object.id for mesh_object in model.objects] == ["1", "2"]
+    assert model.objects[0].name == "Pyramid <1>"
+    assert numpy.array_equal(model.objects[0].vertices, pyramid_vertices)  # Exactly, including 0.1.
+    assert numpy.array_equal(model.objects[0].triangles, pyramid_triangles)
+    assert numpy.array_equal(model.objects[1].vertices, pyramid_vertices * 2)
+    assert numpy.array_equal(model.objects[1].triangles, pyramid_triangles[::-1])
+    assert numpy.array_equal(model.getTransformation("1"), transformation)
+    assert model.getTransformation("2") is None
+
+def test_settings():
+    stream, _ = writeArchive()
+    root = ET.parse(zipfile.ZipFile(stream).open("3D/3dmodel.model"))
+    metadata = root.findall("./3mf:resources/3mf:object[@id='1']/3mf:metadatagroup/3mf:metadata", namespaces)
+    assert {entry.get("name"): entry.text for entry in metadata} == {"cura:infill_sparse_density": "20", "cura:support_enable": "True"}
+    assert len(root.findall("./3mf:build/3mf:item", namespaces)) == 3
+
+def test_invalidIds():
+    writer = ThreeMFArchiveWriter(io.BytesIO())
+    writer.addObject(1, pyramid_vertices, pyramid_triangles)
+    with pytest.raises(ValueError):
+        writer.addObject(1, pyramid_vertices, pyramid_triangles)
+    with pytest.raises(ValueError):
+        writer.addBuildItem(2)
+    writer.abort()
+
+@pytest.mark.benchmark
+def test_benchmark(record_property):
+    # Writing twice as many triangles should take about twice as long.
+    times = []
+    for triangle_count in (100000, 200000):
+        vertices = numpy.random.uniform(0, 100, (triangle_count // 2, 3)).astype(numpy.float32)
+        triangles = numpy.random.randint(0, len(vertices), (triangle_count, 3))
+        start_time = time.monotonic()
+        writer = ThreeMFArchiveWriter(io.BytesIO())
+        writer.addObject(1, vertices, triangles)
+        writer.addBuildItem(1)
+        writer.close()
+        times.append(time.monotonic() - start_time)
+
+    record_property("time_100000_triangles", times[0])
+    record_property("time_200000_triangles", times[1])
@@ -0,0 +1,46 @@
+import math
+
+import numpy
+import pytest
+
+from cura import ThreeMFCoordinates
+
+##  A transformation in the coordinates of Cura: scaled, turned around the vertical axis and moved over the plate.
+def curaTransformation():
+    scale = numpy.diag([2.0, 3.0, 4.0, 1.0])
+    angle = math.pi / 6
+    rotation = numpy.identity(4)
+    rotation[0, 0] = rotation[2, 2] = math.cos(angle)
+    rotation[0, 2] = math.sin(angle)
+    rotation[2, 0] = -math.sin(angle)
+    translation = numpy.identity(4)
+    translation[:3, 3] = [10, 5, -20]
+    return translation.dot(rotation).dot(scale)
+
+def test_plateTransformation():
+    plate = ThreeMFCoordinates.getPlateTransformation(200, 100)
+    # The middle of the plate is in the middle of the plate of 3MF, above is along Z and the front is at Y = 0.
+    assert plate.dot([0, 0, 0, 1]) == pytest.approx([100, 50, 0, 1])
+    assert plate.dot([0, 10, 0, 1]) == pytest.approx([100, 50, 10, 1])
+    assert plate.dot([-100, 0, 50, 1]) == pytest.approx([0, 0, 0, 1])
+
+def test_toThreeMF():
+    transformation = curaTransformation()
+    vertices = numpy.array([[0, 0, 0, 1], [1, 2, 3, 1], [-4, 5, -6, 1]], dtype = numpy.float64).T
+    # The mesh is written with Z up, while the transform of the build item takes it to where the node put it.
+    mesh_vertices = numpy.array([vertices[0], -vertices[2], vertices[1], vertices[3]])
+
+    build_transformation = ThreeMFCoordinates.toThreeMFTransformation(transformation, 200, 100)
+    plate = ThreeMFCoordinates.getPlateTransformation(200, 100)
+    assert numpy.allclose(build_transformation.dot(mesh_vertices), plate.dot(transformation).dot(vertices))
+    assert numpy.allclose(build_transformation[3], [0, 0, 0, 1])
+
+def test_roundTrip():
+    transformation = curaTransformation()
+    build_transformation = ThreeMFCoordinates.toThreeMFTransformation(transformation, 200, 100)
+    assert numpy.allclose(ThreeMFCoordinates.fromThreeMFTransformation(build_transformation, 200, 100), transformation)
+
+def test_identityIsOnTheCorner():
+    # An object without a transform is at the front left corner of the plate, with its top up.
+    transformation = ThreeMFCoordinates.fromThreeMFTransformation(numpy.identity(4), 200, 100)
+    assert numpy.allclose(transformation, numpy.array([[1, 0, 0, -100], [0, 1, 0, 0], [0, 0, 1, 50], [0, 0, 0, 1]]))
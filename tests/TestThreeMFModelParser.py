@@ -0,0 +1,142 @@
+import io
+import random
+import time
+
+import numpy
+import pytest
+
+from cura.ThreeMFModelParser import ThreeMFModelParser
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+namespaces = {"3mf": "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"}
+
+model = b"""<?xml version="1.0" encoding="UTF-8"?>
+<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02" xmlns:cura="http://software.ultimaker.com/xml/cura/3mf/2015/10">
+    <resources>
+        <object id="1" name="Pyramid" type="model">
+            <mesh>
+                <vertices>
+                    <vertex x="0" y="0" z="0" />
+                    <vertex x="10" y="0" z="0" />
+                    <vertex x="0" y="10.5" z="0" />
+                    <vertex x="0" y="0" z="-1e1" />
+                </vertices>
+                <triangles>
+                    <triangle v1="0" v2="2" v3="1" />
+                    <triangle v1="0" v2="1" v3="3" />
+                    <triangle v1="0" v2="3" v3="2" />
+                    <triangle v1="1" v2="2" v3="3" />
+                </triangles>
+            </mesh>
+        </object>
+        <object id="2" type="model">
+            <mesh>
+                <vertices>
+                    <vertex x="1" y="2" z="3" />
+                    <vertex x="4" y="5" z="6" />
+                    <vertex x="7" y="8" z="9" />
+                </vertices>
+                <triangles>
+                    <triangle v1="2" v2="1" v3="0" />
+                </triangles>
+            </mesh>
+        </object>
+    </resources>
+    <build>
+        <item objectid="1" transform="1 0 0 0 2 0 0 0 3 10 20 30" />
+        <item objectid="1" transform="1 0 0 0 1 0 0 0 1 0 0 0" />
+        <item objectid="2" />
+    </build>
+</model>
+"""
+
+def test_parse():
+    parsed = ThreeMFModelParser().parse(io.BytesIO(model))
+
+    assert [mesh_object.id for mesh_object in parsed.objects] == ["1", "2"]
+    pyramid = parsed.objects[0]
+    assert pyramid.name == "Pyramid"
+    assert pyramid.vertices.dtype == numpy.float32
+    assert pyramid.vertices.tolist() == [[0, 0, 0], [10, 0, 0], [0, 10.5, 0], [0, 0, -10]]
+    assert pyramid.triangles.tolist() == [[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]]
+    assert parsed.objects[1].getTriangleVertices().tolist() == [[7, 8, 9], [4, 5, 6], [1, 2, 3]]
+
+def test_objectCallback():
+    parsed_objects = []
+    def onObject(mesh_object):
+        assert len(parsed_objects) < 2
+        parsed_objects.append(mesh_object)
+
+    parsed = ThreeMFModelParser().parse(io.BytesIO(model), object_callback = onObject)
+    assert parsed_objects == parsed.objects
+
+def test_transformation():
+    parsed = ThreeMFModelParser().parse(io.BytesIO(model))
+
+    # The first build item of an object counts.
+    transformation = parsed.getTransformation("1")
+    assert transformation.tolist() == [[1, 0, 0, 10], [0, 2, 0, 20], [0, 0, 3, 30], [0, 0, 0, 1]]
+    assert parsed.getTransformation("2") is None
+    assert parsed.getTransformation("3") is None
+
+def test_invalidTriangle():
+    with pytest.raises(ValueError):
+        ThreeMFModelParser().parse(io.BytesIO(model.replace(b'v3="3" />\n                </triangles>', b'v3="4" />\n                </triangles>')))
+
+##  Create the model of a 3MF file with random triangles.
+def createModel(object_count, triangle_count):
+    random.seed(triangle_count)
+    parts = [b'<?xml version="1.0" encoding="UTF-8"?>\n<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n<resources>\n']
+    for object_id in range(object_count):
+        vertex_count = triangle_count // 2 + 2
+        parts.append(b'<object id="%d" type="model"><mesh><vertices>\n' % object_id)
+        parts.append(b"".join(b'<vertex x="%.6f" y="%.6f" z="%.6f" />\n' % (random.uniform(-100, 100), random.uniform(-100, 100), random.uniform(0, 100)) for _ in range(vertex_count)))
+        parts.append(b"</vertices><triangles>\n")
+        parts.append(b"".join(b'<triangle v1="%d" v2="%d" v3="%d" />\n' % (index // 2, index // 2 + 1, index // 2 + 2) for index in range(triangle_count)))
+        parts.append(b"</triangles></mesh></object>\n")
+    parts.append(b"</resources>\n<build>\n")
+    parts.extend(b'<item objectid="%d" />\n' % object_id for object_id in range(object_count))
+    parts.append(b"</build>\n</model>\n")
+    return b"".join(parts)
+
+##  Reference that parses the model into a tree and collects the triangles one at a time.
+def parseTree(data):
+    root = ET.parse(io.BytesIO(data))
+    result = []
+    for entry in root.findall("./3mf:resources/3mf:object", namespaces):
+        vertex_list = []
+        for vertex in entry.findall(".//3mf:vertex", namespaces):
+            vertex_list.append([vertex.get("x"), vertex.get("y"), vertex.get("z")])
+        points = []
+        for triangle in entry.findall(".//3mf:triangle", namespaces):
+            for index in (int(triangle.get("v1")), int(triangle.get("v2")), int(triangle.get("v3"))):
+                points.append([float(value) for value in vertex_list[index]])
+        result.append(points)
+    return result
+
+def test_compareToReference():
+    data = createModel(3, 10000)
+    parsed = ThreeMFModelParser(chunk_size = 1000).parse(io.BytesIO(data))  # Many chunks.
+    reference = parseTree(data)
+    assert len(parsed.objects) == len(reference)
+    for mesh_object, points in zip(parsed.objects, reference):
+        assert numpy.array_equal(mesh_object.getTriangleVertices(), numpy.array(points, dtype = numpy.float32))
+
+@pytest.mark.benchmark
+def test_benchmark(record_property):
+    data = createModel(1, 200000)
+
+    start_time = time.monotonic()
+    parseTree(data)
+    reference_time = time.monotonic() - start_time
+
+    start_time = time.monotonic()
+    ThreeMFModelParser().parse(io.BytesIO(data)).objects[0].getTriangleVertices()
+    parse_time = time.monotonic() - start_time
+
+    record_property("reference_time", reference_time)
+    record_property("parse_time", parse_time)
@@ -0,0 +1,69 @@
+import importlib
+import io
+import os
+import sys
+import types
+import zipfile
+
+import numpy
+import pytest
+
+pytest.importorskip("UM.Mesh.MeshWriter")
+from UM.Math.Vector import Vector
+from UM.Mesh.MeshData import MeshData
+from UM.Scene.SceneNode import SceneNode
+
+from cura.ThreeMFModelParser import ThreeMFModelParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+ThreeMFWriterModule = importlib.import_module("3MFWriter.ThreeMFWriter")
+ThreeMFWriter = ThreeMFWriterModule.ThreeMFWriter
+
+pyramid_vertices = numpy.array([[0, 0, 0], [10, 0, 0], [0, 10, 0], [0, 0, 10]], dtype = numpy.float32)
+pyramid_indices = numpy.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]], dtype = numpy.int32)
+
+class FakeStack:
+    def getProperty(self, key, property_name):
+        return {"machine_width": 200, "machine_depth": 100}[key]
+
+@pytest.fixture(autouse = True)
+def application(monkeypatch):
+    application = types.SimpleNamespace(getGlobalContainerStack = lambda: FakeStack())
+    monkeypatch.setattr(ThreeMFWriterModule.Application, "getInstance", lambda: application)
+
+def test_nodesWithoutVerticesAreSkipped():
+    root = SceneNode()
+    pyramid = SceneNode(root)
+    pyramid.setName("Pyramid")
+    pyramid.setMeshData(MeshData(vertices = pyramid_vertices, indices = pyramid_indices))
+    layers = SceneNode(root)
+    layers.setMeshData(MeshData())  # Like the node of the layer data or of a g-code file, without vertices.
+
+    stream = io.BytesIO()
+    assert ThreeMFWriter().write(stream, root)
+
+    model = ThreeMFModelParser().parse(zipfile.ZipFile(stream).open("3D/3dmodel.model"))
+    assert [mesh_object.name for mesh_object in model.objects] == ["Pyramid"]
+    # 3MF has Z up.
+    assert numpy.array_equal(model.objects[0].vertices, pyramid_vertices[:, [0, 2, 1]] * [1, -1, 1])
+    assert numpy.array_equal(model.objects[0].triangles, pyramid_indices)
+
+def test_onlyNodesWithoutVertices():
+    root = SceneNode()
+    SceneNode(root).setMeshData(MeshData())
+    assert not ThreeMFWriter().write(io.BytesIO(), root)
+
+def test_buildItemOnThePlate():
+    root = SceneNode()
+    pyramid = SceneNode(root)
+    pyramid.setMeshData(MeshData(vertices = pyramid_vertices, indices = pyramid_indices))
+    pyramid.setPosition(Vector(10, 0, 20))
+
+    stream = io.BytesIO()
+    assert ThreeMFWriter().write(stream, root)
+
+    # The build item takes the mesh, with Z up, from the corner of the plate of 3MF to where the node is.
+    model = ThreeMFModelParser().parse(zipfile.ZipFile(stream).open("3D/3dmodel.model"))
+    transformation = model.getTransformation(model.objects[0].id)
+    apex = transformation.dot(numpy.append(model.objects[0].vertices[2], 1))
+    assert apex == pytest.approx([110, 30, 10, 1])
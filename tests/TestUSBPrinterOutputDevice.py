@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5.QtCore")
+pytest.importorskip("UM.Application")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "plugins"))
+from USBPrinting.GCodeSender import GCodeSender
+from USBPrinting.USBPrinterOutputDevice import USBPrinterOutputDevice
+from cura.PrinterOutputDevice import ConnectionState
+
+##  Create a device that is printing, with just the state that processing the responses of the printer uses.
+#   \return The device and the list of everything that it writes to the printer.
+def createPrintingDevice(window_size):
+    written = []
+    condition = threading.Condition()
+
+    def write(data):
+        with condition:
+            written.append(data)
+            condition.notify_all()
+
+    device = USBPrinterOutputDevice.__new__(USBPrinterOutputDevice)  # Without a serial port or an application.
+    device._connection_state = ConnectionState.connected
+    device._error_line_start = None
+    device._temperature_request_timeout = time.time() + 60
+    device._temperature_requested_extruder_index = 0
+    device._num_extruders = 0
+    device._is_printing = True
+    device._is_paused = False
+    device._ok_timeout = time.time() + 60
+    device._gcode_sender = GCodeSender(write, window_size)
+    device._gcode_sender.start(lambda position: ("G1 X%d\n" % position).encode())
+    return device, written, condition
+
+def waitFor(condition, predicate):
+    with condition:
+        assert condition.wait_for(predicate, timeout = 5)
+
+def test_queuedCommandIsSentWhilePaused():
+    device, written, condition = createPrintingDevice(window_size = 2)
+    waitFor(condition, lambda: len(written) == 2)  # The window is full.
+
+    # Pause like the print monitor does.
+    device._is_paused = True
+    device._gcode_sender.setPaused(True)
+    device.sendCommand("M104 S200")
+
+    # The oks of the lines that were in flight make room for the command, but not for more lines of the job.
+    device._processLine(b"ok")
+    device._processLine(b"ok")
+    waitFor(condition, lambda: b"M104 S200\n" in written)
+    device._gcode_sender.stop()
+
+    assert written[:2] == [b"G1 X0\n", b"G1 X1\n"]
+    assert not any(data.startswith(b"G1") for data in written[2:])
+    assert b"M105\n" in written  # The keep alive.